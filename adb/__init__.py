@@ -1,7 +1,30 @@
 from .command import Adb
 from .install import check_adb_install
+from .pool import DevicePool, device_busy, is_device_busy
+from .staging import DeviceStaging
+from .compression import choose_compression, push_adaptive
+from ._failures import (
+    InstallError,
+    classify_install_output,
+    FAILURE_TRANSIENT,
+    FAILURE_STORAGE,
+    FAILURE_PERMANENT,
+    FAILURE_UNKNOWN,
+)
 
 __all__ = [
     "Adb",
-    "check_adb_install"
+    "check_adb_install",
+    "DevicePool",
+    "device_busy",
+    "is_device_busy",
+    "DeviceStaging",
+    "choose_compression",
+    "push_adaptive",
+    "InstallError",
+    "classify_install_output",
+    "FAILURE_TRANSIENT",
+    "FAILURE_STORAGE",
+    "FAILURE_PERMANENT",
+    "FAILURE_UNKNOWN"
 ]
@@ -1,10 +1,6 @@
 from typing import Callable
 from functools import wraps
 
-from ten_utils.log import Logger
-
-logger = Logger(__name__)
-
 
 def check_device_set(func: Callable) -> Callable:
     """
@@ -13,7 +9,7 @@ def check_device_set(func: Callable) -> Callable:
 
     - Wraps an Adb class method.
     - If `self.device_set` is True, executes the method normally.
-    - If no device is set, logs a critical error and returns None.
+    - If no device is set, raises RuntimeError.
 
     Args:
         func (Callable): The decorated method.
@@ -25,17 +21,13 @@ def check_device_set(func: Callable) -> Callable:
     @wraps(func)
     def wrapper(*args, **kwargs):
         self = args[0]
-        output = None
-
-        if self.device_set:
-            output = func(*args, **kwargs)
 
-        else:
-            logger.critical(
+        if not self.device_set:
+            raise RuntimeError(
                 "The device is not set! "
                 "Set the device using the 'Adb.set_device' method."
             )
 
-        return output
+        return func(*args, **kwargs)
 
     return wrapper
@@ -0,0 +1,103 @@
+import re
+import subprocess
+
+# Failure classes of an install attempt
+FAILURE_TRANSIENT = "transient"  # transport dropped; retry on a reconnected device
+FAILURE_STORAGE = "storage"  # device out of space; free space, then retry
+FAILURE_PERMANENT = "permanent"  # the same APKs will fail again; do not retry
+FAILURE_UNKNOWN = "unknown"  # unrecognized; retried once as is
+
+_RE_INSTALL_CODE = re.compile(r"\b(INSTALL_(?:PARSE_)?FAILED_[A-Z0-9_]+)")
+
+_STORAGE_CODES = {
+    "INSTALL_FAILED_INSUFFICIENT_STORAGE",
+    "INSTALL_FAILED_MEDIA_UNAVAILABLE",
+    "INSTALL_FAILED_CONTAINER_ERROR",
+}
+
+# Codes raised by the package manager itself rather than by the APKs
+_TRANSIENT_CODES = {
+    "INSTALL_FAILED_ABORTED",
+    "INSTALL_FAILED_SESSION_INVALID",
+}
+
+# Codes the package manager uses for a wide range of causes
+_UNKNOWN_CODES = {
+    "INSTALL_FAILED_INTERNAL_ERROR",
+}
+
+# Errors of the adb transport or a package manager that is not up yet
+_TRANSIENT_MARKERS = (
+    "device offline",
+    "device not found",
+    "no devices/emulators found",
+    "error: closed",
+    "protocol fault",
+    "broken pipe",
+    "connection reset",
+    "failed to connect",
+    "can't find service: package",
+    "is the system running?",
+)
+
+_STORAGE_MARKERS = (
+    "no space left on device",
+)
+
+
+def classify_install_output(output: str) -> tuple[str, str | None]:
+    """
+    Classify the output of a failed install.
+
+    Args:
+        output (str): Combined stdout/stderr of `adb install*` or `pm install-*`.
+
+    Returns:
+        tuple[str, str | None]:
+            - One of FAILURE_TRANSIENT, FAILURE_STORAGE, FAILURE_PERMANENT, FAILURE_UNKNOWN.
+            - The `INSTALL_FAILED_*` / `INSTALL_PARSE_FAILED_*` code, if any.
+
+    Notes:
+        - Every `INSTALL_*FAILED_*` code not known to be transient,
+          storage related or ambiguous (INTERNAL_ERROR) is permanent: it
+          describes the APKs or the device state (downgrade, ABI, SDK
+          level, signature), which a retry does not change.
+    """
+    match = _RE_INSTALL_CODE.search(output)
+    code = match.group(1) if match else None
+    lowered = output.lower()
+
+    if code in _STORAGE_CODES or any(marker in lowered for marker in _STORAGE_MARKERS):
+        return FAILURE_STORAGE, code
+
+    if code in _TRANSIENT_CODES or (code is None and any(marker in lowered for marker in _TRANSIENT_MARKERS)):
+        return FAILURE_TRANSIENT, code
+
+    if code is not None and code not in _UNKNOWN_CODES:
+        return FAILURE_PERMANENT, code
+
+    return FAILURE_UNKNOWN, code
+
+
+class InstallError(subprocess.CalledProcessError):
+    """
+    A failed `adb install` / `adb install-multiple` call.
+
+    Subclasses CalledProcessError, so callers that only know that adb
+    failed keep working.
+
+    Attributes:
+        kind (str): Failure class (see `classify_install_output`).
+        code (str | None): `INSTALL_FAILED_*` code, if reported.
+    """
+
+    def __init__(self, returncode: int, cmd: list[str], output: str, stderr: str):
+        super().__init__(returncode, cmd, output, stderr)
+        self.kind, self.code = classify_install_output(f"{output}\n{stderr}")
+
+    def __str__(self) -> str:
+        lines = [line.strip() for line in f"{self.stderr}\n{self.output}".splitlines() if line.strip()]
+        detail = next((line for line in lines if self.code and self.code in line), None)
+        detail = detail or (lines[-1] if lines else f"adb exited with code {self.returncode}")
+
+        return f"{detail} [{self.kind}]"
@@ -0,0 +1,133 @@
+from pathlib import PurePosixPath
+from shlex import quote
+import re
+
+PARENT_SESSION_MIN_SDK = 29  # `pm install-create --multi-package` (Android 10)
+
+SESSION_ABORTED = "Not committed, atomic session aborted"
+
+_MARK_FAIL = "@@fail"
+_MARK_COMMIT = "@@commit"
+_MARK_END = "@@end"
+
+_SED_SESSION_ID = r"sed -n 's/.*\[\([0-9]*\)\].*/\1/p'"
+
+
+def build_session_script(
+        remote_dir: str,
+        apps: dict[str, list[tuple[str, int]]],
+        cleanup: bool = True,
+) -> str:
+    """
+    Build a device shell script installing several apps in one parent session.
+
+    The script creates a multi-package parent session and one child
+    session per app, writes every APK from `remote_dir` into its child,
+    attaches the children and commits the parent once. If writing any
+    child fails, all sessions are abandoned. `remote_dir` is removed at
+    the end unless `cleanup` is False.
+
+    Args:
+        remote_dir (str): Device directory holding the pushed APK files.
+        apps (dict[str, list[tuple[str, int]]]):
+            Package name → list of (file path relative to `remote_dir`, size in bytes).
+        cleanup (bool, optional):
+            Remove `remote_dir` afterwards. Defaults to True; the device
+            staging cache passes False to keep its files.
+
+    Returns:
+        str: Script for a single `adb shell` invocation. Its output is
+        understood by `parse_session_output`.
+    """
+    lines = [
+        "F=0",
+        f"P=$(pm install-create --multi-package -r | {_SED_SESSION_ID})",
+    ]
+    children = []
+
+    for idx, (package, files) in enumerate(apps.items()):
+        child = f"$C{idx}"
+        total_size = sum(size for _, size in files)
+        children.append(child)
+
+        lines.append(f"C{idx}=$(pm install-create -r -S {total_size} | {_SED_SESSION_ID})")
+
+        for file_idx, (name, size) in enumerate(files):
+            split_name = f"{file_idx}_{PurePosixPath(name).name}"
+            lines.append(
+                f"pm install-write -S {size} {child} {quote(split_name)} "
+                f"{quote(f'{remote_dir}/{name}')} >/dev/null 2>&1 "
+                f"|| {{ echo {_MARK_FAIL} {quote(package)}; F=1; }}"
+            )
+
+    children_str = " ".join(children)
+    lines += [
+        'if [ -n "$P" ] && [ $F = 0 ]; then',
+        f"  pm install-add-session $P {children_str} >/dev/null 2>&1",
+        "  O=$(pm install-commit $P 2>&1); R=$?",
+        "else",
+        f"  for S in $P {children_str}; do pm install-abandon $S >/dev/null 2>&1; done",
+        '  O="Failure [could not create or write install sessions]"; R=1',
+        "fi",
+        f"rm -rf {quote(remote_dir)}" if cleanup else ":",
+        f'echo "{_MARK_COMMIT} $R"',
+        'echo "$O"',
+        f"echo {_MARK_END}",
+    ]
+
+    return "\n".join(lines)
+
+
+def parse_session_output(output: str, packages: list[str]) -> dict[str, str | None]:
+    """
+    Map the output of a `build_session_script` run to per-child results.
+
+    Args:
+        output (str): Combined stdout of the script.
+        packages (list[str]): Packages that were part of the session.
+
+    Returns:
+        dict[str, str | None]: Package → None if committed, otherwise the
+        error message. Children that only failed because another child
+        broke the atomic session get a message starting with `SESSION_ABORTED`.
+    """
+    write_failures = set()
+    commit_code = None
+    commit_output = []
+    in_commit = False
+
+    for line in output.splitlines():
+        if line.startswith(_MARK_FAIL):
+            write_failures.add(line[len(_MARK_FAIL):].strip())
+
+        elif line.startswith(_MARK_COMMIT):
+            code = line[len(_MARK_COMMIT):].strip()
+            commit_code = int(code) if code.isdigit() else 1
+            in_commit = True
+
+        elif line.startswith(_MARK_END):
+            in_commit = False
+
+        elif in_commit and line.strip():
+            commit_output.append(line.strip())
+
+    if commit_code == 0 and not write_failures:
+        return {package: None for package in packages}
+
+    message = " ".join(commit_output) or "Unknown multi-package install failure"
+    results = {}
+
+    for package in packages:
+        # Dots belong to package names: "com.app" must not match "com.app.plugin"
+        mentioned = re.search(rf"(?<![\w.]){re.escape(package)}(?!\.?\w)", message)
+
+        if package in write_failures:
+            results[package] = f"Failed to write APKs into install session: {message}"
+
+        elif mentioned:
+            results[package] = message
+
+        else:
+            results[package] = f"{SESSION_ABORTED}: {message}"
+
+    return results
@@ -1,14 +1,26 @@
 from pathlib import Path
 from subprocess import CompletedProcess
+from typing import Iterator
+import subprocess
+import uuid
 
 from ten_utils.log import Logger
 
 from common.constants import (
+    COMPRESSION_ALGORITHMS,
     DIR_BIN_ADB,
     FILENAME_ADB_BIN,
 )
 from common.helpers import str_to_path, run_cmd
 from ._decorators import check_device_set
+from .compression import push_adaptive
+from ._failures import InstallError
+from ._multi_package import (
+    PARENT_SESSION_MIN_SDK,
+    SESSION_ABORTED,
+    build_session_script,
+    parse_session_output,
+)
 
 logger = Logger(__name__)
 
@@ -19,14 +31,16 @@ class Adb:
 
     Provides methods for:
       - Selecting a target device.
-      - Installing APKs (single or split).
+      - Installing APKs (single, split, or many apps in one atomic session).
       - Querying connected devices.
+      - Following device arrivals/removals (`adb track-devices`).
       - Listing installed packages.
 
     Attributes:
         path_adb_bin (str): Path to the adb binary.
         __command_base (list[str]): Base adb command (binary + optional device flag).
         device_set (bool): Whether a device has been set with `set_device`.
+        device (str | None): Serial of the target device, if set.
     """
 
     def __init__(
@@ -43,6 +57,7 @@ class Adb:
         self.path_adb_bin = str(path_to_adb_bin)
         self.__command_base = [self.path_adb_bin]
         self.device_set: bool = False
+        self.device: str | None = None
 
     def set_device(self, device: str) -> None:
         """
@@ -56,6 +71,7 @@ class Adb:
             "-s", device,
         ]
         self.device_set = True
+        self.device = device
 
     @check_device_set
     def install_split_apk(self, package_name: str, app_dir: Path | str) -> CompletedProcess:
@@ -68,18 +84,22 @@ class Adb:
 
         Returns:
             CompletedProcess: Result of the adb command.
+
+        Raises:
+            FileNotFoundError: If `app_dir` contains no APK files.
+            InstallError: If the install failed (see `classify_install_output`).
         """
         app_dir = str_to_path(app_dir)
         apk_files = sorted(app_dir.rglob("*.apk"))
         if not apk_files:
-            logger.critical(f"No APK files found in {app_dir}")
+            raise FileNotFoundError(f"No APK files found in {app_dir}")
 
         logger.info(f"Installing ABB ({len(apk_files)} files) for {package_name}")
 
         apk_files = [str(f) for f in apk_files]
         cmd = [*self.__command_base, "install-multiple", "-r", *apk_files]
 
-        return run_cmd(cmd)
+        return self.__run_install(cmd)
 
     @check_device_set
     def install_apk(self, source: str | Path) -> CompletedProcess:
@@ -91,20 +111,386 @@ class Adb:
 
         Returns:
             CompletedProcess: Result of the adb command.
+
+        Raises:
+            InstallError: If the install failed (see `classify_install_output`).
         """
         cmd = [*self.__command_base, "install", "-r", str(source)]
-        return run_cmd(cmd)
+        return self.__run_install(cmd)
+
+    @staticmethod
+    def __run_install(cmd: list[str]) -> CompletedProcess:
+        """
+        Run an install command and raise a classified error if it failed.
+
+        Raises:
+            InstallError: On a non-zero exit code or a `Failure [...]` answer.
+        """
+        result = run_cmd(cmd, check=False, capture_output=True)
+
+        if result.returncode != 0 or "Failure [" in result.stdout:
+            raise InstallError(result.returncode or 1, cmd, result.stdout, result.stderr)
+
+        return result
+
+    @check_device_set
+    def install_multi_package(self, apps: dict[str, Path | str]) -> dict[str, str | None]:
+        """
+        Install several apps atomically in one multi-package session.
+
+        All APK files are pushed with a single `adb push`, then one
+        `adb shell` call creates a parent session with one child session
+        per app (split APKs included), writes the children and commits
+        the parent once.
+
+        Args:
+            apps (dict[str, Path | str]):
+                Package name → APK file or directory with split APKs.
+
+        Returns:
+            dict[str, str | None]: Package → None on success, or the error message.
+            Children that were rolled back only because another child
+            failed get a message starting with `SESSION_ABORTED`.
+
+        Notes:
+            - Devices below API 29 have no parent sessions; the apps are
+              then installed one by one with `install_apk`/`install_split_apk`.
+            - APK files with identical names are pushed under unique names.
+            - Each APK is pushed with `push_adaptive`, i.e. with the transfer
+              compression `choose_compression` picks for it.
+        """
+        if self.get_sdk_level() < PARENT_SESSION_MIN_SDK:
+            logger.info(f"Device API level < {PARENT_SESSION_MIN_SDK}, installing apps one by one")
+            return self.__install_each(apps)
+
+        remote_dir = f"/data/local/tmp/packdroid-{uuid.uuid4().hex[:8]}"
+        # adb push keeps base names, so files are grouped into batches with
+        # unique names; each batch goes into its own remote subdirectory
+        push_batches: list[list[Path]] = []
+        session_apps: dict[str, list[tuple[str, int]]] = {}
+
+        for package, source in apps.items():
+            source = str_to_path(source)
+            apk_files = sorted(source.rglob("*.apk")) if source.is_dir() else [source]
+            session_apps[package] = []
+
+            for apk_file in apk_files:
+                batch_idx = next(
+                    (idx for idx, batch in enumerate(push_batches)
+                     if all(f.name != apk_file.name for f in batch)),
+                    len(push_batches),
+                )
+                if batch_idx == len(push_batches):
+                    push_batches.append([])
+
+                push_batches[batch_idx].append(apk_file)
+                session_apps[package].append((f"{batch_idx}/{apk_file.name}", apk_file.stat().st_size))
+
+        logger.info(
+            f"Installing {len(apps)} apps "
+            f"({sum(len(batch) for batch in push_batches)} APKs) in one multi-package session"
+        )
+
+        batch_dirs = [f"{remote_dir}/{idx}" for idx in range(len(push_batches))]
+        mkdir_result = self.shell("mkdir -p " + " ".join(batch_dirs), check=False)
+
+        if mkdir_result.returncode != 0:
+            message = mkdir_result.stderr.strip() or mkdir_result.stdout.strip()
+            return {package: f"Failed to create {remote_dir}: {message}" for package in apps}
+
+        # One push per file, so each gets the compression mode that suits it
+        for batch, batch_dir in zip(push_batches, batch_dirs):
+            for apk_file in batch:
+                push_result = push_adaptive(self, apk_file, f"{batch_dir}/{apk_file.name}")
+
+                if push_result.returncode != 0:
+                    self.shell(f"rm -rf {remote_dir}", check=False)
+                    message = push_result.stderr.strip() or push_result.stdout.strip()
+                    return {package: f"Failed to push APKs: {message}" for package in apps}
+
+        result = self.shell(build_session_script(remote_dir, session_apps), check=False)
+        return parse_session_output(result.stdout, list(apps))
+
+    def __install_each(self, apps: dict[str, Path | str]) -> dict[str, str | None]:
+        """
+        Install apps one by one (fallback for `install_multi_package`).
+        """
+        results = {}
+
+        for package, source in apps.items():
+            source = str_to_path(source)
+
+            try:
+                if source.is_dir():
+                    self.install_split_apk(package, source)
+
+                else:
+                    self.install_apk(source)
+
+                results[package] = None
+
+            except (subprocess.CalledProcessError, FileNotFoundError) as e:
+                results[package] = str(e)
+
+        return results
+
+    @check_device_set
+    def push(self, sources: list[Path | str], remote: str, compression: str | None = None) -> CompletedProcess:
+        """
+        Push one or more local files to the target device.
+
+        Args:
+            sources (list[Path | str]): Local files (base names must be unique).
+            remote (str): Existing device directory, or the target file
+                path when pushing a single file.
+            compression (str | None, optional):
+                Transfer compression: an algorithm ("lz4", "zstd", "brotli"),
+                "none" to disable it, or None for adb's default. Only pass a
+                value supported by both sides (see `host_compression_algorithms`
+                and `supported_algorithms`).
+                Defaults to None.
+
+        Returns:
+            CompletedProcess: Result with captured stdout/stderr.
+        """
+        flags = []
+        if compression == "none":
+            flags = ["-Z"]
+
+        elif compression is not None:
+            flags = ["-z", compression]
+
+        cmd = [*self.__command_base, "push", *flags, *[str(source) for source in sources], remote]
+        return run_cmd(cmd, check=False, capture_output=True)
+
+    @check_device_set
+    def features(self) -> set[str]:
+        """
+        Return the adb feature flags of the target device (e.g. "sendrecv_v2_zstd").
+
+        Returns:
+            set[str]: Feature names; empty if the query failed.
+        """
+        cmd = [*self.__command_base, "features"]
+        result = run_cmd(cmd, check=False, capture_output=True)
+
+        return {feature.strip() for feature in result.stdout.replace(",", "\n").splitlines() if feature.strip()}
+
+    def host_compression_algorithms(self) -> set[str]:
+        """
+        Return the push compression algorithms the host adb binary supports.
+
+        Returns:
+            set[str]: Algorithms listed for `push -z` in `adb help`; empty for
+            adb builds without transfer compression.
+        """
+        result = run_cmd([self.path_adb_bin, "help"], check=False, capture_output=True)
+        text = result.stdout + result.stderr
+
+        if "-z ALGORITHM" not in text:
+            return set()
+
+        return {algorithm for algorithm in COMPRESSION_ALGORITHMS if algorithm in text}
+
+    @check_device_set
+    def pull(self, remote: str, local: Path | str) -> CompletedProcess:
+        """
+        Copy a file from the target device to the local machine.
+
+        Args:
+            remote (str): Device file path.
+            local (Path | str): Local target path.
+
+        Returns:
+            CompletedProcess: Result with captured stdout/stderr.
+        """
+        cmd = [*self.__command_base, "pull", remote, str(local)]
+        return run_cmd(cmd, check=False, capture_output=True)
+
+    @check_device_set
+    def get_sdk_level(self) -> int:
+        """
+        Return the Android API level of the target device (0 if unknown).
+        """
+        output = self.shell("getprop ro.build.version.sdk", check=False).stdout.strip()
+        return int(output) if output.isdigit() else 0
+
+    def connect(self, endpoint: str, timeout: float | None = None) -> bool:
+        """
+        Connect the adb server to a device over TCP/IP (`adb connect`).
+
+        Args:
+            endpoint (str): Device address as "host:port".
+            timeout (float | None, optional): Give up after this many seconds. Defaults to None.
+
+        Returns:
+            bool: True if the device is connected afterwards.
+        """
+        cmd = [self.path_adb_bin, "connect", endpoint]
+
+        try:
+            result = run_cmd(cmd, check=False, capture_output=True, timeout=timeout)
 
-    def get_devices(self) -> str:
+        except subprocess.TimeoutExpired:
+            return False
+
+        return result.stdout.strip().startswith(("connected to", "already connected to"))
+
+    def disconnect(self, endpoint: str) -> None:
+        """
+        Drop a TCP/IP device connection (`adb disconnect`).
+
+        Args:
+            endpoint (str): Device address as "host:port".
+        """
+        cmd = [self.path_adb_bin, "disconnect", endpoint]
+        run_cmd(cmd, check=False, capture_output=True)
+
+    @check_device_set
+    def reconnect(self, timeout: float | None = None) -> bool:
+        """
+        Re-establish the transport of the target device after it dropped.
+
+        TCP/IP devices ("host:port" serials) are connected again with
+        `adb connect`; USB devices get `adb reconnect`, then the call
+        waits until the device is back.
+
+        Args:
+            timeout (float | None, optional): Give up after this many seconds. Defaults to None.
+
+        Returns:
+            bool: True if the device is reachable again.
+        """
+        if ":" in self.device:
+            return self.connect(self.device, timeout=timeout)
+
+        try:
+            run_cmd([*self.__command_base, "reconnect"], check=False, capture_output=True, timeout=timeout)
+            result = run_cmd([*self.__command_base, "wait-for-device"], check=False, capture_output=True, timeout=timeout)
+
+        except subprocess.TimeoutExpired:
+            return False
+
+        return result.returncode == 0
+
+    @check_device_set
+    def free_storage(self) -> None:
+        """
+        Free space on the target device before retrying an install.
+
+        Asks the package manager to trim app caches. Push directories of
+        installs running in parallel and the device staging cache are left
+        alone; `DeviceStaging.evict` frees staged files separately.
+        """
+        self.shell("pm trim-caches 1000G", check=False)
+
+    @check_device_set
+    def ping(self, timeout: float | None = None) -> bool:
+        """
+        Check that the target device answers a trivial shell command.
+
+        Args:
+            timeout (float | None, optional): Seconds to wait for the answer. Defaults to None.
+
+        Returns:
+            bool: True if the device responded.
+        """
+        try:
+            result = self.shell("echo packdroid-ping", check=False, timeout=timeout)
+
+        except subprocess.TimeoutExpired:
+            return False
+
+        return result.returncode == 0 and "packdroid-ping" in result.stdout
+
+    def get_devices(self, long: bool = False) -> str:
         """
         List all connected devices visible to adb.
 
+        Args:
+            long (bool, optional):
+                If True, run `adb devices -l`, which adds "key:value"
+                details such as the USB port path. Defaults to False.
+
         Returns:
             str: Command output (list of devices).
         """
-        cmd = [*self.__command_base, "devices"]
+        cmd = [*self.__command_base, "devices", *(["-l"] if long else [])]
         return run_cmd(cmd, check_output=True)
 
+    def track_devices(self) -> Iterator[dict[str, str]]:
+        """
+        Follow device hotplug events via `adb track-devices`.
+
+        adb pushes a new device list every time a device appears,
+        disappears or changes state, so no polling is needed.
+
+        Yields:
+            dict[str, str]: Snapshot of all known devices, serial → state
+            (e.g. "device", "offline", "unauthorized").
+
+        Notes:
+            - Each update is framed as a 4-digit hex length followed by
+              the device list in `adb devices` format.
+            - The generator ends when the adb server connection closes;
+              the adb process is killed when the generator is closed.
+        """
+        cmd = [*self.__command_base, "track-devices"]
+        logger.debug("LOCAL CMD: " + " ".join(cmd))
+
+        process = subprocess.Popen(
+            cmd,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.DEVNULL,
+        )
+
+        try:
+            while True:
+                header = process.stdout.read(4)
+                if len(header) < 4:
+                    break
+
+                payload = process.stdout.read(int(header, 16)).decode()
+                yield parse_device_states(payload)
+
+        finally:
+            process.kill()
+            process.wait()
+
+    @check_device_set
+    def shell(self, script: str, check: bool = True, timeout: float | None = None) -> CompletedProcess:
+        """
+        Run a shell script on the target device in a single adb round trip.
+
+        Args:
+            script (str): Shell command line executed by the device shell.
+            check (bool, optional):
+                If True, raise CalledProcessError on non-zero exit code.
+                Defaults to True.
+            timeout (float | None, optional):
+                Raise TimeoutExpired after this many seconds. Defaults to None.
+
+        Returns:
+            CompletedProcess: Result with captured stdout/stderr.
+        """
+        cmd = [*self.__command_base, "shell", script]
+        return run_cmd(cmd, check=check, capture_output=True, timeout=timeout)
+
+    @check_device_set
+    def uninstall(self, package_name: str) -> CompletedProcess:
+        """
+        Uninstall a package from the target device.
+
+        Args:
+            package_name (str): Name of the application package.
+
+        Returns:
+            CompletedProcess: Result of the adb command; a failed uninstall
+            is reported by its return code and output, not raised.
+        """
+        cmd = [*self.__command_base, "uninstall", package_name]
+        return run_cmd(cmd, check=False, capture_output=True)
+
     @check_device_set
     def get_packages(self) -> CompletedProcess:
         """
@@ -115,3 +501,54 @@ class Adb:
         """
         cmd = [*self.__command_base, "shell", "pm", "list", "packages"]
         return run_cmd(cmd, capture_output=True)
+
+
+def parse_device_states(output: str) -> dict[str, str]:
+    """
+    Parse an `adb devices`-style listing into a serial → state mapping.
+
+    Args:
+        output (str): Tab-separated "serial state" lines; a
+            "List of devices attached" header is ignored.
+
+    Returns:
+        dict[str, str]: Device serial → state.
+    """
+    states = {}
+
+    for line in output.splitlines():
+        parts = line.split()
+        if len(parts) < 2 or line.startswith("List of devices"):
+            continue
+
+        states[parts[0]] = parts[1]
+
+    return states
+
+
+def parse_device_details(output: str) -> dict[str, dict[str, str]]:
+    """
+    Parse `adb devices -l` output into per-device details.
+
+    Args:
+        output (str): Output of `Adb.get_devices(long=True)`.
+
+    Returns:
+        dict[str, dict[str, str]]: Device serial → "key:value" details
+        (e.g. "usb" → "1-1.2", "model", "transport_id") plus "state".
+    """
+    details = {}
+
+    for line in output.splitlines():
+        parts = line.split()
+        if len(parts) < 2 or line.startswith("List of devices"):
+            continue
+
+        details[parts[0]] = {"state": parts[1]}
+        for part in parts[2:]:
+            key, sep, value = part.partition(":")
+
+            if sep:
+                details[parts[0]][key] = value
+
+    return details
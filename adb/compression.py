@@ -0,0 +1,202 @@
+from pathlib import Path
+from subprocess import CompletedProcess
+from typing import TYPE_CHECKING
+import threading
+import time
+import zlib
+
+from ten_utils.log import Logger
+
+from common.constants import (
+    COMPRESSION_ALGORITHMS,
+    COMPRESSION_MIN_SAVING,
+    COMPRESSION_SAMPLE_BYTES,
+    COMPRESSION_SAMPLE_COUNT,
+)
+from common.helpers import str_to_path
+from common.throughput import (
+    MIN_SAMPLE_BYTES,
+    load_compression_rates,
+    load_throughput,
+    record_compression_rate,
+)
+from config import config_obj
+
+if TYPE_CHECKING:
+    from .command import Adb
+
+logger = Logger(__name__)
+
+_cache_lock = threading.Lock()
+_host_algorithms: dict[str, set[str]] = {}
+_device_algorithms: dict[str, list[str]] = {}
+_ratios: dict[tuple[str, int, int], float] = {}
+
+
+def supported_algorithms(adb: "Adb") -> list[str]:
+    """
+    Return the push compression algorithms both the host adb and the device support.
+
+    Args:
+        adb (Adb): Adb client with the target device set.
+
+    Returns:
+        list[str]: Algorithms in COMPRESSION_ALGORITHMS order; empty if
+        either side cannot compress (old adb, device without `sendrecv_v2`).
+        Queried once per process per adb binary and device.
+    """
+    with _cache_lock:
+        host = _host_algorithms.get(adb.path_adb_bin)
+        device = _device_algorithms.get(adb.device)
+
+    if host is None:
+        host = adb.host_compression_algorithms()
+
+        with _cache_lock:
+            _host_algorithms[adb.path_adb_bin] = host
+
+    if device is None:
+        features = adb.features() if host else set()
+        device = [
+            algorithm for algorithm in COMPRESSION_ALGORITHMS
+            if algorithm in host and f"sendrecv_v2_{algorithm}" in features
+        ]
+
+        with _cache_lock:
+            _device_algorithms[adb.device] = device
+
+    return device
+
+
+def estimate_ratio(path: Path | str) -> float:
+    """
+    Estimate how well a file compresses, by sampling.
+
+    Args:
+        path (Path | str): Local file.
+
+    Returns:
+        float: Compressed / original size of COMPRESSION_SAMPLE_COUNT chunks
+        spread over the file, compressed with zlib level 1 as a stand-in for
+        the fast adb codecs. Cached per file version for the process.
+
+    Notes:
+        - APKs mix deflated entries (ratio ~1.0) with stored assets and
+          native libraries that often compress well, so whole-file
+          averages vary a lot between artifacts.
+    """
+    path = str_to_path(path)
+    stat = path.stat()
+    key = (str(path.resolve()), stat.st_size, stat.st_mtime_ns)
+
+    with _cache_lock:
+        ratio = _ratios.get(key)
+
+    if ratio is not None:
+        return ratio
+
+    size = stat.st_size
+    step = max((size - COMPRESSION_SAMPLE_BYTES) // max(COMPRESSION_SAMPLE_COUNT - 1, 1), 1)
+    sampled = compressed = 0
+
+    with open(path, "rb") as f:
+        for idx in range(COMPRESSION_SAMPLE_COUNT):
+            f.seek(min(idx * step, max(size - COMPRESSION_SAMPLE_BYTES, 0)))
+            chunk = f.read(COMPRESSION_SAMPLE_BYTES)
+            if not chunk:
+                break
+
+            sampled += len(chunk)
+            compressed += len(zlib.compress(chunk, 1))
+
+            if size <= COMPRESSION_SAMPLE_BYTES:
+                break
+
+    ratio = min(compressed / sampled, 1.0) if sampled else 1.0
+
+    with _cache_lock:
+        _ratios[key] = ratio
+
+    return ratio
+
+
+def choose_compression(adb: "Adb", path: Path | str) -> str | None:
+    """
+    Pick the compression mode for pushing one file to one device.
+
+    Args:
+        adb (Adb): Adb client with the target device set.
+        path (Path | str): Local file to push.
+
+    Returns:
+        str | None: "none", an algorithm, or None if neither side supports
+        choosing (adb's default is used).
+
+    Workflow:
+        - `push_compression` other than "auto" in config.yaml is used as is
+          (falling back to "none" if the device lacks the algorithm).
+        - Files saving less than COMPRESSION_MIN_SAVING in the sample are
+          pushed uncompressed: compressing them only costs CPU.
+        - Every supported mode is tried once per device (files of at least
+          1 MB), so each has a measured rate.
+        - Then the mode with the shortest predicted time wins: estimated
+          bytes on the wire / measured wire rate of the mode. The rate of
+          "none" falls back to the device's throughput history.
+    """
+    algorithms = supported_algorithms(adb)
+    if not algorithms:
+        return None
+
+    if config_obj.push_compression != "auto":
+        mode = config_obj.push_compression
+        return mode if mode == "none" or mode in algorithms else "none"
+
+    path = str_to_path(path)
+    ratio = estimate_ratio(path)
+    if ratio > 1 - COMPRESSION_MIN_SAVING:
+        return "none"
+
+    rates = dict(load_compression_rates().get(adb.device, {}))
+    if "none" not in rates and adb.device in load_throughput():
+        rates["none"] = load_throughput()[adb.device]
+
+    modes = ["none", *algorithms]
+    untried = [mode for mode in modes if mode not in rates]
+
+    if untried and path.stat().st_size >= MIN_SAMPLE_BYTES:
+        return untried[0]
+
+    measured = [mode for mode in modes if mode in rates] or ["none"]
+    return min(measured, key=lambda mode: (1.0 if mode == "none" else ratio) / rates.get(mode, 1.0))
+
+
+def push_adaptive(adb: "Adb", path: Path | str, remote: str) -> CompletedProcess:
+    """
+    Push one file with the compression mode chosen by `choose_compression`.
+
+    Args:
+        adb (Adb): Adb client with the target device set.
+        path (Path | str): Local file.
+        remote (str): Target device path.
+
+    Returns:
+        CompletedProcess: Result of `Adb.push`.
+
+    Notes:
+        - Successful pushes add their wire rate to the device's history of
+          the mode used (`record_compression_rate`), so later choices
+          follow the measured rates.
+    """
+    path = str_to_path(path)
+    mode = choose_compression(adb, path)
+
+    started = time.monotonic()
+    result = adb.push([path], remote, compression=mode)
+    seconds = time.monotonic() - started
+
+    if result.returncode == 0 and mode is not None:
+        ratio = 1.0 if mode == "none" else estimate_ratio(path)
+        record_compression_rate(adb.device, mode, path.stat().st_size, ratio, seconds)
+        logger.debug(f"{adb.device}: pushed {path.name} with compression {mode} in {seconds:.1f}s")
+
+    return result
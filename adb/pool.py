@@ -0,0 +1,212 @@
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from subprocess import CalledProcessError
+from typing import Iterator
+import threading
+
+from ten_utils.log import Logger
+
+from common.constants import (
+    NETWORK_CONNECT_TIMEOUT,
+    NETWORK_PING_TIMEOUT,
+    NETWORK_KEEPALIVE_INTERVAL_DEFAULT,
+)
+from .command import Adb, parse_device_states
+
+logger = Logger(__name__)
+
+# Serial → number of running device operations (installs, pushes) in this process
+_busy: dict[str, int] = {}
+_busy_lock = threading.Lock()
+
+
+@contextmanager
+def device_busy(serial: str | None) -> Iterator[None]:
+    """
+    Mark a device as busy for the duration of a long operation.
+
+    `DevicePool` never reconnects a busy device: a slow Wi-Fi install
+    that does not leave room for a health-check ping must not have its
+    transport torn down.
+
+    Args:
+        serial (str | None): Device serial.
+    """
+    with _busy_lock:
+        _busy[serial] = _busy.get(serial, 0) + 1
+
+    try:
+        yield
+
+    finally:
+        with _busy_lock:
+            _busy[serial] -= 1
+            if not _busy[serial]:
+                del _busy[serial]
+
+
+def is_device_busy(serial: str) -> bool:
+    """
+    True if a `device_busy` block is running for the serial.
+    """
+    with _busy_lock:
+        return serial in _busy
+
+
+class DevicePool:
+    """
+    Managed pool of TCP/IP (wireless / Ethernet) adb devices.
+
+    Connects all endpoints in parallel, health-checks them with a cheap
+    shell ping and reconnects dropped devices from a keepalive thread.
+    Only endpoints that `adb devices` lists as offline or not at all are
+    reconnected; devices marked with `device_busy` are left alone.
+    Connected endpoints show up in `adb devices` / `adb track-devices`
+    like USB devices, so the rest of packdroid uses them unchanged.
+
+    Attributes:
+        endpoints (list[str]): Device addresses as "host:port".
+        keepalive_interval (float): Seconds between health checks.
+        healthy (dict[str, bool]): Endpoint → result of the last health check.
+    """
+
+    def __init__(
+            self,
+            endpoints: list[str],
+            keepalive_interval: float = NETWORK_KEEPALIVE_INTERVAL_DEFAULT,
+            adb: Adb | None = None,
+    ):
+        """
+        Initialize the pool.
+
+        Args:
+            endpoints (list[str]): Device addresses as "host:port".
+            keepalive_interval (float, optional):
+                Seconds between health checks. Defaults to NETWORK_KEEPALIVE_INTERVAL_DEFAULT.
+            adb (Adb | None, optional): Adb client used for connect/disconnect. Defaults to a new one.
+        """
+        self.endpoints = list(endpoints)
+        self.keepalive_interval = keepalive_interval
+        self.healthy: dict[str, bool] = {endpoint: False for endpoint in self.endpoints}
+        self.__adb = adb or Adb()
+        self.__stop = threading.Event()
+        self.__thread: threading.Thread | None = None
+
+    def __map(self, func, endpoints: list[str]) -> list:
+        """
+        Run `func` for every endpoint in parallel.
+        """
+        if not endpoints:
+            return []
+
+        with ThreadPoolExecutor(max_workers=len(endpoints)) as executor:
+            return list(executor.map(func, endpoints))
+
+    def __connect(self, endpoint: str) -> bool:
+        connected = self.__adb.connect(endpoint, timeout=NETWORK_CONNECT_TIMEOUT)
+
+        if not connected:
+            logger.warning(f"Failed to connect to {endpoint}")
+
+        return connected
+
+    def __ping(self, endpoint: str) -> bool:
+        adb = Adb(self.__adb.path_adb_bin)
+        adb.set_device(endpoint)
+        return adb.ping(timeout=NETWORK_PING_TIMEOUT)
+
+    def __check(self, endpoint: str, state: str | None) -> bool:
+        """
+        Ping an endpoint and reconnect it if adb lost its transport.
+
+        Args:
+            endpoint (str): Device address.
+            state (str | None): State listed by `adb devices`, None if not listed.
+        """
+        if is_device_busy(endpoint):
+            return True
+
+        if state == "device":
+            if self.__ping(endpoint):
+                return True
+
+            # The transport is up: a slow answer is no reason to drop it
+            logger.warning(f"Device {endpoint} is not responding")
+            return False
+
+        logger.warning(f"Device {endpoint} is {state or 'not connected'}, reconnecting ...")
+        if state is not None:
+            self.__adb.disconnect(endpoint)
+
+        return self.__connect(endpoint) and self.__ping(endpoint)
+
+    def connect_all(self) -> list[str]:
+        """
+        Connect every endpoint in parallel.
+
+        Returns:
+            list[str]: Endpoints that are connected and answer a ping.
+        """
+        self.__map(self.__connect, self.endpoints)
+        return self.health_check()
+
+    def health_check(self) -> list[str]:
+        """
+        Ping every endpoint in parallel, reconnecting offline and missing ones.
+
+        Returns:
+            list[str]: Endpoints that are healthy after the check.
+        """
+        try:
+            states = parse_device_states(self.__adb.get_devices())
+
+        except CalledProcessError as e:
+            logger.warning(f"Failed to list devices: {e}")
+            states = {}
+
+        results = self.__map(lambda endpoint: self.__check(endpoint, states.get(endpoint)), self.endpoints)
+        self.healthy = dict(zip(self.endpoints, results))
+
+        return self.serials()
+
+    def serials(self) -> list[str]:
+        """
+        Return the adb serials of the healthy endpoints.
+        """
+        return [endpoint for endpoint, healthy in self.healthy.items() if healthy]
+
+    def __keepalive(self) -> None:
+        while not self.__stop.wait(self.keepalive_interval):
+            self.health_check()
+
+    def start(self) -> None:
+        """
+        Connect all endpoints and start the keepalive thread.
+        """
+        if not self.endpoints:
+            return
+
+        logger.info(f"Connecting {len(self.endpoints)} network device(s) ...")
+        serials = self.connect_all()
+        logger.info(f"{len(serials)}/{len(self.endpoints)} network device(s) online")
+
+        self.__stop.clear()
+        self.__thread = threading.Thread(target=self.__keepalive, name="packdroid-pool", daemon=True)
+        self.__thread.start()
+
+    def stop(self) -> None:
+        """
+        Stop the keepalive thread. Connections are left open.
+        """
+        self.__stop.set()
+
+        if self.__thread is not None:
+            self.__thread.join()
+            self.__thread = None
+
+    def __enter__(self) -> "DevicePool":
+        self.start()
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb) -> None:
+        self.stop()
@@ -0,0 +1,396 @@
+from pathlib import Path, PurePosixPath
+from shlex import quote
+from typing import TYPE_CHECKING
+
+from ten_utils.log import Logger
+
+from common.constants import (
+    DEVICE_DIR_STAGING,
+    DEVICE_SELECT_HASHER,
+    DEVICE_STAGING_MAX_BYTES_DEFAULT,
+    DEVICE_STAGING_MIN_SDK,
+)
+from common.helpers import sha256_file_cached, str_to_path
+from ._failures import InstallError
+from .compression import push_adaptive
+from ._multi_package import (
+    PARENT_SESSION_MIN_SDK,
+    _SED_SESSION_ID,
+    build_session_script,
+    parse_session_output,
+)
+from .command import Adb
+
+if TYPE_CHECKING:
+    from artifact_server import ArtifactServer
+
+logger = Logger(__name__)
+
+MANIFEST_NAME = "manifest"
+
+# First HTTP client available on the device; stock builds usually have none
+_QUERY_FETCH_TOOL = (
+    "for t in curl wget; do command -v $t >/dev/null 2>&1 && { echo $t; exit 0; }; done; "
+    "busybox --list 2>/dev/null | grep -qx wget && echo 'busybox wget'"
+)
+
+# Download commands per tool; curl and busybox wget resume a leftover `.part` file
+_FETCH_COMMANDS = {
+    "curl": "curl -sf -C - -o {out} {url}",
+    "wget": "wget -q -O {out} {url}",
+    "busybox wget": "busybox wget -q -c -O {out} {url}",
+}
+
+
+class DeviceStaging:
+    """
+    Content-addressed APK cache on the device, under DEVICE_DIR_STAGING.
+
+    Every APK is stored as `<sha256>.apk`. A manifest on the device lists
+    `<sha256> <size>` per staged file in least-recently-used order.
+    Installs write the staged copies into a `pm` session on the device,
+    so an APK is pushed over USB only the first time a device sees it,
+    and again after it changes. Reinstalling after an app wipe that keeps
+    /data/local/tmp costs no transfer.
+
+    With an `ArtifactServer`, missing APKs are not pushed: the device
+    downloads them itself over the LAN, all in parallel, and adb only
+    carries the control commands. APKs the device could not download are
+    pushed as usual.
+
+    Attributes:
+        adb (Adb): Adb client with the target device set.
+        max_bytes (int): Size limit of the cache; LRU files are evicted.
+        server (ArtifactServer | None): Server the device downloads missing APKs from.
+        pushed_bytes (int): Bytes actually pushed by this instance.
+        fetched_bytes (int): Bytes the device downloaded from `server`.
+    """
+
+    def __init__(
+            self,
+            adb: Adb,
+            max_bytes: int = DEVICE_STAGING_MAX_BYTES_DEFAULT,
+            server: "ArtifactServer | None" = None,
+    ):
+        """
+        Initialize the staging cache client.
+
+        Args:
+            adb (Adb): Adb client with the target device set.
+            max_bytes (int, optional): Cache size limit in bytes.
+                Defaults to DEVICE_STAGING_MAX_BYTES_DEFAULT.
+            server (ArtifactServer | None, optional): Artifact server reachable
+                from the device. Defaults to None (push everything over adb).
+        """
+        self.adb = adb
+        self.max_bytes = max_bytes
+        self.server = server
+        self.pushed_bytes = 0
+        self.fetched_bytes = 0
+        self.__sdk_level: int | None = None
+        self.__fetch_tool: str | None = None
+
+    @property
+    def sdk_level(self) -> int:
+        """
+        API level of the device, read once.
+        """
+        if self.__sdk_level is None:
+            self.__sdk_level = self.adb.get_sdk_level()
+
+        return self.__sdk_level
+
+    @property
+    def supported(self) -> bool:
+        """
+        True if the device can install from staged files (API 21+).
+        """
+        return self.sdk_level >= DEVICE_STAGING_MIN_SDK
+
+    @property
+    def fetch_tool(self) -> str | None:
+        """
+        HTTP client usable on the device ("curl", "wget", "busybox wget"), read once.
+        """
+        if self.__fetch_tool is None:
+            tool = self.adb.shell(_QUERY_FETCH_TOOL, check=False).stdout.strip()
+            self.__fetch_tool = tool if tool in _FETCH_COMMANDS else ""
+
+        return self.__fetch_tool or None
+
+    def fetch(self, files: dict[str, Path]) -> list[str]:
+        """
+        Let the device download files from the artifact server in parallel.
+
+        Args:
+            files (dict[str, Path]): SHA-256 digest → local file to stage.
+
+        Returns:
+            list[str]: Digests downloaded to `<sha256>.apk.part` whose
+            on-device SHA-256 matches. Empty if there is no server, no HTTP
+            client on the device or no host address reachable from it. One
+            shell call for all files.
+
+        Notes:
+            - Downloads that are truncated, corrupted, or cannot be hashed on
+              the device are deleted, so they are pushed over adb instead.
+        """
+        if self.server is None or not files or self.fetch_tool is None:
+            return []
+
+        urls = {digest: self.server.url_for(file, self.adb.device) for digest, file in files.items()}
+        if None in urls.values():
+            logger.warning(f"{self.adb.device}: no host address reachable from the device, pushing over adb")
+            return []
+
+        command = _FETCH_COMMANDS[self.fetch_tool]
+        lines = [
+            f"cd {quote(DEVICE_DIR_STAGING)}",
+            *[
+                f"({command.format(out=f'{digest}.apk.part', url=quote(url))}) >/dev/null 2>&1 &"
+                for digest, url in urls.items()
+            ],
+            "wait",
+            DEVICE_SELECT_HASHER,
+            f"for h in {' '.join(urls)}; do set -- $($H $h.apk.part 2>/dev/null); "
+            f'if [ "$1" = "$h" ]; then echo $h; else rm -f $h.apk.part; fi; done',
+        ]
+        output = self.adb.shell("\n".join(lines), check=False).stdout
+
+        fetched = []
+        for line in output.splitlines():
+            digest = line.strip()
+
+            if digest in files and digest not in fetched:
+                fetched.append(digest)
+                self.fetched_bytes += files[digest].stat().st_size
+
+        logger.info(f"{self.adb.device}: downloaded {len(fetched)}/{len(files)} APK(s) from the artifact server")
+        return fetched
+
+    def query(self) -> list[tuple[str, int]]:
+        """
+        Read the manifest, keeping only entries whose file is intact.
+
+        Returns:
+            list[tuple[str, int]]: (sha256, size) of staged files, least
+            recently used first. One shell call.
+        """
+        script = (
+            f"cd {quote(DEVICE_DIR_STAGING)} 2>/dev/null && "
+            f"while read h s; do "
+            f'[ "$(stat -c %s "$h.apk" 2>/dev/null)" = "$s" ] && echo "$h $s"; '
+            f"done < {MANIFEST_NAME}"
+        )
+        output = self.adb.shell(script, check=False).stdout
+
+        entries = []
+        for line in output.splitlines():
+            digest, _, size = line.strip().partition(" ")
+
+            if len(digest) == 64 and size.isdigit():
+                entries.append((digest, int(size)))
+
+        return entries
+
+    def stage(self, files: list[Path]) -> dict[Path, str]:
+        """
+        Make sure `files` are staged on the device, pushing only missing ones.
+
+        Args:
+            files (list[Path]): Local APK files.
+
+        Returns:
+            dict[Path, str]: Local file → staged device path.
+
+        Workflow:
+            - Hashes the local files (once per process per file version).
+            - Reads the device manifest in one shell call.
+            - With a `server`, the device downloads the missing files to
+              `<sha256>.apk.part` in parallel (see `fetch`).
+            - Pushes each missing file that was not downloaded to
+              `<sha256>.apk.part`, compressed as `push_adaptive` decides.
+            - In one shell call, renames pushed files into place, evicts least
+              recently used files over `max_bytes` and rewrites the manifest
+              with the used files as most recently used.
+        """
+        digests = {file: sha256_file_cached(file) for file in files}
+        staged = self.query()
+        staged_digests = {digest for digest, _ in staged}
+
+        missing = {digest: file for file, digest in digests.items() if digest not in staged_digests}
+        pushed = []
+
+        if missing:
+            self.adb.shell(f"mkdir -p {quote(DEVICE_DIR_STAGING)}", check=False)
+
+        fetched = self.fetch(missing)
+        pushed.extend(fetched)
+
+        for digest, file in missing.items():
+            if digest in fetched:
+                continue
+
+            result = push_adaptive(self.adb, file, f"{DEVICE_DIR_STAGING}/{digest}.apk.part")
+
+            if result.returncode != 0:
+                # Drop only this call's partial files; the staged cache stays intact
+                parts = " ".join(f"{part}.apk.part" for part in [*pushed, digest])
+                self.adb.shell(f"cd {quote(DEVICE_DIR_STAGING)} && rm -f {parts}", check=False)
+                raise InstallError(result.returncode, ["adb", "push", str(file)], result.stdout, result.stderr)
+
+            pushed.append(digest)
+            self.pushed_bytes += file.stat().st_size
+
+        logger.info(
+            f"{self.adb.device}: {len(set(digests.values())) - len(missing)} APK(s) already staged, "
+            f"{len(missing) - len(fetched)} pushed, {len(fetched)} downloaded by the device"
+        )
+
+        # Least recently used first; the files of this install become the newest
+        used = set(digests.values())
+        sizes = {digest: size for digest, size in staged}
+        sizes.update({digest: file.stat().st_size for digest, file in missing.items()})
+        order = [digest for digest, _ in staged if digest not in used] + sorted(used)
+
+        evicted = []
+        while sum(sizes[digest] for digest in order) > self.max_bytes and order[0] not in used:
+            evicted.append(order.pop(0))
+
+        lines = [
+            f"cd {quote(DEVICE_DIR_STAGING)}",
+            *[f"mv {digest}.apk.part {digest}.apk" for digest in pushed],
+            *[f"rm -f {digest}.apk" for digest in evicted],
+            f"printf '%s\\n' {' '.join(quote(f'{digest} {sizes[digest]}') for digest in order)} "
+            f"> {MANIFEST_NAME}.tmp && mv {MANIFEST_NAME}.tmp {MANIFEST_NAME}",
+        ]
+        self.adb.shell("\n".join(lines), check=False)
+
+        return {file: f"{DEVICE_DIR_STAGING}/{digest}.apk" for file, digest in digests.items()}
+
+    def evict(self, min_bytes: int) -> int:
+        """
+        Remove least recently used staged files until `min_bytes` are freed.
+
+        Args:
+            min_bytes (int): Bytes to free on the device.
+
+        Returns:
+            int: Bytes actually freed; less than `min_bytes` if the whole
+            cache is smaller. Two shell calls (manifest read, removal).
+        """
+        staged = self.query()
+        evicted = []
+        freed = 0
+
+        for digest, size in staged:
+            if freed >= min_bytes:
+                break
+
+            evicted.append(digest)
+            freed += size
+
+        if not evicted:
+            return 0
+
+        kept = staged[len(evicted):]
+        lines = [
+            f"cd {quote(DEVICE_DIR_STAGING)}",
+            *[f"rm -f {digest}.apk" for digest in evicted],
+            f"printf '%s\\n' {' '.join(quote(f'{digest} {size}') for digest, size in kept)} "
+            f"> {MANIFEST_NAME}.tmp && mv {MANIFEST_NAME}.tmp {MANIFEST_NAME}",
+        ]
+        self.adb.shell("\n".join(lines), check=False)
+
+        logger.info(f"{self.adb.device}: evicted {len(evicted)} staged APK(s) to free space")
+        return freed
+
+    def install(self, package: str, source: Path | str) -> None:
+        """
+        Install one app (single or split APK) from staged copies.
+
+        Args:
+            package (str): Package name.
+            source (Path | str): APK file or directory with split APKs.
+
+        Raises:
+            InstallError: If staging or the install failed (classified like
+                `adb install` failures).
+        """
+        source = str_to_path(source)
+        apk_files = sorted(source.rglob("*.apk")) if source.is_dir() else [source]
+        if not apk_files:
+            raise FileNotFoundError(f"No APK files found in {source}")
+
+        remote = self.stage(apk_files)
+        total_size = sum(apk_file.stat().st_size for apk_file in apk_files)
+
+        logger.info(f"Installing {package} from device staging ({len(apk_files)} APK(s))")
+
+        lines = [
+            "F=0",
+            f"S=$(pm install-create -r -S {total_size} | {_SED_SESSION_ID})",
+            *[
+                f"pm install-write -S {apk_file.stat().st_size} $S {quote(f'{idx}_{apk_file.name}')} "
+                f"{quote(remote[apk_file])} >/dev/null 2>&1 || F=1"
+                for idx, apk_file in enumerate(apk_files)
+            ],
+            'if [ -n "$S" ] && [ $F = 0 ]; then pm install-commit $S 2>&1; '
+            'else pm install-abandon $S >/dev/null 2>&1; '
+            'echo "Failure [could not create or write install session]"; fi',
+        ]
+        result = self.adb.shell("\n".join(lines), check=False)
+
+        if "Success" not in result.stdout:
+            raise InstallError(result.returncode or 1, ["pm", "install-commit", package], result.stdout, result.stderr)
+
+    def install_many(self, apps: dict[str, Path | str]) -> dict[str, str | None]:
+        """
+        Install several apps atomically from staged copies (see `Adb.install_multi_package`).
+
+        Args:
+            apps (dict[str, Path | str]): Package name → APK file or split directory.
+
+        Returns:
+            dict[str, str | None]: Package → None on success, or the error
+            message (`SESSION_ABORTED` prefix for rolled back children).
+
+        Notes:
+            - Below API 29 the apps are installed one by one with `install`.
+        """
+        if self.sdk_level < PARENT_SESSION_MIN_SDK:
+            results = {}
+
+            for package, source in apps.items():
+                try:
+                    self.install(package, source)
+                    results[package] = None
+
+                except (InstallError, FileNotFoundError) as e:
+                    results[package] = str(e)
+
+            return results
+
+        app_files = {}
+        for package, source in apps.items():
+            source = str_to_path(source)
+            app_files[package] = sorted(source.rglob("*.apk")) if source.is_dir() else [source]
+
+        try:
+            remote = self.stage([file for files in app_files.values() for file in files])
+
+        except InstallError as e:
+            return {package: f"Failed to stage APKs: {e}" for package in apps}
+
+        session_apps = {
+            package: [
+                (PurePosixPath(remote[file]).name, file.stat().st_size)
+                for file in files
+            ]
+            for package, files in app_files.items()
+        }
+
+        logger.info(f"Installing {len(apps)} apps from device staging in one multi-package session")
+        result = self.adb.shell(build_session_script(DEVICE_DIR_STAGING, session_apps, cleanup=False), check=False)
+
+        return parse_session_output(result.stdout, list(apps))
@@ -0,0 +1,9 @@
+from .manifest import ApkInfo, read_apk_info
+from .index import ApkIndex, IndexedApk
+
+__all__ = [
+    "ApkInfo",
+    "read_apk_info",
+    "ApkIndex",
+    "IndexedApk"
+]
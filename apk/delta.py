@@ -0,0 +1,362 @@
+from pathlib import Path
+from typing import NamedTuple
+from zipfile import BadZipFile, ZipFile
+import base64
+import binascii
+import re
+import struct
+
+from pydantic import BaseModel
+from ten_utils.log import Logger
+import requests
+
+from common.helpers import sha256_file, str_to_path
+
+logger = Logger(__name__)
+
+_SIG_EOCD = 0x06054B50
+_SIG_CENTRAL = 0x02014B50
+_SIG_LOCAL = 0x04034B50
+_EOCD_SIZE = 22
+_EOCD_SEARCH = _EOCD_SIZE + 0xFFFF  # EOCD plus the longest possible zip comment
+_LOCAL_HEADER_SIZE = 30
+_HEX_SHA256 = re.compile(r"^[0-9a-fA-F]{64}$")
+
+
+class DeltaUnavailable(Exception):
+    """
+    The delta path cannot be used; the caller downloads the whole file.
+    """
+
+
+class ZipRecord(NamedTuple):
+    """
+    Central directory record of one zip entry.
+    """
+    name: str
+    crc: int
+    compress_size: int
+    method: int
+    dos_time: int
+    local_offset: int
+
+
+class DeltaStats(BaseModel):
+    """
+    Outcome of a delta download.
+
+    Attributes:
+        unchanged (bool): The remote file equals the cached one; nothing was written.
+        reused_bytes (int): Bytes copied from the cached file.
+        fetched_bytes (int): Bytes downloaded (including the central directory).
+        total_bytes (int): Size of the new file.
+    """
+    unchanged: bool = False
+    reused_bytes: int = 0
+    fetched_bytes: int = 0
+    total_bytes: int = 0
+
+
+def parse_central_directory(data: bytes, data_offset: int) -> tuple[list[ZipRecord], int, int]:
+    """
+    Parse the end of a zip file.
+
+    Args:
+        data (bytes): Trailing bytes of the file, containing the EOCD record.
+        data_offset (int): Position of `data[0]` in the file.
+
+    Returns:
+        tuple[list[ZipRecord], int, int]: Records, central directory offset
+        and size. Records are empty if the central directory is not fully
+        contained in `data` (fetch `[offset, offset + size)` and call again).
+
+    Raises:
+        DeltaUnavailable: If there is no EOCD record or the file is ZIP64.
+    """
+    eocd = data.rfind(struct.pack("<I", _SIG_EOCD))
+    if eocd < 0 or len(data) - eocd < _EOCD_SIZE:
+        raise DeltaUnavailable("no zip end of central directory record")
+
+    _, _, _, _, count, cd_size, cd_offset, _ = struct.unpack_from("<IHHHHIIH", data, eocd)
+    if cd_offset == 0xFFFFFFFF or count == 0xFFFF:
+        raise DeltaUnavailable("ZIP64 archives are not supported")
+
+    start = cd_offset - data_offset
+    if start < 0:
+        return [], cd_offset, cd_size
+
+    records = []
+    pos = start
+    for _ in range(count):
+        try:
+            (
+                signature, _, _, _, method, dos_time, dos_date, crc,
+                compress_size, _, name_len, extra_len, comment_len, _, _, _, local_offset,
+            ) = struct.unpack_from("<IHHHHHHIIIHHHHHII", data, pos)
+
+        except struct.error:
+            raise DeltaUnavailable("truncated central directory")
+
+        if signature != _SIG_CENTRAL:
+            raise DeltaUnavailable("corrupt central directory")
+
+        name = data[pos + 46:pos + 46 + name_len].decode("utf-8", "replace")
+        records.append(ZipRecord(name, crc, compress_size, method, dos_date << 16 | dos_time, local_offset))
+        pos += 46 + name_len + extra_len + comment_len
+
+    return records, cd_offset, cd_size
+
+
+def _regions(records: list[ZipRecord], cd_offset: int) -> dict[str, tuple[int, int]]:
+    """
+    Map entry name → [start, end) of its local header, data and descriptor.
+
+    The region of the last entry also covers anything up to the central
+    directory (e.g. the APK Signing Block).
+    """
+    ordered = sorted(records, key=lambda record: record.local_offset)
+    ends = [record.local_offset for record in ordered[1:]] + [cd_offset]
+
+    return {record.name: (record.local_offset, end) for record, end in zip(ordered, ends)}
+
+
+def _fetch_range(session: requests.Session, url: str, start: int, end: int) -> bytes:
+    """
+    Download bytes [start, end) of `url`.
+
+    Raises:
+        DeltaUnavailable: If the server ignores the Range header.
+    """
+    response = session.get(url, headers={"Range": f"bytes={start}-{end - 1}"}, timeout=60)
+
+    if response.status_code != 206 or len(response.content) != end - start:
+        raise DeltaUnavailable(f"server does not honour byte ranges (HTTP {response.status_code})")
+
+    return response.content
+
+
+def _published_sha256(session: requests.Session, url: str, headers: dict) -> str | None:
+    """
+    Return the SHA-256 of the whole file at `url` as published by the server.
+
+    Looks at `Repr-Digest` (RFC 9530), `Digest` (RFC 3230) and
+    `x-amz-checksum-sha256` response headers, then at a `<url>.sha256`
+    sidecar file.
+
+    Returns:
+        str | None: Hex digest, or None if the server publishes none.
+    """
+    candidates = []
+
+    for header in ("Repr-Digest", "Digest"):
+        for item in headers.get(header, "").split(","):
+            algorithm, _, value = item.strip().partition("=")
+            if algorithm.strip().lower() == "sha-256":
+                candidates.append(value.strip().strip(":"))
+
+    if headers.get("x-amz-checksum-sha256"):
+        candidates.append(headers["x-amz-checksum-sha256"].strip())
+
+    for candidate in candidates:
+        try:
+            digest = base64.b64decode(candidate, validate=True)
+
+        except binascii.Error:
+            continue
+
+        if len(digest) == 32:
+            return digest.hex()
+
+    try:
+        response = session.get(f"{url}.sha256", timeout=60)
+
+    except requests.RequestException:
+        return None
+
+    words = response.text.split() if response.status_code == 200 else []
+    return words[0].lower() if words and _HEX_SHA256.match(words[0]) else None
+
+
+def _check_local_headers(path: Path, records: list[ZipRecord]) -> None:
+    """
+    Check that every local header of a rebuilt file agrees with the central directory.
+
+    Raises:
+        DeltaUnavailable: On any mismatch.
+    """
+    with open(path, "rb") as rebuilt:
+        for record in records:
+            rebuilt.seek(record.local_offset)
+            header = rebuilt.read(_LOCAL_HEADER_SIZE)
+            if len(header) != _LOCAL_HEADER_SIZE:
+                raise DeltaUnavailable(f"rebuilt entry {record.name} is truncated")
+
+            signature, _, flags, method, dos_time, dos_date, crc, compress_size, _, name_len, _ = \
+                struct.unpack("<IHHHHHIIIHH", header)
+            name = rebuilt.read(name_len).decode("utf-8", "replace")
+
+            sizes_match = flags & 0x08 or (crc, compress_size) == (record.crc, record.compress_size)
+            if signature != _SIG_LOCAL or name != record.name or method != record.method \
+                    or (dos_date << 16 | dos_time) != record.dos_time or not sizes_match:
+                raise DeltaUnavailable(f"rebuilt entry {record.name} does not match")
+
+
+def delta_download(
+        url: str,
+        cached: Path | str,
+        target: Path | str,
+        expected_sha256: str | None = None,
+) -> DeltaStats:
+    """
+    Rebuild the zip (APK) at `url` from a cached older version plus only the changed entries.
+
+    Args:
+        url (str): Direct HTTP(S) link to the new APK. The server must
+            support HTTP range requests.
+        cached (Path | str): Previously downloaded version of the APK.
+        target (Path | str): Where the rebuilt APK is written.
+        expected_sha256 (str | None, optional): Hex SHA-256 the result must
+            have. Defaults to the digest the server publishes (see
+            `_published_sha256`).
+
+    Returns:
+        DeltaStats: Reused and fetched byte counts.
+
+    Raises:
+        DeltaUnavailable: If the delta path cannot be used, no SHA-256 is
+            known to verify the result against, or the rebuilt file fails
+            verification; `target` may then contain garbage.
+
+    Workflow:
+        - Fetches the tail of the remote file and parses its central directory
+          (one or two range requests).
+        - An entry is reused if the cached APK has an entry with the same name,
+          CRC-32, compressed size, method and timestamp whose local region
+          (header + data) has the same length. The last entry and the APK
+          Signing Block behind it always change with a new build and are fetched.
+        - Missing regions are fetched with as few range requests as possible.
+        - The result is verified: local headers against the central
+          directory, every entry's CRC-32, the total size and the SHA-256.
+          The cached file only counts as unchanged if its SHA-256 matches.
+    """
+    cached = str_to_path(cached)
+    target = str_to_path(target)
+    session = requests.Session()
+
+    response = session.get(url, headers={"Range": f"bytes=-{_EOCD_SEARCH}"}, timeout=60)
+    content_range = response.headers.get("Content-Range", "")
+    if response.status_code != 206 or "/" not in content_range:
+        raise DeltaUnavailable(f"server does not honour byte ranges (HTTP {response.status_code})")
+
+    try:
+        total = int(content_range.rsplit("/", 1)[1])
+
+    except ValueError:
+        raise DeltaUnavailable(f"server does not report the file size ({content_range})")
+
+    expected_sha256 = (expected_sha256 or _published_sha256(session, url, response.headers) or "").lower()
+    if not expected_sha256:
+        raise DeltaUnavailable("no SHA-256 to verify the result against")
+
+    tail = response.content
+    tail_offset = total - len(tail)
+    fetched = len(tail)
+
+    records, cd_offset, cd_size = parse_central_directory(tail, tail_offset)
+    if not records:
+        tail = _fetch_range(session, url, cd_offset, total)
+        tail_offset = cd_offset
+        fetched += len(tail)
+        records, cd_offset, cd_size = parse_central_directory(tail, tail_offset)
+
+    with open(cached, "rb") as cached_file:
+        cached_size = cached_file.seek(0, 2)
+        cached_file.seek(max(cached_size - _EOCD_SEARCH, 0))
+        cached_tail = cached_file.read()
+
+    cached_records, cached_cd_offset, cached_cd_size = parse_central_directory(
+        cached_tail, max(cached_size - _EOCD_SEARCH, 0)
+    )
+    if not cached_records:
+        with open(cached, "rb") as cached_file:
+            cached_file.seek(cached_cd_offset)
+            cached_tail = cached_file.read()
+
+        cached_records, cached_cd_offset, _ = parse_central_directory(cached_tail, cached_cd_offset)
+
+    new_directory = tail[cd_offset - tail_offset:]
+    if total == cached_size and cached_tail.endswith(new_directory) and sha256_file(cached) == expected_sha256:
+        return DeltaStats(unchanged=True, total_bytes=total)
+
+    regions = _regions(records, cd_offset)
+    cached_regions = _regions(cached_records, cached_cd_offset)
+    cached_by_name = {record.name: record for record in cached_records}
+    last = max(records, key=lambda record: record.local_offset, default=None)
+
+    # Plan: list of (start, end, source offset in cached file or None to fetch)
+    plan: list[tuple[int, int, int | None]] = []
+    first_offset = min((record.local_offset for record in records), default=cd_offset)
+    if first_offset > 0:
+        plan.append((0, first_offset, None))
+
+    for record in sorted(records, key=lambda record: record.local_offset):
+        start, end = regions[record.name]
+        old = cached_by_name.get(record.name)
+        reusable = (
+            record is not last
+            and old is not None
+            and (old.crc, old.compress_size, old.method, old.dos_time)
+            == (record.crc, record.compress_size, record.method, record.dos_time)
+            and cached_regions[old.name][1] - cached_regions[old.name][0] == end - start
+        )
+
+        plan.append((start, end, cached_regions[old.name][0] if reusable else None))
+
+    # Regions are contiguous, so a run of changed entries costs one request
+    merged: list[tuple[int, int, int | None]] = []
+    for start, end, source in plan:
+        if source is None and merged and merged[-1][2] is None:
+            merged[-1] = (merged[-1][0], end, None)
+
+        else:
+            merged.append((start, end, source))
+
+    stats = DeltaStats(total_bytes=total, fetched_bytes=fetched)
+
+    with open(cached, "rb") as cached_file, open(target, "wb") as out:
+        for start, end, source in merged:
+            if start >= end:
+                continue
+
+            if source is None:
+                data = _fetch_range(session, url, start, end)
+                stats.fetched_bytes += len(data)
+
+            else:
+                cached_file.seek(source)
+                data = cached_file.read(end - start)
+                stats.reused_bytes += len(data)
+
+            out.write(data)
+
+        out.write(new_directory)
+
+    if target.stat().st_size != total:
+        raise DeltaUnavailable("rebuilt file has the wrong size")
+
+    _check_local_headers(target, records)
+
+    try:
+        with ZipFile(target) as rebuilt:
+            broken = rebuilt.testzip()
+
+    except BadZipFile as e:
+        raise DeltaUnavailable(f"rebuilt file is not a valid zip: {e}")
+
+    if broken is not None:
+        raise DeltaUnavailable(f"CRC mismatch in rebuilt entry {broken}")
+
+    if sha256_file(target) != expected_sha256:
+        raise DeltaUnavailable("SHA-256 of the rebuilt file does not match")
+
+    return stats
@@ -0,0 +1,206 @@
+from pathlib import Path
+import hashlib
+import os
+
+from pydantic import BaseModel, Field
+from ten_utils.log import Logger
+
+from common.constants import DIR_APKS_INDEX
+from common.helpers import str_to_path
+from common.locks import FileLock
+from .manifest import ApkInfo, read_apk_info
+
+logger = Logger(__name__)
+
+
+class IndexedApk(BaseModel):
+    """
+    Index record of one APK file.
+
+    Attributes:
+        path (str): POSIX path relative to the repository root.
+        size (int): File size in bytes when indexed.
+        mtime_ns (int): Modification time in nanoseconds when indexed.
+        info (ApkInfo): Parsed manifest data.
+    """
+    path: str
+    size: int
+    mtime_ns: int
+    info: ApkInfo
+
+
+class IndexData(BaseModel):
+    """
+    Persisted index of a repository.
+
+    Attributes:
+        root (str): Absolute path of the indexed repository.
+        apks (dict[str, IndexedApk]): Relative path → index record.
+    """
+    root: str
+    apks: dict[str, IndexedApk] = Field(default_factory=dict)
+
+
+class ApkIndex:
+    """
+    Persistent index of a directory tree of APK files (e.g. a NAS share).
+
+    Each APK's identity is read from its binary manifest once and stored
+    in DIR_APKS_INDEX; `update` only re-reads files whose size or mtime
+    changed, so resolving a package is a dictionary lookup.
+
+    Attributes:
+        root (Path): Repository root directory.
+        path_index (Path): Location of the persisted index file.
+        data (IndexData): Loaded index.
+    """
+
+    def __init__(self, root: Path | str):
+        """
+        Load the index of `root` from disk (empty if it does not exist yet).
+
+        Args:
+            root (Path | str): Repository root directory.
+        """
+        self.root = str_to_path(root).resolve()
+        index_name = hashlib.sha1(str(self.root).encode()).hexdigest()[:16]
+        self.path_index = DIR_APKS_INDEX / f"{index_name}.json"
+        self.data = self.__load()
+
+    def __load(self) -> IndexData:
+        if self.path_index.exists():
+            try:
+                return IndexData.model_validate_json(self.path_index.read_text())
+
+            except ValueError:
+                logger.warning(f"Index {self.path_index} is corrupt, rebuilding")
+
+        return IndexData(root=str(self.root))
+
+    def __save(self) -> None:
+        partial = self.path_index.with_name(f"{self.path_index.name}.part")
+        partial.write_text(self.data.model_dump_json())
+        os.replace(partial, self.path_index)
+
+    def __walk(self) -> dict[str, os.stat_result]:
+        """
+        Return relative POSIX path → stat result of every APK under `root`.
+        """
+        found = {}
+        pending = [self.root]
+
+        while pending:
+            directory = pending.pop()
+
+            with os.scandir(directory) as entries:
+                for entry in entries:
+                    if entry.is_dir(follow_symlinks=False):
+                        pending.append(Path(entry.path))
+
+                    elif entry.name.endswith(".apk") and entry.is_file():
+                        relative = Path(entry.path).relative_to(self.root).as_posix()
+                        found[relative] = entry.stat()
+
+        return found
+
+    def update(self) -> None:
+        """
+        Bring the index in line with the repository.
+
+        New or modified APKs (by size and mtime) are parsed, removed ones
+        are dropped, unchanged ones are kept as is. Unreadable APKs are
+        logged and skipped.
+        """
+        DIR_APKS_INDEX.mkdir(parents=True, exist_ok=True)
+
+        with FileLock(self.path_index.with_suffix(".lock")):
+            self.data = self.__load()
+            found = self.__walk()
+            parsed = 0
+
+            for relative in list(self.data.apks):
+                if relative not in found:
+                    del self.data.apks[relative]
+
+            for relative, stat in found.items():
+                record = self.data.apks.get(relative)
+                if record is not None and record.size == stat.st_size and record.mtime_ns == stat.st_mtime_ns:
+                    continue
+
+                try:
+                    info = read_apk_info(self.root / relative)
+
+                except Exception as e:
+                    logger.warning(f"Skipping unreadable APK {relative}: {e}")
+                    self.data.apks.pop(relative, None)
+                    continue
+
+                self.data.apks[relative] = IndexedApk(
+                    path=relative,
+                    size=stat.st_size,
+                    mtime_ns=stat.st_mtime_ns,
+                    info=info,
+                )
+                parsed += 1
+
+            self.__save()
+
+        logger.info(f"Indexed {self.root}: {len(self.data.apks)} APK(s), {parsed} (re)parsed")
+
+    def lookup(
+            self,
+            package: str,
+            version_code: int | None = None,
+            abis: list[str] | None = None,
+    ) -> list[IndexedApk]:
+        """
+        Find the APK set (base + splits) of a package.
+
+        Args:
+            package (str): Package name.
+            version_code (int | None, optional):
+                Exact versionCode to select. Defaults to the highest indexed version.
+            abis (list[str] | None, optional):
+                If given, ABI config splits for other ABIs are left out.
+
+        Returns:
+            list[IndexedApk]: Base APK first, then splits; empty if not found.
+
+        Notes:
+            - Copies of the same APK (same package, versionCode and split
+              name) in several directories count once: the one with the
+              lowest path is used.
+        """
+        candidates = []
+        seen = set()
+
+        for record in sorted(self.data.apks.values(), key=lambda record: record.path):
+            key = (record.info.package, record.info.version_code, record.info.split)
+
+            if record.info.package == package and key not in seen:
+                seen.add(key)
+                candidates.append(record)
+
+        bases = [record for record in candidates if record.info.split is None]
+
+        if version_code is None:
+            if not bases:
+                return []
+
+            version_code = max(record.info.version_code for record in bases)
+
+        selected = [record for record in candidates if record.info.version_code == version_code]
+        base = next((record for record in selected if record.info.split is None), None)
+        if base is None:
+            return []
+
+        splits = sorted(
+            (
+                record for record in selected
+                if record.info.split is not None
+                and (not abis or not record.info.abis or set(record.info.abis) & set(abis))
+            ),
+            key=lambda record: record.info.split,
+        )
+
+        return [base, *splits]
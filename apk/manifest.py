@@ -0,0 +1,198 @@
+from pathlib import Path
+from zipfile import ZipFile
+import struct
+
+from pydantic import BaseModel, Field
+
+from common.helpers import str_to_path
+
+# Chunk types of the binary XML format (frameworks/base/libs/androidfw/ResourceTypes.h)
+RES_STRING_POOL_TYPE = 0x0001
+RES_XML_TYPE = 0x0003
+RES_XML_START_ELEMENT_TYPE = 0x0102
+RES_XML_RESOURCE_MAP_TYPE = 0x0180
+
+UTF8_FLAG = 0x100
+
+TYPE_STRING = 0x03
+TYPE_INT_DEC = 0x10
+TYPE_INT_HEX = 0x11
+
+# android:versionCode / android:versionCodeMajor, used when attribute names are stripped
+ATTR_VERSION_CODE = 0x0101021B
+ATTR_VERSION_CODE_MAJOR = 0x01010576
+
+ABI_SPLIT_NAMES = {
+    "arm64_v8a": "arm64-v8a",
+    "armeabi_v7a": "armeabi-v7a",
+    "armeabi": "armeabi",
+    "x86": "x86",
+    "x86_64": "x86_64",
+}
+
+
+class ApkInfo(BaseModel):
+    """
+    Identity of an APK file as declared by its AndroidManifest.xml.
+
+    Attributes:
+        package (str): Package name.
+        version_code (int): Full versionCode (including versionCodeMajor).
+        split (str | None): Split name, or None for a base APK.
+        abis (list[str]): ABIs of the bundled native libraries (from `lib/<abi>/`
+            entries, or from the name of a `config.<abi>` split).
+    """
+    package: str
+    version_code: int
+    split: str | None = None
+    abis: list[str] = Field(default_factory=list)
+
+
+def _read_string_pool(data: bytes, offset: int) -> list[str]:
+    """
+    Decode a ResStringPool chunk starting at `offset`.
+    """
+    (
+        _, header_size, _, string_count, _, flags, strings_start, _
+    ) = struct.unpack_from("<HHIIIIII", data, offset)
+    is_utf8 = bool(flags & UTF8_FLAG)
+    offsets = struct.unpack_from(f"<{string_count}I", data, offset + header_size)
+    base = offset + strings_start
+    strings = []
+
+    for string_offset in offsets:
+        pos = base + string_offset
+
+        if is_utf8:
+            # UTF-16 length, then UTF-8 byte length; each 1 or 2 bytes
+            pos += 2 if data[pos] & 0x80 else 1
+            length = data[pos]
+            if length & 0x80:
+                length = ((length & 0x7F) << 8) | data[pos + 1]
+                pos += 1
+            pos += 1
+            strings.append(data[pos:pos + length].decode("utf-8", errors="replace"))
+
+        else:
+            length = struct.unpack_from("<H", data, pos)[0]
+            if length & 0x8000:
+                length = ((length & 0x7FFF) << 16) | struct.unpack_from("<H", data, pos + 2)[0]
+                pos += 2
+            pos += 2
+            strings.append(data[pos:pos + length * 2].decode("utf-16-le", errors="replace"))
+
+    return strings
+
+
+def parse_manifest_attributes(data: bytes) -> dict[str, str | int]:
+    """
+    Extract the attributes of the root <manifest> element from binary XML.
+
+    Args:
+        data (bytes): Compiled AndroidManifest.xml.
+
+    Returns:
+        dict[str, str | int]: Attribute name → string or integer value.
+        Attributes whose names were stripped are keyed by their known
+        resource names ("versionCode", "versionCodeMajor") when possible.
+
+    Raises:
+        ValueError: If the data is not a binary XML document or has no root element.
+    """
+    chunk_type, header_size, _ = struct.unpack_from("<HHI", data, 0)
+    if chunk_type != RES_XML_TYPE:
+        raise ValueError("Not a binary XML document")
+
+    strings: list[str] = []
+    resource_ids: list[int] = []
+    offset = header_size
+
+    while offset + 8 <= len(data):
+        chunk_type, chunk_header_size, chunk_size = struct.unpack_from("<HHI", data, offset)
+
+        if chunk_type == RES_STRING_POOL_TYPE:
+            strings = _read_string_pool(data, offset)
+
+        elif chunk_type == RES_XML_RESOURCE_MAP_TYPE:
+            count = (chunk_size - chunk_header_size) // 4
+            resource_ids = list(struct.unpack_from(f"<{count}I", data, offset + chunk_header_size))
+
+        elif chunk_type == RES_XML_START_ELEMENT_TYPE:
+            ext = offset + chunk_header_size
+            _, _, attribute_start, attribute_size, attribute_count = struct.unpack_from("<iiHHH", data, ext)
+            attributes: dict[str, str | int] = {}
+
+            for idx in range(attribute_count):
+                pos = ext + attribute_start + idx * attribute_size
+                _, name_idx, raw_value, _, _, data_type, value = struct.unpack_from("<iiiHBBI", data, pos)
+
+                name = strings[name_idx] if 0 <= name_idx < len(strings) else ""
+                if not name and name_idx < len(resource_ids):
+                    name = {
+                        ATTR_VERSION_CODE: "versionCode",
+                        ATTR_VERSION_CODE_MAJOR: "versionCodeMajor",
+                    }.get(resource_ids[name_idx], "")
+
+                if data_type == TYPE_STRING and 0 <= raw_value < len(strings):
+                    attributes[name] = strings[raw_value]
+
+                elif data_type in (TYPE_INT_DEC, TYPE_INT_HEX):
+                    attributes[name] = value
+
+                elif raw_value >= 0 and raw_value < len(strings):
+                    attributes[name] = strings[raw_value]
+
+            # The first element is always <manifest>
+            return attributes
+
+        if chunk_size <= 0:
+            break
+
+        offset += chunk_size
+
+    raise ValueError("Binary XML document has no root element")
+
+
+def read_apk_info(path: Path | str) -> ApkInfo:
+    """
+    Read package name, versionCode, split name and ABIs from an APK.
+
+    Only AndroidManifest.xml and the zip directory are read, no aapt needed.
+
+    Args:
+        path (Path | str): Path to the APK file.
+
+    Returns:
+        ApkInfo: Parsed APK identity.
+
+    Raises:
+        ValueError: If the APK has no valid manifest.
+    """
+    path = str_to_path(path)
+
+    with ZipFile(path) as apk:
+        attributes = parse_manifest_attributes(apk.read("AndroidManifest.xml"))
+        names = apk.namelist()
+
+    if "package" not in attributes:
+        raise ValueError(f"No package name in manifest of {path}")
+
+    version_code = int(attributes.get("versionCode", 0))
+    version_code |= int(attributes.get("versionCodeMajor", 0)) << 32
+    split = attributes.get("split") or None
+
+    abis = sorted({
+        name.split("/")[1]
+        for name in names
+        if name.startswith("lib/") and name.count("/") >= 2
+    })
+    if not abis and split is not None and split.startswith("config."):
+        abi = ABI_SPLIT_NAMES.get(split[len("config."):])
+        abis = [abi] if abi else []
+
+    return ApkInfo(
+        package=str(attributes["package"]),
+        version_code=version_code,
+        split=split,
+        abis=abis,
+    )
@@ -0,0 +1,240 @@
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+import re
+import socket
+import threading
+
+from ten_utils.log import Logger
+
+from common.helpers import sha256_file_cached, str_to_path
+from config import config_obj
+
+logger = Logger(__name__)
+
+_RANGE = re.compile(r"^bytes=(\d*)-(\d*)$")
+_CHUNK_SIZE = 1024 * 1024
+
+_server: "ArtifactServer | None" = None
+_server_lock = threading.Lock()
+
+
+class ArtifactServer:
+    """
+    HTTP server that lets network devices download cached APKs themselves.
+
+    Files are published by content: `publish` hashes a local file and
+    makes it available as `/<sha256>.apk`; nothing else on the host is
+    reachable. Single byte ranges are supported, so an interrupted device
+    download resumes where it stopped. The server runs on a daemon thread
+    and serves any number of devices concurrently.
+
+    Attributes:
+        host (str): Interface the server listens on.
+        port (int): TCP port the server listens on (the actual one if 0 was requested).
+    """
+
+    def __init__(self, host: str, port: int):
+        """
+        Initialize and start the server.
+
+        Args:
+            host (str): Interface to listen on ("0.0.0.0" for all).
+            port (int): TCP port; 0 picks a free one.
+        """
+        self.__files: dict[str, Path] = {}
+        self.__lock = threading.Lock()
+
+        handler = type("BoundArtifactRequestHandler", (ArtifactRequestHandler,), {"artifact_server": self})
+        self.__server = ThreadingHTTPServer((host, port), handler)
+        self.__server.daemon_threads = True
+        self.host, self.port = self.__server.server_address[:2]
+
+        threading.Thread(target=self.__server.serve_forever, name="packdroid-artifacts", daemon=True).start()
+        logger.info(f"Artifact server listening on http://{self.host}:{self.port}")
+
+    def publish(self, path: Path | str) -> str:
+        """
+        Make a local file downloadable.
+
+        Args:
+            path (Path | str): Local APK file.
+
+        Returns:
+            str: URL path of the file (`/<sha256>.apk`).
+        """
+        path = str_to_path(path)
+        digest = sha256_file_cached(path)
+
+        with self.__lock:
+            self.__files[digest] = path
+
+        return f"/{digest}.apk"
+
+    def lookup(self, digest: str) -> Path | None:
+        """
+        Return the local file published under `digest`, or None.
+        """
+        with self.__lock:
+            return self.__files.get(digest)
+
+    def url_for(self, path: Path | str, serial: str) -> str | None:
+        """
+        Publish a file and return the URL a device downloads it from.
+
+        Args:
+            path (Path | str): Local APK file.
+            serial (str): Serial of the downloading device.
+
+        Returns:
+            str | None: Full URL, or None if no host address reachable
+            from the device is known (see `host_address_for`).
+        """
+        address = host_address_for(serial)
+        if address is None:
+            return None
+
+        return f"http://{address}:{self.port}{self.publish(path)}"
+
+    def close(self) -> None:
+        """
+        Stop serving.
+        """
+        self.__server.shutdown()
+        self.__server.server_close()
+
+
+class ArtifactRequestHandler(BaseHTTPRequestHandler):
+    """
+    HTTP handler for published artifacts.
+
+    Endpoints:
+        GET  /<sha256>.apk → file, or the requested byte range (206).
+        HEAD /<sha256>.apk → headers only.
+    """
+    artifact_server: ArtifactServer
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, format: str, *args) -> None:
+        logger.debug(format % args)
+
+    def __send_error(self, status: int, size: int | None = None) -> None:
+        self.send_response(status)
+        if size is not None:
+            self.send_header("Content-Range", f"bytes */{size}")
+
+        self.send_header("Content-Length", "0")
+        self.end_headers()
+
+    def __serve(self, body: bool) -> None:
+        name = self.path.split("?")[0].strip("/")
+        path = self.artifact_server.lookup(name.removesuffix(".apk")) if name.endswith(".apk") else None
+
+        if path is None or not path.is_file():
+            self.__send_error(404)
+            return
+
+        size = path.stat().st_size
+        start, end = 0, size - 1
+        status = 200
+
+        requested = self.headers.get("Range")
+        match = _RANGE.match(requested.strip()) if requested else None
+
+        if match and (match.group(1) or match.group(2)):
+            first, last = match.groups()
+
+            if not first:
+                start = max(size - int(last), 0)
+
+            else:
+                start = int(first)
+                end = min(int(last), size - 1) if last else size - 1
+
+            if start >= size or start > end:
+                self.__send_error(416, size)
+                return
+
+            status = 206
+
+        self.send_response(status)
+        self.send_header("Content-Type", "application/vnd.android.package-archive")
+        self.send_header("Accept-Ranges", "bytes")
+        self.send_header("Content-Length", str(end - start + 1))
+        if status == 206:
+            self.send_header("Content-Range", f"bytes {start}-{end}/{size}")
+
+        self.end_headers()
+
+        if not body:
+            return
+
+        with open(path, "rb") as f:
+            f.seek(start)
+            remaining = end - start + 1
+
+            while remaining > 0:
+                chunk = f.read(min(_CHUNK_SIZE, remaining))
+                if not chunk:
+                    break
+
+                self.wfile.write(chunk)
+                remaining -= len(chunk)
+
+    def do_GET(self) -> None:
+        self.__serve(body=True)
+
+    def do_HEAD(self) -> None:
+        self.__serve(body=False)
+
+
+def is_network_serial(serial: str | None) -> bool:
+    """
+    True if the serial is a TCP/IP adb endpoint ("host:port").
+    """
+    return serial is not None and ":" in serial
+
+
+def host_address_for(serial: str) -> str | None:
+    """
+    Return the host address a network device reaches the artifact server on.
+
+    Args:
+        serial (str): Device serial ("host:port").
+
+    Returns:
+        str | None: `lan_server_address` from config.yaml if set, otherwise
+        the local address of the route to the device's IP (no packet is
+        sent). None if neither is known (e.g. mDNS serials).
+    """
+    if config_obj.lan_server_address:
+        return config_obj.lan_server_address
+
+    device_host = serial.rsplit(":", 1)[0].strip("[]")
+
+    try:
+        family = socket.AF_INET6 if ":" in device_host else socket.AF_INET
+
+        with socket.socket(family, socket.SOCK_DGRAM) as probe:
+            probe.connect((device_host, 9))
+            address = probe.getsockname()[0]
+
+    except OSError:
+        return None
+
+    return f"[{address}]" if ":" in address else address
+
+
+def get_artifact_server() -> ArtifactServer:
+    """
+    Return the process-wide artifact server, starting it on first use.
+
+    Listens on `lan_server_host`:`lan_server_port` from config.yaml and is
+    shared by all device workers of the process.
+    """
+    global _server
+
+    with _server_lock:
+        if _server is None:
+            _server = ArtifactServer(config_obj.lan_server_host, config_obj.lan_server_port)
+
+    return _server
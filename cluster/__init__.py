@@ -0,0 +1,7 @@
+from .coordinator import Coordinator
+from .worker import Worker
+
+__all__ = [
+    "Coordinator",
+    "Worker"
+]
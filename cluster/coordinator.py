@@ -0,0 +1,384 @@
+from concurrent.futures import ThreadPoolExecutor
+from collections import defaultdict
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Callable
+import threading
+import shutil
+import json
+import time
+
+from ten_utils.log import Logger
+
+from common.constants import (
+    CLUSTER_JOB_RETENTION,
+    CLUSTER_WORKER_TIMEOUT,
+)
+from common.helpers import sha256_file_cached
+from config import config_obj
+from data_files import remote_data_path, resolve_data_file
+from install_apps import resolve_source
+from validation.sources import (
+    Sources,
+    SourceEntry,
+)
+from .protocol import (
+    Artifact,
+    ArtifactDataFile,
+    ArtifactFile,
+    ClusterJob,
+    WorkerState,
+)
+
+logger = Logger(__name__)
+
+
+class Coordinator:
+    """
+    Central node of a multi-host provisioning cluster.
+
+    Holds the `Sources` plan and the resolved artifact cache, tracks the
+    devices reported by every worker and hands out one provisioning job
+    per newly online device. Workers download artifacts from the
+    coordinator over the same HTTP API.
+
+    Attributes:
+        sources (Sources): Desired sources.
+        artifacts (dict[str, Artifact]): Package → resolved artifact manifest.
+        workers (dict[str, WorkerState]): Worker name → last reported state.
+    """
+
+    def __init__(
+            self,
+            sources: Sources,
+            resolve: Callable[[SourceEntry], Path | None] = resolve_source,
+    ):
+        """
+        Initialize the coordinator.
+
+        Args:
+            sources (Sources): Parsed `sources.yaml`.
+            resolve (Callable, optional):
+                Entry resolver, e.g. one backed by `sources.lock`.
+                Defaults to `resolve_source`.
+        """
+        self.sources = sources
+        self.__resolve = resolve
+        self.artifacts: dict[str, Artifact] = {}
+        self.workers: dict[str, WorkerState] = {}
+        self.__files: dict[tuple[str, str], Path] = {}
+        self.__jobs: dict[str, ClusterJob] = {}
+        self.__lock = threading.Lock()
+
+    def __prepare_entry(self, entry: SourceEntry) -> None:
+        source = self.__resolve(entry)
+
+        if source.is_dir():
+            paths = {path.relative_to(source).as_posix(): path for path in sorted(source.rglob("*.apk"))}
+            kind = "dir"
+
+        else:
+            paths = {source.name: source}
+            kind = "file"
+
+        files = [
+            ArtifactFile(name=name, size=path.stat().st_size, sha256=sha256_file_cached(path))
+            for name, path in paths.items()
+        ]
+
+        data_paths = {data.name: (resolve_data_file(entry.package, data), data) for data in entry.data}
+        data_artifacts = [
+            ArtifactDataFile(
+                name=name,
+                size=path.stat().st_size,
+                sha256=sha256_file_cached(path),
+                remote=remote_data_path(entry.package, data_file),
+            )
+            for name, (path, data_file) in data_paths.items()
+        ]
+
+        with self.__lock:
+            self.artifacts[entry.package] = Artifact(
+                package=entry.package,
+                kind=kind,
+                files=files,
+                entry=entry,
+                data=data_artifacts,
+            )
+            for name, path in paths.items():
+                self.__files[(entry.package, name)] = path
+
+            for name, (path, _) in data_paths.items():
+                self.__files[(entry.package, f"data/{name}")] = path
+
+    def prepare(self, max_workers: int) -> None:
+        """
+        Resolve every source and its data files into the local cache and hash them.
+
+        Entries that fail to resolve are logged and left out of all jobs.
+
+        Args:
+            max_workers (int): Number of entries resolved in parallel.
+        """
+        def prepare_entry(entry: SourceEntry) -> None:
+            try:
+                self.__prepare_entry(entry)
+
+            except Exception as e:
+                logger.error(f"Error for {entry.package}: {e}")
+
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            list(executor.map(prepare_entry, self.sources.sources))
+
+        logger.info(f"Prepared {len(self.artifacts)}/{len(self.sources.sources)} artifact(s)")
+
+    def artifact_path(self, package: str, name: str) -> Path | None:
+        """
+        Return the local path of an artifact file, or None if it is not part of any manifest.
+        """
+        return self.__files.get((package, name))
+
+    def submit(self, worker: str, serial: str, packages: list[str] | None = None, reason: str = "api") -> ClusterJob:
+        """
+        Queue a job for a device attached to `worker`.
+
+        Args:
+            worker (str): Worker name.
+            serial (str): Device serial on that worker.
+            packages (list[str] | None, optional): Packages to install. Defaults to all.
+            reason (str, optional): Origin of the job. Defaults to "api".
+
+        Returns:
+            ClusterJob: The queued job.
+        """
+        with self.__lock:
+            job = ClusterJob(worker=worker, serial=serial, packages=packages, reason=reason)
+            self.__jobs[job.id] = job
+
+        logger.info(f"Queued job {job.id} for {worker}/{serial} ({reason})")
+        return job
+
+    def heartbeat(self, worker: str, devices: list[str]) -> None:
+        """
+        Record a worker heartbeat and queue jobs for newly online devices.
+
+        Also fails the running jobs of workers that stopped sending
+        heartbeats, and drops jobs finished more than
+        CLUSTER_JOB_RETENTION seconds ago.
+
+        Args:
+            worker (str): Worker name.
+            devices (list[str]): Serials of the worker's online devices.
+        """
+        with self.__lock:
+            state = self.workers.get(worker) or WorkerState(name=worker)
+            new_devices = [serial for serial in devices if serial not in state.devices]
+            state.devices = list(devices)
+            state.last_seen = time.time()
+            self.workers[worker] = state
+
+            for job in self.__jobs.values():
+                job_worker = self.workers.get(job.worker)
+                lost = job_worker is None or time.time() - job_worker.last_seen > CLUSTER_WORKER_TIMEOUT
+                if job.status == "running" and lost:
+                    job.status = "failed"
+                    job.error = f"Worker {job.worker} stopped responding"
+                    job.finished_at = time.time()
+
+            self.__jobs = {
+                job_id: job for job_id, job in self.__jobs.items()
+                if job.finished_at is None or time.time() - job.finished_at <= CLUSTER_JOB_RETENTION
+            }
+
+        for serial in new_devices:
+            self.submit(worker, serial, reason="hotplug")
+
+    def claim(self, worker: str) -> ClusterJob | None:
+        """
+        Hand the oldest queued job of `worker` to it, with artifact manifests.
+
+        Args:
+            worker (str): Worker name.
+
+        Returns:
+            ClusterJob | None: The claimed job, or None if nothing is queued.
+        """
+        with self.__lock:
+            for job in self.__jobs.values():
+                if job.worker != worker or job.status != "queued":
+                    continue
+
+                packages = job.packages if job.packages is not None else list(self.artifacts)
+                missing = [package for package in packages if package not in self.artifacts]
+
+                job.artifacts = [self.artifacts[package] for package in packages if package in self.artifacts]
+                job.results = {package: "Source could not be resolved on the coordinator" for package in missing}
+                job.status = "running"
+                return job
+
+        return None
+
+    def report(self, job_id: str, results: dict[str, str | None], error: str | None = None) -> ClusterJob | None:
+        """
+        Store the result of a job reported by a worker.
+
+        Args:
+            job_id (str): Job identifier.
+            results (dict[str, str | None]): Package → None on success, or the error message.
+            error (str | None, optional): Job-level error. Defaults to None.
+
+        Returns:
+            ClusterJob | None: The updated job, or None if the id is unknown.
+        """
+        with self.__lock:
+            job = self.__jobs.get(job_id)
+            if job is None:
+                return None
+
+            job.results.update(results)
+            job.error = error
+            failed = error is not None or any(job.results.values())
+            job.status = "failed" if failed else "done"
+            job.finished_at = time.time()
+
+        logger.info(f"Job {job.id} on {job.worker}/{job.serial}: {job.status}")
+        return job
+
+    def jobs(self) -> list[ClusterJob]:
+        """
+        Return all jobs, oldest first.
+        """
+        with self.__lock:
+            return list(self.__jobs.values())
+
+    def status(self) -> dict:
+        """
+        Return a JSON-serializable snapshot of the cluster state.
+        """
+        counts: dict[str, int] = defaultdict(int)
+        for job in self.jobs():
+            counts[job.status] += 1
+
+        return {
+            "workers": {name: state.model_dump(mode="json") for name, state in self.workers.items()},
+            "jobs": dict(counts),
+            "artifacts": sorted(self.artifacts),
+        }
+
+    def serve_forever(self) -> None:
+        """
+        Serve the coordinator API until interrupted (Ctrl+C).
+        """
+        handler = type("BoundCoordinatorRequestHandler", (CoordinatorRequestHandler,), {"coordinator": self})
+        server = ThreadingHTTPServer((config_obj.coordinator_host, config_obj.coordinator_port), handler)
+
+        logger.info(
+            f"Coordinator listening on http://{config_obj.coordinator_host}:{config_obj.coordinator_port}"
+        )
+
+        try:
+            server.serve_forever()
+
+        except KeyboardInterrupt:
+            logger.info("Stopping coordinator ...")
+
+        finally:
+            server.server_close()
+
+
+class CoordinatorRequestHandler(BaseHTTPRequestHandler):
+    """
+    HTTP handler for the coordinator API.
+
+    Endpoints:
+        GET  /status                      → workers, job counts, artifacts.
+        GET  /jobs                        → all jobs.
+        GET  /artifacts/<package>/<name>  → raw artifact file (streamed).
+        POST /heartbeat                   → {"worker": str, "devices": [str, ...]}
+        POST /jobs/claim                  → {"worker": str}; 200 with a job or 204.
+        POST /jobs/<id>/result            → {"results": {...}, "error": str | null}
+        POST /jobs                        → {"worker": str, "serial": str, "packages": [...] | null}
+    """
+    coordinator: Coordinator
+
+    def log_message(self, format: str, *args) -> None:
+        logger.debug(format % args)
+
+    def _send_json(self, data, status: int = 200) -> None:
+        body = json.dumps(data).encode()
+
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _read_json(self) -> dict:
+        length = int(self.headers.get("Content-Length", 0))
+        return json.loads(self.rfile.read(length) or b"{}")
+
+    def do_GET(self) -> None:
+        parts = [part for part in self.path.split("?")[0].split("/") if part]
+
+        if parts == ["status"]:
+            self._send_json(self.coordinator.status())
+
+        elif parts == ["jobs"]:
+            self._send_json([job.model_dump(mode="json") for job in self.coordinator.jobs()])
+
+        elif len(parts) >= 3 and parts[0] == "artifacts":
+            path = self.coordinator.artifact_path(parts[1], "/".join(parts[2:]))
+
+            if path is None:
+                self._send_json({"error": "Unknown artifact"}, status=404)
+                return
+
+            self.send_response(200)
+            self.send_header("Content-Type", "application/vnd.android.package-archive")
+            self.send_header("Content-Length", str(path.stat().st_size))
+            self.end_headers()
+
+            with open(path, "rb") as f:
+                shutil.copyfileobj(f, self.wfile, length=1024 * 1024)
+
+        else:
+            self._send_json({"error": "Not found"}, status=404)
+
+    def do_POST(self) -> None:
+        parts = [part for part in self.path.split("?")[0].split("/") if part]
+
+        try:
+            data = self._read_json()
+
+            if parts == ["heartbeat"]:
+                self.coordinator.heartbeat(data["worker"], data["devices"])
+                self._send_json({})
+
+            elif parts == ["jobs", "claim"]:
+                job = self.coordinator.claim(data["worker"])
+
+                if job is None:
+                    self.send_response(204)
+                    self.end_headers()
+
+                else:
+                    self._send_json(job.model_dump(mode="json"))
+
+            elif len(parts) == 3 and parts[0] == "jobs" and parts[2] == "result":
+                job = self.coordinator.report(parts[1], data["results"], data.get("error"))
+
+                if job is None:
+                    self._send_json({"error": f"Unknown job {parts[1]}"}, status=404)
+
+                else:
+                    self._send_json(job.model_dump(mode="json"))
+
+            elif parts == ["jobs"]:
+                job = self.coordinator.submit(data["worker"], data["serial"], packages=data.get("packages"))
+                self._send_json(job.model_dump(mode="json"), status=202)
+
+            else:
+                self._send_json({"error": "Not found"}, status=404)
+
+        except (ValueError, KeyError, TypeError) as e:
+            self._send_json({"error": f"Bad request: {e}"}, status=400)
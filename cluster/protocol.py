@@ -0,0 +1,76 @@
+from typing import Literal
+
+from pydantic import BaseModel, Field
+
+from daemon.jobs import Job
+from validation.sources import SourceEntry
+
+
+class ArtifactFile(BaseModel):
+    """
+    A single file of a cached artifact.
+
+    Attributes:
+        name (str): POSIX path relative to the artifact root (file name for single APKs).
+        size (int): Size in bytes.
+        sha256 (str): Hex SHA-256 digest.
+    """
+    name: str
+    size: int
+    sha256: str
+
+
+class ArtifactDataFile(ArtifactFile):
+    """
+    A data file of an entry, served next to its APKs.
+
+    Attributes:
+        remote (str): Absolute target path on the device.
+    """
+    remote: str
+
+
+class Artifact(BaseModel):
+    """
+    Resolved installation source of one package, as served by the coordinator.
+
+    Attributes:
+        package (str): Package name.
+        kind (Literal["file", "dir"]): Single APK file or split-APK directory.
+        files (list[ArtifactFile]): Files making up the artifact.
+        entry (SourceEntry): Source entry the artifact was resolved from, so
+            workers keep its versionCode, data files and post-install actions.
+        data (list[ArtifactDataFile]): Data files of the entry; `name` is the
+            file name, downloaded from `/artifacts/<package>/data/<name>`.
+    """
+    package: str
+    kind: Literal["file", "dir"]
+    files: list[ArtifactFile]
+    entry: SourceEntry
+    data: list[ArtifactDataFile] = Field(default_factory=list)
+
+
+class ClusterJob(Job):
+    """
+    Provisioning job assigned to a device attached to a specific worker.
+
+    Attributes:
+        worker (str): Name of the worker host the device is attached to.
+        artifacts (list[Artifact]): Artifacts to install, filled in when the job is claimed.
+    """
+    worker: str
+    artifacts: list[Artifact] = Field(default_factory=list)
+
+
+class WorkerState(BaseModel):
+    """
+    Coordinator-side view of a worker.
+
+    Attributes:
+        name (str): Worker name.
+        devices (list[str]): Online device serials reported in the last heartbeat.
+        last_seen (float): UNIX timestamp of the last heartbeat.
+    """
+    name: str
+    devices: list[str] = Field(default_factory=list)
+    last_seen: float = 0.0
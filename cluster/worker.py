@@ -0,0 +1,242 @@
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from subprocess import CalledProcessError
+import threading
+import socket
+import shutil
+import os
+
+import requests
+from ten_utils.log import Logger
+
+from adb.command import Adb, parse_device_states
+from common.constants import (
+    DIR_APKS_REMOTE,
+    CLUSTER_HEARTBEAT_INTERVAL,
+)
+from common.helpers import sha256_file_cached
+from common.locks import artifact_lock
+from install_apps import provision_device
+from validation.sources import DataFile, SourceLocal
+from .protocol import Artifact, ArtifactFile, ClusterJob
+
+logger = Logger(__name__)
+
+
+def _inside(root: Path, name: str) -> Path:
+    """
+    Return `root / name` for a name sent by the coordinator.
+
+    Raises:
+        ValueError: If `name` is absolute or the path resolves outside `root`.
+    """
+    path = root / name
+
+    if Path(name).is_absolute() or root.resolve() not in path.resolve().parents:
+        raise ValueError(f"Refusing artifact path outside {root}: {name}")
+
+    return path
+
+
+class Worker:
+    """
+    Cluster worker provisioning the devices attached to this host.
+
+    Reports its online devices to the coordinator in periodic
+    heartbeats, claims the jobs the coordinator queues for them,
+    downloads missing artifacts from the coordinator into
+    DIR_APKS_REMOTE and installs them through the regular
+    `provision_device` path.
+
+    Attributes:
+        coordinator_url (str): Base URL of the coordinator API.
+        name (str): Worker name reported to the coordinator.
+        slots (int): Number of devices provisioned in parallel.
+    """
+
+    def __init__(self, coordinator_url: str, name: str | None = None, slots: int = 4):
+        """
+        Initialize the worker.
+
+        Args:
+            coordinator_url (str): Base URL of the coordinator, e.g. "http://10.0.0.5:8766".
+            name (str | None, optional): Worker name. Defaults to the host name.
+            slots (int, optional): Devices provisioned in parallel. Defaults to 4.
+        """
+        self.coordinator_url = coordinator_url.rstrip("/")
+        self.name = name or socket.gethostname()
+        self.slots = slots
+        self.__session = requests.Session()
+        self.__busy = threading.Semaphore(slots)
+        self.__stop = threading.Event()
+
+    def __post(self, path: str, data: dict) -> requests.Response:
+        response = self.__session.post(f"{self.coordinator_url}{path}", json=data, timeout=30)
+        response.raise_for_status()
+        return response
+
+    def __fetch_file(self, package: str, name: str, target: Path) -> None:
+        """
+        Stream one artifact file from the coordinator into `target`.
+        """
+        partial = target.with_name(f"{target.name}.part")
+        partial.parent.mkdir(parents=True, exist_ok=True)
+
+        with self.__session.get(
+                f"{self.coordinator_url}/artifacts/{package}/{name}",
+                stream=True,
+                timeout=30,
+        ) as response:
+            response.raise_for_status()
+
+            with open(partial, "wb") as f:
+                shutil.copyfileobj(response.raw, f, length=1024 * 1024)
+
+        os.replace(partial, target)
+
+    def __fetch_files(self, package: str, files: list[ArtifactFile], root: Path, prefix: str = "") -> None:
+        """
+        Download the files missing or changed under `root`, verifying their hashes.
+
+        Raises:
+            ValueError: If a file name leaves `root`, or a downloaded file
+                does not match its manifest hash.
+        """
+        for file in files:
+            target = _inside(root, file.name)
+
+            if target.is_file() and target.stat().st_size == file.size and sha256_file_cached(target) == file.sha256:
+                continue
+
+            logger.info(f"Fetching {package}/{prefix}{file.name} from coordinator ...")
+            self.__fetch_file(package, f"{prefix}{file.name}", target)
+
+            if sha256_file_cached(target) != file.sha256:
+                target.unlink()
+                raise ValueError(f"Hash mismatch for {package}/{prefix}{file.name}")
+
+    def fetch_artifact(self, artifact: Artifact) -> SourceLocal:
+        """
+        Make an artifact available locally, downloading only changed files.
+
+        Args:
+            artifact (Artifact): Artifact manifest from the coordinator.
+
+        Returns:
+            SourceLocal: Local entry for the APK file or split-APK directory,
+            with the versionCode and post-install actions of the original
+            entry and its data files downloaded next to it.
+
+        Raises:
+            ValueError: If a package or file name would write outside
+                DIR_APKS_REMOTE, or a downloaded file does not match its
+                manifest hash.
+        """
+        root = _inside(DIR_APKS_REMOTE, artifact.package)
+        data_root = _inside(DIR_APKS_REMOTE, f"{artifact.package}.data")
+        source = _inside(root, artifact.files[0].name) if artifact.kind == "file" else root
+
+        with artifact_lock(f"remote-{artifact.package}"):
+            self.__fetch_files(artifact.package, artifact.files, root)
+            self.__fetch_files(artifact.package, artifact.data, data_root, prefix="data/")
+
+            # Drop APKs of older versions so split sets are never mixed
+            expected = {file.name for file in artifact.files}
+            for path in root.rglob("*.apk"):
+                if path.relative_to(root).as_posix() not in expected:
+                    path.unlink()
+
+        return SourceLocal(
+            package=artifact.package,
+            method="local",
+            path=source,
+            version_code=artifact.entry.version_code,
+            actions=artifact.entry.actions,
+            data=[
+                DataFile(path=_inside(data_root, file.name), remote=file.remote, sha256=file.sha256)
+                for file in artifact.data
+            ],
+        )
+
+    def run_job(self, job: ClusterJob) -> None:
+        """
+        Fetch the job's artifacts, install them and report the result.
+        """
+        results: dict[str, str | None] = {}
+        entries = []
+        error = None
+
+        try:
+            for artifact in job.artifacts:
+                try:
+                    entries.append(self.fetch_artifact(artifact))
+
+                except Exception as e:
+                    logger.error(f"Error for {artifact.package}: {e}")
+                    results[artifact.package] = str(e)
+
+            adb = Adb()
+            adb.set_device(job.serial)
+            results.update(provision_device(adb, entries))
+
+        except Exception as e:
+            logger.error(f"Job {job.id} failed: {e}")
+            error = str(e)
+
+        finally:
+            self.__busy.release()
+
+        try:
+            self.__post(f"/jobs/{job.id}/result", {"results": results, "error": error})
+
+        except requests.RequestException as e:
+            logger.error(f"Failed to report job {job.id}: {e}")
+
+    def run_forever(self) -> None:
+        """
+        Heartbeat, claim and run jobs until interrupted (Ctrl+C).
+        """
+        logger.info(f"Worker {self.name} connected to {self.coordinator_url}")
+        adb = Adb()
+
+        with ThreadPoolExecutor(max_workers=self.slots) as executor:
+            try:
+                while not self.__stop.is_set():
+                    try:
+                        devices = [
+                            serial for serial, state in parse_device_states(adb.get_devices()).items()
+                            if state == "device"
+                        ]
+
+                    except CalledProcessError as e:
+                        logger.warning(f"Failed to list devices: {e}")
+                        self.__stop.wait(CLUSTER_HEARTBEAT_INTERVAL)
+                        continue
+
+                    try:
+                        self.__post("/heartbeat", {"worker": self.name, "devices": devices})
+
+                        while self.__busy.acquire(blocking=False):
+                            try:
+                                response = self.__post("/jobs/claim", {"worker": self.name})
+
+                            except requests.RequestException:
+                                self.__busy.release()
+                                raise
+
+                            if response.status_code == 204:
+                                self.__busy.release()
+                                break
+
+                            job = ClusterJob(**response.json())
+                            logger.info(f"Claimed job {job.id} for {job.serial}")
+                            executor.submit(self.run_job, job)
+
+                    except requests.RequestException as e:
+                        logger.warning(f"Coordinator unreachable: {e}")
+
+                    self.__stop.wait(CLUSTER_HEARTBEAT_INTERVAL)
+
+            except KeyboardInterrupt:
+                logger.info("Stopping worker ...")
+                self.__stop.set()
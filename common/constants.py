@@ -12,10 +12,21 @@ DIR_BIN = BASE_DIR / "bin"
 DIR_BIN_RACCOON = DIR_BIN / "raccoon"
 DIR_BIN_ADB = DIR_BIN / "adb"
 DIR_APKS = BASE_DIR / "apks"
+DIR_APKS_LOCKS = DIR_APKS / ".locks"
+DIR_APKS_PARTIAL = DIR_APKS / ".partial"
+DIR_APKS_REMOTE = DIR_APKS / ".remote"
+DIR_APKS_INDEX = DIR_APKS / ".index"
+DIR_APKS_REPO = DIR_APKS / ".repo"
+DIR_APKS_DATA = DIR_APKS / ".data"
+DIR_APKS_STATS = DIR_APKS / ".stats"
 
 # path
 PATH_CONFIG_FILE = BASE_DIR / "config.yaml"
 PATH_SOURCES_FILE = BASE_DIR / "sources.yaml"
+PATH_LOCK_FILE = BASE_DIR / "sources.lock"
+PATH_THROUGHPUT_STATS = DIR_APKS_STATS / "throughput.json"
+PATH_LINK_STATS = DIR_APKS_STATS / "links.json"
+PATH_COMPRESSION_STATS = DIR_APKS_STATS / "compression.json"
 PATHS_CHECK_DEFAULT = [
     {
         "path": DIR_BIN,
@@ -33,6 +44,14 @@ PATHS_CHECK_DEFAULT = [
         "path": DIR_APKS,
         "is_file": False,
     },
+    {
+        "path": DIR_APKS_LOCKS,
+        "is_file": False,
+    },
+    {
+        "path": DIR_APKS_PARTIAL,
+        "is_file": False,
+    },
     {
         "path": PATH_CONFIG_FILE,
         "is_file": True,
@@ -49,6 +68,62 @@ FILENAME_JAVA_BIN = "java"
 FILENAME_ADB_BIN_ZIP = "adb.zip"
 FILENAME_ADB_BIN = "adb.exe" if BASE_SYSTEM == "Windows" else "adb"
 
+# prefetch
+PREFETCH_WORKERS_DEFAULT = 4
+
+# device
+DEVICE_DIR_OBB = "/sdcard/Android/obb"
+DEVICE_DIR_STAGING = "/data/local/tmp/packdroid"
+DEVICE_STAGING_MAX_BYTES_DEFAULT = 4 * 1024 ** 3
+DEVICE_STAGING_MIN_SDK = 21  # `pm install-create` / `pm install-write` with a file path
+DEVICE_PROBE_FILE = "/data/local/tmp/packdroid-probe.bin"
+# Shell snippet setting $H to the device's SHA-256 tool; toybox ships sha256sum
+# from Android 6, older builds only have it as a toybox applet, if at all
+DEVICE_SELECT_HASHER = 'H=sha256sum; command -v sha256sum >/dev/null 2>&1 || H="toybox sha256sum"'
+
+# install retry
+INSTALL_RETRIES_DEFAULT = 2
+INSTALL_RECONNECT_TIMEOUT = 30
+
+# capacity planner
+PLAN_INSTALL_SPACE_FACTOR = 2.0  # staged APK copy + installed copy/dex on /data
+PLAN_THROUGHPUT_DEFAULT = 20 * 1024 * 1024  # bytes/s assumed for devices without history
+PLAN_THROUGHPUT_SMOOTHING = 0.3  # weight of the newest sample in the moving average
+
+# transfer compression
+COMPRESSION_ALGORITHMS = ("lz4", "zstd", "brotli")  # adb push -z, cheapest first
+COMPRESSION_SAMPLE_COUNT = 8  # chunks sampled per file to estimate compressibility
+COMPRESSION_SAMPLE_BYTES = 256 * 1024
+COMPRESSION_MIN_SAVING = 0.1  # files saving less than this are pushed uncompressed
+
+# link probe
+PROBE_PAYLOAD_MB_DEFAULT = 32
+PROBE_LATENCY_ROUNDS = 5
+PROBE_MIN_THROUGHPUT_DEFAULT = 15.0  # MB/s; USB 2.0 high speed manages ~30-40
+PROBE_MAX_LATENCY_DEFAULT = 100.0  # ms per adb shell round trip
+
+# network devices
+NETWORK_CONNECT_TIMEOUT = 10
+NETWORK_PING_TIMEOUT = 5
+NETWORK_KEEPALIVE_INTERVAL_DEFAULT = 15
+
+# daemon
+DAEMON_HOST_DEFAULT = "127.0.0.1"
+DAEMON_PORT_DEFAULT = 8765
+DAEMON_WORKERS_DEFAULT = 4
+DAEMON_JOB_HISTORY = 100  # finished jobs kept for GET /jobs
+
+# cluster
+COORDINATOR_HOST_DEFAULT = "127.0.0.1"
+COORDINATOR_PORT_DEFAULT = 8766
+CLUSTER_HEARTBEAT_INTERVAL = 5
+CLUSTER_WORKER_TIMEOUT = 30
+CLUSTER_JOB_RETENTION = 3600  # seconds finished jobs are kept for GET /jobs
+
+# LAN artifact server
+LAN_SERVER_HOST_DEFAULT = "0.0.0.0"
+LAN_SERVER_PORT_DEFAULT = 8767
+
 # web link
 WEB_LINK_DEFAULT_DOWNLOAD_BIN_RACCOON: HttpUrl = HttpUrl("https://www.dropbox.com/scl/fi/8np6usic1qu2xisgtbpsh/"
                                                          "raccoon-4.24.0.jar?rlkey="
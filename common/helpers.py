@@ -1,3 +1,4 @@
+from collections import defaultdict
 from pathlib import Path
 import sys
 import subprocess
@@ -5,6 +6,8 @@ import os
 from zipfile import ZipFile
 from typing import Type
 import json
+import hashlib
+import threading
 
 import requests
 from ten_utils.log import Logger
@@ -18,8 +21,14 @@ from common.constants import (
 
 logger = Logger(__name__)
 
+# Digests of `sha256_file_cached`, keyed by (path, size, mtime)
+_sha256_cache: dict[tuple[str, int, int], str] = {}
+_sha256_cache_lock = threading.Lock()
+# One lock per path, so concurrent callers hash a file once without blocking other files
+_sha256_path_locks: defaultdict[str, threading.Lock] = defaultdict(threading.Lock)
 
-def str_to_path(string: Path | str) -> Path | None:
+
+def str_to_path(string: Path | str) -> Path:
     """
     Convert a given input to a pathlib.Path object if possible.
 
@@ -27,12 +36,11 @@ def str_to_path(string: Path | str) -> Path | None:
         string (Path | str): Input value, either a Path object or string.
 
     Returns:
-        Path | None: A Path object if input is str,
-                     the same Path if input is already Path,
-                     or None if unsupported type.
+        Path: A Path object if input is str,
+              or the same Path if input is already Path.
 
-    Notes:
-        - Logs a critical message if the type is not supported.
+    Raises:
+        TypeError: If the type is not supported.
     """
     if isinstance(string, Path):
         return string
@@ -41,7 +49,7 @@ def str_to_path(string: Path | str) -> Path | None:
         return Path(string)
 
     else:
-        logger.critical(f"Unsupported type {type(string)}")
+        raise TypeError(f"Unsupported type {type(string)}")
 
 
 def sizeof_fmt(num: int | float) -> str:
@@ -93,12 +101,70 @@ def download_file(url: str, path: Path | str) -> None:
             f.write(data)
 
 
+def sha256_file(path: Path | str, chunk_size: int = 1024 * 1024) -> str:
+    """
+    Compute the SHA-256 digest of a file without loading it into memory.
+
+    Args:
+        path (Path | str): File to hash.
+        chunk_size (int, optional): Bytes read per iteration. Defaults to 1 MB.
+
+    Returns:
+        str: Hex digest.
+    """
+    digest = hashlib.sha256()
+
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            digest.update(chunk)
+
+    return digest.hexdigest()
+
+
+def sha256_file_cached(path: Path | str) -> str:
+    """
+    Like `sha256_file`, but hash each file version at most once per process.
+
+    Results are keyed by (resolved path, size, mtime), so a changed file is
+    hashed again. Useful when the same artifact is sent to many devices.
+
+    Args:
+        path (Path | str): File to hash.
+
+    Returns:
+        str: Hex digest.
+    """
+    path = str_to_path(path)
+    stat = path.stat()
+    key = (str(path.resolve()), stat.st_size, stat.st_mtime_ns)
+
+    with _sha256_cache_lock:
+        digest = _sha256_cache.get(key)
+        path_lock = _sha256_path_locks[key[0]]
+
+    if digest is not None:
+        return digest
+
+    with path_lock:
+        with _sha256_cache_lock:
+            digest = _sha256_cache.get(key)
+
+        if digest is None:
+            digest = sha256_file(path)
+
+            with _sha256_cache_lock:
+                _sha256_cache[key] = digest
+
+    return digest
+
+
 def run_cmd(
         cmd: list[str],
         check: bool = True,
         text: bool = True,
         check_output: bool = False,
         capture_output: bool = False,
+        timeout: float | None = None,
 ) -> subprocess.CompletedProcess | str:
     """
     Execute a local shell command with optional output capture.
@@ -119,6 +185,9 @@ def run_cmd(
         capture_output (bool, optional):
             If True, capture stdout and stderr when using subprocess.run.
             Ignored if check_output=True. Defaults to False.
+        timeout (float | None, optional):
+            Kill the command and raise TimeoutExpired after this many
+            seconds. Defaults to None (no timeout).
 
     Returns:
         subprocess.CompletedProcess | str:
@@ -140,12 +209,14 @@ def run_cmd(
             check=check,
             text=text,
             capture_output=capture_output,
+            timeout=timeout,
         )
 
     else:
         return subprocess.check_output(
             cmd,
             text=text,
+            timeout=timeout,
         )
 
 
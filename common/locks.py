@@ -0,0 +1,144 @@
+from pathlib import Path
+import os
+import time
+
+from ten_utils.log import Logger
+
+from common.constants import (
+    BASE_SYSTEM,
+    DIR_APKS_LOCKS,
+)
+from common.helpers import str_to_path
+
+if BASE_SYSTEM == "Windows":
+    import msvcrt
+
+else:
+    import fcntl
+
+logger = Logger(__name__)
+
+
+class FileLock:
+    """
+    Exclusive inter-process lock backed by an OS-level file lock.
+
+    The lock is held on an open file descriptor (`fcntl.flock` on POSIX,
+    `msvcrt.locking` on Windows), so it is released automatically by the
+    OS if the owning process dies. A crashed download therefore never
+    leaves a stale lock behind.
+
+    Attributes:
+        path (Path): Path to the lock file.
+        timeout (float | None): Maximum seconds to wait for the lock (None = forever).
+        poll_interval (float): Delay between acquisition attempts in seconds.
+    """
+
+    def __init__(
+            self,
+            path: Path | str,
+            timeout: float | None = None,
+            poll_interval: float = 0.2,
+    ):
+        """
+        Initialize the lock.
+
+        Args:
+            path (Path | str): Path to the lock file. Created if missing.
+            timeout (float | None, optional):
+                Maximum seconds to wait in `acquire`. Defaults to None (wait forever).
+            poll_interval (float, optional):
+                Delay between acquisition attempts. Defaults to 0.2 seconds.
+        """
+        self.path = str_to_path(path)
+        self.timeout = timeout
+        self.poll_interval = poll_interval
+        self.__fd: int | None = None
+
+    def __try_lock(self, fd: int) -> bool:
+        """
+        Try to take the lock on `fd` without blocking.
+
+        Returns:
+            bool: True if the lock was taken, False if another process holds it.
+        """
+        try:
+            if BASE_SYSTEM == "Windows":
+                msvcrt.locking(fd, msvcrt.LK_NBLCK, 1)
+
+            else:
+                fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+
+        except OSError:
+            return False
+
+        return True
+
+    def acquire(self) -> None:
+        """
+        Block until the lock is acquired.
+
+        Raises:
+            TimeoutError: If `timeout` is set and the lock could not be taken in time.
+        """
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        fd = os.open(self.path, os.O_RDWR | os.O_CREAT)
+        started = time.monotonic()
+        waiting_logged = False
+
+        while not self.__try_lock(fd):
+            if not waiting_logged:
+                logger.info(f"Waiting for another process to release {self.path.name} ...")
+                waiting_logged = True
+
+            if self.timeout is not None and time.monotonic() - started >= self.timeout:
+                os.close(fd)
+                raise TimeoutError(f"Timed out waiting for lock {self.path}")
+
+            time.sleep(self.poll_interval)
+
+        self.__fd = fd
+
+    def release(self) -> None:
+        """
+        Release the lock if it is held by this instance.
+        """
+        if self.__fd is None:
+            return
+
+        try:
+            if BASE_SYSTEM == "Windows":
+                os.lseek(self.__fd, 0, os.SEEK_SET)
+                msvcrt.locking(self.__fd, msvcrt.LK_UNLCK, 1)
+
+            else:
+                fcntl.flock(self.__fd, fcntl.LOCK_UN)
+
+        finally:
+            os.close(self.__fd)
+            self.__fd = None
+
+    def __enter__(self) -> "FileLock":
+        self.acquire()
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb) -> None:
+        self.release()
+
+
+def artifact_lock(name: str, timeout: float | None = None) -> FileLock:
+    """
+    Return the lock guarding a single cached artifact.
+
+    All packdroid processes on a host share DIR_APKS, so every process
+    that downloads or reads `name` must hold this lock while checking
+    and filling the cache.
+
+    Args:
+        name (str): Artifact name (usually the package name).
+        timeout (float | None, optional): See `FileLock`. Defaults to None.
+
+    Returns:
+        FileLock: Lock on DIR_APKS_LOCKS/{name}.lock (not yet acquired).
+    """
+    return FileLock(DIR_APKS_LOCKS / f"{name}.lock", timeout=timeout)
@@ -0,0 +1,140 @@
+import json
+import os
+
+from ten_utils.log import Logger
+
+from common.constants import (
+    PATH_COMPRESSION_STATS,
+    PATH_THROUGHPUT_STATS,
+    PLAN_THROUGHPUT_DEFAULT,
+    PLAN_THROUGHPUT_SMOOTHING,
+)
+from common.locks import artifact_lock
+
+logger = Logger(__name__)
+
+# Samples smaller than this are dominated by per-command overhead
+MIN_SAMPLE_BYTES = 1024 * 1024
+
+
+def load_throughput() -> dict[str, float]:
+    """
+    Load the per-device throughput history.
+
+    Returns:
+        dict[str, float]: Device serial → average transfer rate in bytes/s.
+        Empty if there is no history yet or the file is unreadable.
+    """
+    try:
+        with open(PATH_THROUGHPUT_STATS) as stats_file:
+            return {serial: float(rate) for serial, rate in json.load(stats_file).items()}
+
+    except (OSError, ValueError, AttributeError):
+        return {}
+
+
+def get_throughput(serial: str | None) -> float:
+    """
+    Return the expected transfer rate of a device in bytes/s.
+
+    Args:
+        serial (str | None): Device serial.
+
+    Returns:
+        float: Recorded average, or PLAN_THROUGHPUT_DEFAULT for unknown devices.
+    """
+    return load_throughput().get(serial, PLAN_THROUGHPUT_DEFAULT)
+
+
+def record_throughput(serial: str | None, size: int, seconds: float) -> None:
+    """
+    Add a transfer to the throughput history of a device.
+
+    Args:
+        serial (str | None): Device serial.
+        size (int): Bytes transferred (pushed or installed).
+        seconds (float): Wall time the transfer took.
+
+    Notes:
+        - Kept as an exponential moving average, so the history follows a
+          device moving to another port or cable within a few runs.
+        - The history file is updated under an artifact lock and replaced
+          atomically, so parallel device workers and processes can record
+          at the same time.
+    """
+    if serial is None or size < MIN_SAMPLE_BYTES or seconds <= 0:
+        return
+
+    rate = size / seconds
+
+    with artifact_lock("throughput"):
+        history = load_throughput()
+        previous = history.get(serial)
+        history[serial] = rate if previous is None else (
+            PLAN_THROUGHPUT_SMOOTHING * rate + (1 - PLAN_THROUGHPUT_SMOOTHING) * previous
+        )
+
+        PATH_THROUGHPUT_STATS.parent.mkdir(parents=True, exist_ok=True)
+        partial = PATH_THROUGHPUT_STATS.with_name(f"{PATH_THROUGHPUT_STATS.name}.part")
+
+        with open(partial, "w") as stats_file:
+            json.dump(history, stats_file, indent=2, sort_keys=True)
+
+        os.replace(partial, PATH_THROUGHPUT_STATS)
+
+
+def load_compression_rates() -> dict[str, dict[str, float]]:
+    """
+    Load the per-device push rates of each transfer compression mode.
+
+    Returns:
+        dict[str, dict[str, float]]: Device serial → mode ("none", "lz4", ...)
+        → average wire rate in bytes/s, i.e. compressed bytes delivered per
+        second including the time spent compressing and decompressing.
+        Empty if there is no history yet or the file is unreadable.
+    """
+    try:
+        with open(PATH_COMPRESSION_STATS) as stats_file:
+            return {
+                serial: {mode: float(rate) for mode, rate in rates.items()}
+                for serial, rates in json.load(stats_file).items()
+            }
+
+    except (OSError, ValueError, AttributeError):
+        return {}
+
+
+def record_compression_rate(serial: str | None, mode: str, size: int, ratio: float, seconds: float) -> None:
+    """
+    Add a push with one compression mode to a device's history.
+
+    Args:
+        serial (str | None): Device serial.
+        mode (str): Compression mode used ("none" or an algorithm).
+        size (int): Size of the pushed file in bytes.
+        ratio (float): Estimated compressed / original size (1.0 for "none").
+        seconds (float): Wall time the push took.
+
+    Notes:
+        - Averaged and stored like `record_throughput`.
+    """
+    if serial is None or size < MIN_SAMPLE_BYTES or seconds <= 0:
+        return
+
+    rate = size * ratio / seconds
+
+    with artifact_lock("compression"):
+        history = load_compression_rates()
+        rates = history.setdefault(serial, {})
+        previous = rates.get(mode)
+        rates[mode] = rate if previous is None else (
+            PLAN_THROUGHPUT_SMOOTHING * rate + (1 - PLAN_THROUGHPUT_SMOOTHING) * previous
+        )
+
+        PATH_COMPRESSION_STATS.parent.mkdir(parents=True, exist_ok=True)
+        partial = PATH_COMPRESSION_STATS.with_name(f"{PATH_COMPRESSION_STATS.name}.part")
+
+        with open(partial, "w") as stats_file:
+            json.dump(history, stats_file, indent=2, sort_keys=True)
+
+        os.replace(partial, PATH_COMPRESSION_STATS)
@@ -5,7 +5,9 @@ from common.helpers import yaml_load_with_pydantic_model
 from validation.config import Config
 
 
+# Library imports (see `Provisioner`) may come before `init_check_paths`
+# created config.yaml; defaults are used then and nothing is written
 config_obj = yaml_load_with_pydantic_model(
     path_to_yaml=PATH_CONFIG_FILE,
     pydantic_model=Config,
-)
+) if PATH_CONFIG_FILE.exists() else Config()
@@ -0,0 +1,8 @@
+from .service import Daemon
+from .jobs import Job, JobQueue
+
+__all__ = [
+    "Daemon",
+    "Job",
+    "JobQueue"
+]
@@ -0,0 +1,93 @@
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import TYPE_CHECKING
+import json
+
+from ten_utils.log import Logger
+
+if TYPE_CHECKING:
+    from .service import Daemon
+
+logger = Logger(__name__)
+
+
+class DaemonRequestHandler(BaseHTTPRequestHandler):
+    """
+    JSON HTTP handler for the daemon API.
+
+    Endpoints:
+        GET  /status      → devices, job counts and cached packages.
+        GET  /jobs        → all jobs.
+        GET  /jobs/<id>   → a single job.
+        POST /jobs        → queue an ad-hoc job.
+                            Body: {"serial": str, "packages": [str, ...] | null}
+    """
+    daemon: "Daemon"
+
+    def log_message(self, format: str, *args) -> None:
+        logger.debug(format % args)
+
+    def _send_json(self, data, status: int = 200) -> None:
+        body = json.dumps(data).encode()
+
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self) -> None:
+        parts = [part for part in self.path.split("?")[0].split("/") if part]
+
+        if parts == ["status"]:
+            self._send_json(self.daemon.status())
+
+        elif parts == ["jobs"]:
+            self._send_json([job.model_dump(mode="json") for job in self.daemon.jobs.list()])
+
+        elif len(parts) == 2 and parts[0] == "jobs":
+            job = self.daemon.jobs.get(parts[1])
+
+            if job is None:
+                self._send_json({"error": f"Unknown job {parts[1]}"}, status=404)
+
+            else:
+                self._send_json(job.model_dump(mode="json"))
+
+        else:
+            self._send_json({"error": "Not found"}, status=404)
+
+    def do_POST(self) -> None:
+        if self.path.rstrip("/") != "/jobs":
+            self._send_json({"error": "Not found"}, status=404)
+            return
+
+        try:
+            length = int(self.headers.get("Content-Length", 0))
+            data = json.loads(self.rfile.read(length) or b"{}")
+            # ValidationError of a malformed serial or package list is a ValueError
+            job = self.daemon.jobs.submit(data["serial"], packages=data.get("packages"), reason="api")
+
+        except (ValueError, KeyError, TypeError):
+            self._send_json(
+                {"error": "Body must be JSON with a 'serial' string and an optional 'packages' list"},
+                status=400,
+            )
+            return
+
+        self._send_json(job.model_dump(mode="json"), status=202)
+
+
+def create_api_server(daemon: "Daemon", host: str, port: int) -> ThreadingHTTPServer:
+    """
+    Create (but do not start) the daemon HTTP API server.
+
+    Args:
+        daemon (Daemon): Daemon whose state the API exposes.
+        host (str): Interface to bind.
+        port (int): TCP port to bind.
+
+    Returns:
+        ThreadingHTTPServer: Server ready for `serve_forever()`.
+    """
+    handler = type("BoundDaemonRequestHandler", (DaemonRequestHandler,), {"daemon": daemon})
+    return ThreadingHTTPServer((host, port), handler)
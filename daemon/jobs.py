@@ -0,0 +1,160 @@
+from typing import Callable, Literal
+from collections import defaultdict
+import threading
+import queue
+import time
+import uuid
+
+from pydantic import BaseModel, Field
+from ten_utils.log import Logger
+
+from common.constants import DAEMON_JOB_HISTORY
+
+logger = Logger(__name__)
+
+
+class Job(BaseModel):
+    """
+    A single provisioning job for one device.
+
+    Attributes:
+        id (str): Unique job identifier.
+        serial (str): Target device serial.
+        packages (list[str] | None): Packages to install; None means every entry in `Sources`.
+        reason (str): Why the job was created ("hotplug" or "api").
+        status (Literal["queued", "running", "done", "failed"]): Current job state.
+        results (dict[str, str | None]): Package → None on success, or the error message.
+        error (str | None): Job-level error (e.g. unknown package requested).
+        created_at (float): UNIX timestamp of job creation.
+        finished_at (float | None): UNIX timestamp of job completion.
+    """
+    id: str = Field(default_factory=lambda: uuid.uuid4().hex[:12])
+    serial: str
+    packages: list[str] | None = None
+    reason: str = "api"
+    status: Literal["queued", "running", "done", "failed"] = "queued"
+    results: dict[str, str | None] = Field(default_factory=dict)
+    error: str | None = None
+    created_at: float = Field(default_factory=time.time)
+    finished_at: float | None = None
+
+
+class JobQueue:
+    """
+    Thread pool executing provisioning jobs in FIFO order.
+
+    Jobs for different devices run in parallel (up to `workers`);
+    jobs for the same device are serialized.
+
+    Attributes:
+        workers (int): Number of worker threads.
+    """
+
+    def __init__(self, handler: Callable[[Job], None], workers: int):
+        """
+        Initialize the queue.
+
+        Args:
+            handler (Callable[[Job], None]):
+                Function executing a job. It fills `job.results`; an
+                exception marks the job as failed.
+            workers (int): Number of worker threads.
+        """
+        self.workers = workers
+        self.__handler = handler
+        self.__queue: queue.Queue[Job | None] = queue.Queue()
+        self.__jobs: dict[str, Job] = {}
+        self.__jobs_lock = threading.Lock()
+        self.__device_locks: defaultdict[str, threading.Lock] = defaultdict(threading.Lock)
+        self.__threads: list[threading.Thread] = []
+
+    def start(self) -> None:
+        """
+        Start the worker threads.
+        """
+        for idx in range(self.workers):
+            thread = threading.Thread(target=self.__work, name=f"packdroid-job-{idx}", daemon=True)
+            thread.start()
+            self.__threads.append(thread)
+
+    def stop(self) -> None:
+        """
+        Ask the worker threads to exit after their current job.
+        """
+        for _ in self.__threads:
+            self.__queue.put(None)
+
+        self.__threads.clear()
+
+    def submit(self, serial: str, packages: list[str] | None = None, reason: str = "api") -> Job:
+        """
+        Queue a job, unless an identical one is still waiting or running.
+
+        Args:
+            serial (str): Target device serial.
+            packages (list[str] | None, optional): Packages to install. Defaults to all.
+            reason (str, optional): Origin of the job. Defaults to "api".
+
+        Returns:
+            Job: The new job, or the already queued or running identical job.
+
+        Raises:
+            ValidationError: If `serial` or `packages` have the wrong type.
+
+        Notes:
+            - Only the newest DAEMON_JOB_HISTORY finished jobs are kept.
+        """
+        with self.__jobs_lock:
+            for job in self.__jobs.values():
+                if job.status in ("queued", "running") and job.serial == serial and job.packages == packages:
+                    return job
+
+            job = Job(serial=serial, packages=packages, reason=reason)
+            self.__jobs[job.id] = job
+
+            finished = [job_id for job_id, known in self.__jobs.items() if known.status in ("done", "failed")]
+            for job_id in finished[:max(len(finished) - DAEMON_JOB_HISTORY, 0)]:
+                del self.__jobs[job_id]
+
+        logger.info(f"Queued job {job.id} for {serial} ({reason})")
+        self.__queue.put(job)
+        return job
+
+    def get(self, job_id: str) -> Job | None:
+        """
+        Return a job by id, or None if unknown.
+        """
+        with self.__jobs_lock:
+            return self.__jobs.get(job_id)
+
+    def list(self) -> list[Job]:
+        """
+        Return all known jobs, oldest first.
+        """
+        with self.__jobs_lock:
+            return list(self.__jobs.values())
+
+    def __work(self) -> None:
+        """
+        Worker loop: take jobs from the queue and run them.
+        """
+        while True:
+            job = self.__queue.get()
+            if job is None:
+                return
+
+            with self.__device_locks[job.serial]:
+                job.status = "running"
+                logger.info(f"Running job {job.id} on {job.serial}")
+
+                try:
+                    self.__handler(job)
+
+                except Exception as e:
+                    logger.error(f"Job {job.id} failed: {e}")
+                    job.error = str(e)
+
+                failed = job.error is not None or any(job.results.values())
+                job.status = "failed" if failed else "done"
+                job.finished_at = time.time()
+                logger.info(f"Job {job.id} on {job.serial}: {job.status}")
@@ -0,0 +1,160 @@
+from collections import defaultdict
+from pathlib import Path
+from typing import Callable
+import threading
+
+from ten_utils.log import Logger
+
+from adb.command import Adb
+from config import config_obj
+from install_apps import resolve_source, provision_device
+from validation.sources import (
+    Sources,
+    SourceEntry,
+)
+from .api import create_api_server
+from .jobs import Job, JobQueue
+
+logger = Logger(__name__)
+
+
+class Daemon:
+    """
+    Long-running provisioning service.
+
+    Keeps the parsed `Sources` and the resolved artifact paths in memory,
+    follows device hotplug events with `adb track-devices` and queues a
+    provisioning job for every device that comes online. A local HTTP API
+    reports status and accepts ad-hoc jobs.
+
+    Attributes:
+        sources (Sources): Desired sources, parsed once at start-up.
+        jobs (JobQueue): Queue executing provisioning jobs.
+        devices (dict[str, str]): Last known device serial → state.
+    """
+
+    def __init__(
+            self,
+            sources: Sources,
+            resolve: Callable[[SourceEntry], Path | None] = resolve_source,
+    ):
+        """
+        Initialize the daemon.
+
+        Args:
+            sources (Sources): Parsed `sources.yaml`.
+            resolve (Callable, optional):
+                Entry resolver, e.g. one backed by `sources.lock`.
+                Defaults to `resolve_source`.
+        """
+        self.sources = sources
+        self.__resolve = resolve
+        self.jobs = JobQueue(self.__run_job, workers=config_obj.daemon_workers)
+        self.devices: dict[str, str] = {}
+        self.__resolved: dict[str, Path] = {}
+        self.__resolve_locks: defaultdict[str, threading.Lock] = defaultdict(threading.Lock)
+        self.__stop = threading.Event()
+
+    def resolve(self, entry: SourceEntry) -> Path | None:
+        """
+        Resolve a source entry, reusing the in-memory result when possible.
+
+        Args:
+            entry (SourceEntry): Source entry.
+
+        Returns:
+            Path | None: Path to the APK file or split-APK directory.
+        """
+        with self.__resolve_locks[entry.package]:
+            source = self.__resolved.get(entry.package)
+
+            if source is None or not source.exists():
+                source = self.__resolve(entry)
+                self.__resolved[entry.package] = source
+
+        return source
+
+    def status(self) -> dict:
+        """
+        Return a JSON-serializable snapshot of the daemon state.
+        """
+        counts: dict[str, int] = defaultdict(int)
+        for job in self.jobs.list():
+            counts[job.status] += 1
+
+        return {
+            "devices": dict(self.devices),
+            "jobs": dict(counts),
+            "cached": sorted(self.__resolved),
+        }
+
+    def __run_job(self, job: Job) -> None:
+        """
+        Provision the job's device with the requested packages.
+        """
+        entries = self.sources.sources
+
+        if job.packages is not None:
+            known = {entry.package for entry in entries}
+            unknown = [package for package in job.packages if package not in known]
+
+            if unknown:
+                raise ValueError(f"Packages not in sources: {', '.join(unknown)}")
+
+            entries = [entry for entry in entries if entry.package in job.packages]
+
+        adb = Adb()
+        adb.set_device(job.serial)
+        job.results = provision_device(adb, entries, resolve=self.resolve)
+
+    def __track_devices(self) -> None:
+        """
+        Follow hotplug events and queue a job for each newly online device.
+
+        Restarts `adb track-devices` if the adb server goes away.
+        """
+        while not self.__stop.is_set():
+            try:
+                for states in Adb().track_devices():
+                    for serial, state in states.items():
+                        if state == "device" and self.devices.get(serial) != "device":
+                            logger.info(f"Device attached: {serial}")
+                            self.jobs.submit(serial, reason="hotplug")
+
+                    for serial in self.devices.keys() - states.keys():
+                        logger.info(f"Device detached: {serial}")
+
+                    self.devices = states
+
+                    if self.__stop.is_set():
+                        break
+
+            except OSError as e:
+                logger.error(f"adb track-devices failed: {e}")
+
+            self.devices = {}
+            self.__stop.wait(1)
+
+    def serve_forever(self) -> None:
+        """
+        Start the job workers, hotplug tracking and the HTTP API,
+        and block until interrupted (Ctrl+C).
+        """
+        server = create_api_server(self, config_obj.daemon_host, config_obj.daemon_port)
+        tracker = threading.Thread(target=self.__track_devices, name="packdroid-track", daemon=True)
+
+        self.jobs.start()
+        tracker.start()
+
+        logger.info(f"Daemon API listening on http://{config_obj.daemon_host}:{config_obj.daemon_port}")
+
+        try:
+            server.serve_forever()
+
+        except KeyboardInterrupt:
+            logger.info("Stopping daemon ...")
+
+        finally:
+            self.__stop.set()
+            server.server_close()
+            self.jobs.stop()
@@ -0,0 +1,231 @@
+from pathlib import Path, PurePosixPath
+from typing import Callable
+import os
+import shlex
+import time
+
+from ten_utils.log import Logger
+
+from adb.command import Adb
+from adb.compression import push_adaptive
+from common.constants import (
+    DIR_APKS_DATA,
+    DEVICE_DIR_OBB,
+    DEVICE_SELECT_HASHER,
+)
+from common.helpers import download_file, sha256_file_cached, sizeof_fmt
+from common.locks import artifact_lock
+from common.throughput import record_throughput
+from validation.sources import (
+    DataFile,
+    SourceEntry,
+)
+
+logger = Logger(__name__)
+
+
+def remote_data_path(package: str, data: DataFile) -> str:
+    """
+    Return the absolute device path a data file is pushed to.
+
+    Args:
+        package (str): Package the data file belongs to.
+        data (DataFile): Data file definition.
+
+    Returns:
+        str: `data.remote`, or `/sdcard/Android/obb/<package>/<file name>`.
+    """
+    return data.remote or str(PurePosixPath(DEVICE_DIR_OBB) / package / data.name)
+
+
+def resolve_data_file(package: str, data: DataFile, force: bool = False) -> Path:
+    """
+    Return the local path of a data file, downloading it into the cache if needed.
+
+    Args:
+        package (str): Package the data file belongs to.
+        data (DataFile): Data file definition.
+        force (bool, optional): Download again even if cached. Defaults to False.
+
+    Returns:
+        Path: Local file to push.
+
+    Raises:
+        FileNotFoundError: If a local data file does not exist.
+
+    Notes:
+        - URL files are streamed to disk chunk by chunk into a `.part`
+          file under the artifact lock (see `download_with_url`), so
+          concurrent processes download a file only once.
+    """
+    if data.path is not None:
+        if not data.path.is_file():
+            raise FileNotFoundError(f"Data file not found: {data.path}")
+
+        return data.path
+
+    target = DIR_APKS_DATA / package / data.name
+
+    with artifact_lock(f"{package}.data.{data.name}"):
+        if not target.exists() or force:
+            target.parent.mkdir(parents=True, exist_ok=True)
+            partial = target.with_name(f"{target.name}.part")
+
+            download_file(
+                url=data.url.__str__(),
+                path=partial,
+            )
+            os.replace(partial, target)
+
+    return target
+
+
+def local_sha256(path: Path, expected: str | None = None) -> str:
+    """
+    Return the SHA-256 digest of a local file, hashing it at most once per process.
+
+    Args:
+        path (Path): Local file.
+        expected (str | None, optional): Digest declared in `sources.yaml`;
+            returned as is, without reading the file. Defaults to None.
+
+    Returns:
+        str: Lower-case hex digest.
+    """
+    if expected is not None:
+        return expected.lower()
+
+    return sha256_file_cached(path)
+
+
+def query_remote_sizes(adb: Adb, paths: list[str]) -> dict[str, int | None]:
+    """
+    Read the sizes of device files with one shell call.
+
+    Args:
+        adb (Adb): Adb client with the target device set.
+        paths (list[str]): Absolute device paths.
+
+    Returns:
+        dict[str, int | None]: Device path → size in bytes, or None if missing.
+    """
+    quoted = " ".join(shlex.quote(path) for path in paths)
+    script = f'for f in {quoted}; do echo "$(stat -c %s "$f" 2>/dev/null) $f"; done'
+    output = adb.shell(script, check=False).stdout
+
+    sizes: dict[str, int | None] = {path: None for path in paths}
+    for line in output.splitlines():
+        size, _, path = line.partition(" ")
+
+        if path in sizes and size.isdigit():
+            sizes[path] = int(size)
+
+    return sizes
+
+
+def query_remote_sha256(adb: Adb, paths: list[str]) -> dict[str, str]:
+    """
+    Hash device files on the device with one shell call.
+
+    Args:
+        adb (Adb): Adb client with the target device set.
+        paths (list[str]): Absolute device paths.
+
+    Returns:
+        dict[str, str]: Device path → hex digest. Paths that could not be
+        hashed (no `sha256sum`, not even as a toybox applet) are missing.
+    """
+    if not paths:
+        return {}
+
+    script = f"{DEVICE_SELECT_HASHER}; $H " + " ".join(shlex.quote(path) for path in paths) + " 2>/dev/null"
+    output = adb.shell(script, check=False).stdout
+
+    digests: dict[str, str] = {}
+    for line in output.splitlines():
+        digest, _, path = line.partition("  ")
+
+        if path in paths:
+            digests[path] = digest.strip().lower()
+
+    return digests
+
+
+def sync_data(
+        adb: Adb,
+        entries: list[SourceEntry],
+        resolve_data: Callable[[str, DataFile], Path] = resolve_data_file,
+) -> dict[str, str | None]:
+    """
+    Push the data files of `entries` to the device, skipping up-to-date ones.
+
+    Args:
+        adb (Adb): Adb client with the target device set.
+        entries (list[SourceEntry]): Entries whose `data` is synced.
+        resolve_data (Callable, optional):
+            Maps a package and data file to the local file.
+            Defaults to `resolve_data_file`.
+
+    Returns:
+        dict[str, str | None]: Package → None if all its data files are on
+        the device, or the first error message. Entries without data are
+        not included.
+
+    Workflow:
+        - Resolves every data file locally (downloading URL files once).
+        - Reads all device file sizes in one shell call; only files whose
+          size matches are hashed on the device, again in one call.
+        - Creates missing device directories in one call, then pushes each
+          outdated file with `adb push`, which streams it from disk, using
+          the compression mode chosen by `push_adaptive`.
+        - Every push is added to the device's throughput history.
+    """
+    results: dict[str, str | None] = {}
+    files: dict[str, tuple[str, Path, DataFile]] = {}
+
+    for entry in entries:
+        for data in entry.data:
+            try:
+                local = resolve_data(entry.package, data)
+                files[remote_data_path(entry.package, data)] = (entry.package, local, data)
+                results.setdefault(entry.package, None)
+
+            except Exception as e:
+                logger.error(f"Error for {entry.package} data {data.name}: {e}")
+                results[entry.package] = results.get(entry.package) or str(e)
+
+    if not files:
+        return results
+
+    sizes = query_remote_sizes(adb, list(files))
+    same_size = [remote for remote, (_, local, _) in files.items() if sizes[remote] == local.stat().st_size]
+    digests = query_remote_sha256(adb, same_size)
+
+    outdated = [
+        remote for remote, (_, local, data) in files.items()
+        if remote not in same_size or digests.get(remote) != local_sha256(local, data.sha256)
+    ]
+
+    logger.info(f"{adb.device}: {len(files) - len(outdated)} data file(s) up to date, {len(outdated)} to push")
+
+    if outdated:
+        parents = sorted({str(PurePosixPath(remote).parent) for remote in outdated})
+        adb.shell("mkdir -p " + " ".join(shlex.quote(parent) for parent in parents), check=False)
+
+    for remote in outdated:
+        package, local, _ = files[remote]
+        size = local.stat().st_size
+        logger.info(f"Pushing {local.name} ({sizeof_fmt(size)}) to {remote}")
+
+        started = time.monotonic()
+        result = push_adaptive(adb, local, remote)
+
+        if result.returncode != 0:
+            error = (result.stderr or result.stdout).strip() or f"adb exited with code {result.returncode}"
+            logger.error(f"Failed to push {local.name} for {package}: {error}")
+            results[package] = results.get(package) or error
+
+        else:
+            record_throughput(adb.device, size, time.monotonic() - started)
+
+    return results
@@ -1,91 +1,393 @@
 from pathlib import Path
+from typing import Callable
+from concurrent.futures import ThreadPoolExecutor
+import os
+import shutil
+import threading
+import time
 
+from requests import RequestException
 from ten_utils.log import Logger
 
-from raccoon.command import Raccoon
-from adb.command import Adb
+from raccoon.command import Raccoon, parse_version_codes
+from adb.command import Adb, SESSION_ABORTED
+from adb.staging import DeviceStaging
+from adb import (
+    InstallError,
+    device_busy,
+    classify_install_output,
+    FAILURE_PERMANENT,
+    FAILURE_STORAGE,
+    FAILURE_TRANSIENT,
+)
+from config import config_obj
+from apk.delta import DeltaUnavailable, delta_download
+from artifact_server import get_artifact_server, is_network_serial
+from apk.index import ApkIndex
+from apk.manifest import read_apk_info
+from data_files import resolve_data_file, sync_data
+from post_install import run_post_install
+from validation.sources import (
+    SourceRepository,
+    SourceEntry,
+)
 from common.constants import (
     DIR_APKS,
+    DIR_APKS_PARTIAL,
+    DIR_APKS_REPO,
+    PREFETCH_WORKERS_DEFAULT,
+    INSTALL_RECONNECT_TIMEOUT,
+    DEVICE_STAGING_MIN_SDK,
+    PLAN_INSTALL_SPACE_FACTOR,
 )
-from common.helpers import download_file, str_to_path
+from common.helpers import download_file, sha256_file, sizeof_fmt, str_to_path
+from common.locks import artifact_lock
+from common.throughput import record_throughput
+from planner import artifact_size, plan_device, query_free_space
 
 logger = Logger(__name__)
 
+# Repository indexes are refreshed once per process, then only looked up
+_repository_indexes: dict[Path, ApkIndex] = {}
+_repository_indexes_lock = threading.Lock()
+
 
-def download_with_raccoon(package: str) -> Path:
+def download_with_raccoon(package: str, force: bool = False) -> Path:
     """
     Download an APK bundle (ABB) using the Raccoon tool.
 
     Args:
         package (str): Package name of the Android app.
+        force (bool, optional):
+            Download again even if APKs are cached; the cached set is only
+            replaced once the new download succeeded. Defaults to False.
 
     Returns:
         Path: Directory where APK files for the package are stored.
 
     Workflow:
-        - Creates a directory inside DIR_APKS for the given package.
-        - If no APKs are found in that directory, invokes Raccoon to download them.
+        - Takes the per-package artifact lock so that concurrent packdroid
+          processes sharing DIR_APKS wait for each other instead of
+          downloading the same package twice.
+        - If no APKs are found in DIR_APKS/{package}, invokes Raccoon to
+          download them into a private staging directory under DIR_APKS_PARTIAL.
+        - Moves the finished download into place with a single rename, so
+          other processes never observe a half-written package directory.
         - Verifies that APK files exist and Raccoon exited successfully.
         - Logs how many APKs were downloaded.
 
     Raises:
-        Logs a critical error if Raccoon fails to download the package.
+        RuntimeError: If Raccoon fails to download the package.
     """
     logger.info(f"Downloading {package} via Raccoon ...")
     app_dir = DIR_APKS / package
-    raccoon = Raccoon()
 
-    app_dir.mkdir(parents=True, exist_ok=True)
+    with artifact_lock(package):
+        apk_files = list(app_dir.glob("*.apk"))
 
-    apk_files = list(app_dir.glob("*.apk"))
+        if not apk_files or force:
+            raccoon = Raccoon()
+            staging_dir = DIR_APKS_PARTIAL / f"{package}.{os.getpid()}"
+            shutil.rmtree(staging_dir, ignore_errors=True)
 
-    if not apk_files:
-        success_run = raccoon.download_apk(
-            package_name=package,
-            out_path=DIR_APKS
-        )
+            try:
+                success_run = raccoon.download_apk(
+                    package_name=package,
+                    out_path=staging_dir
+                )
 
-        apk_files = list(app_dir.glob("*.apk"))
-        if not apk_files or success_run.returncode != 0:
-            logger.critical(f"Raccoon failed to download {package}")
+                staged_app_dir = staging_dir / package
+                if success_run.returncode == 0 and list(staged_app_dir.glob("*.apk")):
+                    # Replaces a previous download or an empty leftover directory
+                    if app_dir.exists():
+                        shutil.rmtree(app_dir)
+
+                    os.replace(staged_app_dir, app_dir)
+
+            finally:
+                shutil.rmtree(staging_dir, ignore_errors=True)
+
+            apk_files = list(app_dir.glob("*.apk"))
+            if not apk_files or success_run.returncode != 0:
+                raise RuntimeError(f"Raccoon failed to download {package}")
 
     logger.info(f"Downloaded {len(apk_files)} apk(s) for {package}")
     return app_dir
 
 
-def download_with_url(url: str, package: str) -> Path:
+def cached_version_code(package: str) -> int | None:
+    """
+    Return the versionCode of the cached Raccoon download of a package.
+
+    Args:
+        package (str): Package name.
+
+    Returns:
+        int | None: versionCode of the base APK in DIR_APKS/{package},
+        or None if nothing (readable) is cached.
+    """
+    for apk_file in sorted((DIR_APKS / package).glob("*.apk")):
+        try:
+            info = read_apk_info(apk_file)
+
+        except Exception:
+            continue
+
+        if info.split is None:
+            return info.version_code
+
+    return None
+
+
+def find_raccoon_updates(packages: list[str]) -> dict[str, tuple[int | None, int | None]]:
+    """
+    Compare cached Raccoon downloads with the versionCodes on Play.
+
+    All packages are looked up with one `Raccoon.bulk_details` call; no
+    APKs are downloaded.
+
+    Args:
+        packages (list[str]): Packages of Raccoon sources.
+
+    Returns:
+        dict[str, tuple[int | None, int | None]]:
+            Packages that need a (re)download → (cached, Play) versionCode.
+            A package is included if nothing is cached or Play has a
+            different versionCode; packages Play returned no details for
+            are kept as cached (with a warning).
+    """
+    if not packages:
+        return {}
+
+    result = Raccoon().bulk_details(packages)
+    remote = parse_version_codes(result.stdout) if result.returncode == 0 else {}
+
+    if result.returncode != 0:
+        logger.warning(f"Raccoon details lookup failed (exit code {result.returncode}); keeping cached versions")
+
+    updates = {}
+    for package in packages:
+        cached = cached_version_code(package)
+
+        if package not in remote and cached is not None:
+            if result.returncode == 0:
+                logger.warning(f"No Play details for {package}; keeping cached versionCode {cached}")
+
+            continue
+
+        if cached is None or remote[package] != cached:
+            updates[package] = (cached, remote.get(package))
+
+    return updates
+
+
+def download_with_url(url: str, package: str, force: bool = False, sha256: str | None = None) -> Path:
     """
     Download a single APK from a direct URL.
 
     Args:
         url (str): Direct HTTP(S) link to the APK.
         package (str): Package name used for naming the downloaded file.
+        force (bool, optional): Download again even if the file is cached. Defaults to False.
+        sha256 (str | None, optional): Expected hex SHA-256 digest of the APK. Defaults to None.
 
     Returns:
         Path: Path to the downloaded APK file.
 
+    Raises:
+        ValueError: If the downloaded file does not match `sha256`.
+
     Workflow:
+        - Takes the per-package artifact lock (see `download_with_raccoon`).
         - Saves the APK into DIR_APKS/{package}.apk.
         - Skips download if the file already exists.
+        - When refreshing a cached APK, first tries a delta download
+          (see `delta_download`): only changed zip entries are fetched
+          with HTTP range requests and the rest is copied from the cached
+          version. Falls back to a full download if the server does not
+          support ranges, no SHA-256 is known to verify the result against
+          (neither `sha256` nor one published by the server), or the
+          rebuilt file fails verification.
+        - Downloads into an in-progress `.part` file and renames it into
+          place once complete, so a partial file is never mistaken for
+          a cached APK.
         - Logs download completion.
     """
     logger.info(f"Downloading {package} from URL ...")
     target = DIR_APKS / f"{package}.apk"
 
-    if not target.exists():
-        download_file(
-            url=url,
-            path=target,
-        )
+    with artifact_lock(package):
+        if not target.exists() or force:
+            partial = target.with_name(f"{target.name}.part")
+            stats = None
+
+            if target.exists():
+                try:
+                    stats = delta_download(url, target, partial, expected_sha256=sha256)
+
+                except (DeltaUnavailable, OSError, RequestException) as e:
+                    logger.warning(f"Delta update of {package} not possible ({e}), downloading the full APK")
+
+            if stats is not None and stats.unchanged:
+                logger.info(f"{package}: remote APK is unchanged")
+
+            else:
+                if stats is not None:
+                    logger.info(
+                        f"{package}: delta update fetched {sizeof_fmt(stats.fetched_bytes)}, "
+                        f"reused {sizeof_fmt(stats.reused_bytes)} from the cached APK"
+                    )
+
+                else:
+                    download_file(
+                        url=url,
+                        path=partial,
+                    )
+
+                    if sha256 is not None and sha256_file(partial) != sha256.lower():
+                        partial.unlink()
+                        raise ValueError(f"SHA-256 mismatch for {package} downloaded from {url}")
+
+                os.replace(partial, target)
 
     logger.info(f"Downloaded: {target}")
     return target
 
 
+def get_repository_index(root: Path | str, refresh: bool = False) -> ApkIndex:
+    """
+    Return the up-to-date index of a local APK repository.
+
+    The index is loaded from disk and incrementally refreshed on first
+    use in this process, then reused for every later lookup.
+
+    Args:
+        root (Path | str): Repository root directory.
+        refresh (bool, optional): Rescan the repository even if it was
+            already indexed in this process. Defaults to False.
+
+    Returns:
+        ApkIndex: Index of the repository.
+    """
+    root = str_to_path(root).resolve()
+
+    with _repository_indexes_lock:
+        index = _repository_indexes.get(root)
+
+        if index is None:
+            index = ApkIndex(root)
+            index.update()
+            _repository_indexes[root] = index
+
+        elif refresh:
+            index.update()
+
+    return index
+
+
+def resolve_from_repository(entry: SourceRepository, refresh: bool = False) -> Path:
+    """
+    Find a package in an indexed local APK repository.
+
+    Args:
+        entry (SourceRepository): Repository source entry.
+        refresh (bool, optional): Rescan the repository first. Defaults to False.
+
+    Returns:
+        Path: The APK file itself for single-APK apps, or a directory in
+        DIR_APKS_REPO holding the base and split APKs of the selected version.
+
+    Raises:
+        FileNotFoundError: If the package is not in the repository.
+
+    Notes:
+        - The highest indexed versionCode is selected.
+        - Split sets are linked (or copied when hard links are not
+          possible, e.g. from a NAS) into DIR_APKS_REPO/{package}-{versionCode}
+          under the artifact lock, and reused by later runs.
+    """
+    index = get_repository_index(entry.path, refresh=refresh)
+    records = index.lookup(entry.package, abis=entry.abis or None)
+
+    if not records:
+        raise FileNotFoundError(f"Package {entry.package} not found in repository {entry.path}")
+
+    version_code = records[0].info.version_code
+    logger.info(f"Found {entry.package} ({version_code}) in repository: {len(records)} apk(s)")
+
+    if len(records) == 1:
+        return index.root / records[0].path
+
+    app_dir = DIR_APKS_REPO / f"{entry.package}-{version_code}"
+
+    with artifact_lock(f"repo-{entry.package}"):
+        if not app_dir.exists():
+            staging_dir = DIR_APKS_PARTIAL / f"repo-{entry.package}.{os.getpid()}"
+            shutil.rmtree(staging_dir, ignore_errors=True)
+            staging_dir.mkdir(parents=True)
+
+            try:
+                for idx, record in enumerate(records):
+                    source = index.root / record.path
+                    target = staging_dir / f"{idx}_{source.name}"
+
+                    try:
+                        os.link(source, target)
+
+                    except OSError:
+                        shutil.copy2(source, target)
+
+                app_dir.parent.mkdir(parents=True, exist_ok=True)
+                os.replace(staging_dir, app_dir)
+
+            finally:
+                shutil.rmtree(staging_dir, ignore_errors=True)
+
+    return app_dir
+
+
+def recover_from_failure(
+        adb: Adb,
+        kind: str,
+        needed_bytes: int = 0,
+        staging: DeviceStaging | None = None,
+) -> None:
+    """
+    Prepare the device for another install attempt after a failure.
+
+    Args:
+        adb (Adb): Adb client with the target device set.
+        kind (str): Failure class of the last attempt (see `classify_install_output`).
+        needed_bytes (int, optional): Free bytes on /data the next attempt needs. Defaults to 0.
+        staging (DeviceStaging | None, optional): Staging cache of the install. Defaults to None.
+
+    Workflow:
+        - FAILURE_TRANSIENT → reconnect the transport (`Adb.reconnect`).
+        - FAILURE_STORAGE → evict least recently used staged APKs until
+          `needed_bytes` are free (`DeviceStaging.evict`), then trim app
+          caches (`Adb.free_storage`).
+        - FAILURE_UNKNOWN → nothing; the install is simply repeated.
+    """
+    if kind == FAILURE_TRANSIENT:
+        if not adb.reconnect(timeout=INSTALL_RECONNECT_TIMEOUT):
+            logger.warning(f"{adb.device} did not come back within {INSTALL_RECONNECT_TIMEOUT}s")
+
+    elif kind == FAILURE_STORAGE:
+        free_data, _, _ = query_free_space(adb)
+        missing = needed_bytes - (free_data or 0)
+
+        if missing > 0:
+            (staging or DeviceStaging(adb)).evict(missing)
+
+        adb.free_storage()
+
+
 def install_apk(
         package: str,
         source: Path | str,
         adb: Adb,
+        retries: int | None = None,
+        staging: DeviceStaging | None = None,
 ) -> None:
     """
     Install an APK (single or split) on the device using ADB.
@@ -94,24 +396,287 @@ def install_apk(
         package (str): Package name of the app.
         source (Path | str): Path to a single APK file or a directory with multiple APKs.
         adb (Adb): Instance of Adb client used for installation.
+        retries (int | None, optional):
+            Retries after a non-permanent failure.
+            Defaults to None (`config_obj.install_retries`).
+        staging (DeviceStaging | None, optional):
+            Install from the device staging cache instead of pushing the
+            APKs with `adb install`. Defaults to None.
 
     Raises:
         ValueError: If the provided source is neither a file nor a directory.
+        InstallError: If the install failed permanently or ran out of retries.
 
     Workflow:
         - If source is a file → installs a single APK.
         - If source is a directory → installs a split APK (ABB).
-        - After installation, verifies if the package is installed on the device.
-        - Logs success (✅) or failure (❌).
+        - On failure, the adb output is classified (`classify_install_output`):
+          permanent errors are raised at once, anything else is retried
+          after `recover_from_failure`.
     """
     source = str_to_path(source)
+    retries = config_obj.install_retries if retries is None else retries
 
-    if source.is_file():
-        logger.info(f"Installing single APK for {package}")
-        adb.install_apk(source)
+    if not source.is_file() and not source.is_dir():
+        raise ValueError(f"Invalid source: {source}")
+
+    for attempt in range(retries + 1):
+        try:
+            if staging is not None:
+                staging.install(package, source)
+
+            elif source.is_file():
+                logger.info(f"Installing single APK for {package}")
+                adb.install_apk(source)
+
+            else:
+                adb.install_split_apk(package, source)
+
+            return
 
-    elif source.is_dir():
-        adb.install_split_apk(package, source)
+        except InstallError as e:
+            if e.kind == FAILURE_PERMANENT or attempt == retries:
+                raise
+
+            logger.warning(f"Install of {package} failed: {e}; retrying ({attempt + 1}/{retries})")
+            recover_from_failure(
+                adb,
+                e.kind,
+                needed_bytes=int(artifact_size(source) * PLAN_INSTALL_SPACE_FACTOR),
+                staging=staging,
+            )
+
+
+def resolve_source(
+        entry: SourceEntry,
+        force: bool = False,
+) -> Path | None:
+    """
+    Resolve the installation source for a given package.
+
+    Args:
+        entry (BaseSource): One of the supported source types:
+            - SourceRaccoon → Download via Raccoon tool.
+            - SourceUrl → Download from a direct URL.
+            - SourceLocal → Use local APK path.
+            - SourceRepository → Look up in an indexed local APK repository.
+        force (bool, optional):
+            Refresh the cached artifact (download again / rescan the
+            repository) instead of reusing it. Defaults to False.
+
+    Returns:
+        Path | None: Path to APK file or directory.
+
+    Raises:
+        ValueError: If an unknown source method is specified.
+        FileNotFoundError: If a local source path does not exist.
+    """
+    if entry.method == "raccoon":
+        return download_with_raccoon(entry.package, force=force)
+
+    elif entry.method == "url":
+        return download_with_url(entry.url.__str__(), entry.package, force=force, sha256=entry.sha256)
+
+    elif entry.method == "repo":
+        return resolve_from_repository(entry, refresh=force)
+
+    elif entry.method == "local":
+        if not entry.path.exists():
+            raise FileNotFoundError(f"Local source not found: {entry.path}")
+
+        return entry.path
 
     else:
-        raise ValueError(f"Invalid source: {source}")
+        raise ValueError(f"Unknown source method: {entry.method}")
+
+
+def prefetch_sources(
+        entries: list[SourceEntry],
+        max_workers: int = PREFETCH_WORKERS_DEFAULT,
+) -> dict[str, str | None]:
+    """
+    Resolve every source entry into the local cache concurrently.
+
+    No device is needed: Raccoon and URL sources (and URL data files) are
+    downloaded into DIR_APKS and local sources are checked for existence,
+    so a later install run only has to transfer files over USB.
+
+    Args:
+        entries (list[SourceEntry]): Entries to resolve.
+        max_workers (int, optional):
+            Number of entries resolved in parallel. Defaults to PREFETCH_WORKERS_DEFAULT.
+
+    Returns:
+        dict[str, str | None]: Package name → None on success, or the error message.
+
+    Notes:
+        - Safe to run next to other packdroid processes: downloads are
+          guarded by the per-artifact locks used by `download_with_*`.
+    """
+    def prefetch_entry(entry: SourceEntry) -> str | None:
+        try:
+            resolve_source(entry)
+
+            for data in entry.data:
+                resolve_data_file(entry.package, data)
+
+        except Exception as e:
+            logger.error(f"Error for {entry.package}: {e}")
+            return str(e)
+
+        return None
+
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        errors = executor.map(prefetch_entry, entries)
+
+        return {entry.package: error for entry, error in zip(entries, errors)}
+
+
+def provision_device(
+        adb: Adb,
+        entries: list[SourceEntry],
+        resolve: Callable[[SourceEntry], Path | None] = resolve_source,
+        multi_package: bool = True,
+        push_data: bool = True,
+        plan: bool = True,
+        run_actions: bool = True,
+) -> dict[str, str | None]:
+    """
+    Resolve and install every source entry on the device selected in `adb`.
+
+    Args:
+        adb (Adb): Adb client with the target device already set.
+        entries (list[SourceEntry]): Entries to install.
+        resolve (Callable, optional):
+            Function mapping an entry to its APK file or directory.
+            Defaults to `resolve_source`; long-running callers pass a
+            memoizing resolver so the artifact cache stays warm.
+        multi_package (bool, optional):
+            If True and more than one app is resolved, install them all in
+            one atomic multi-package session (`Adb.install_multi_package`).
+            Defaults to True.
+        push_data (bool, optional):
+            If True, push the data files of successfully installed entries
+            with `sync_data`. Defaults to True.
+        plan (bool, optional):
+            If True, run `plan_device` once everything is resolved and reject
+            entries that do not fit on the device before any transfer.
+            Defaults to True.
+        run_actions (bool, optional):
+            If True, run the post-install actions of successfully installed
+            entries with `run_post_install` (one shell call). Defaults to True.
+
+    Returns:
+        dict[str, str | None]: Package name → None on success, or the error
+        message if resolving, installing, pushing data or a post-install
+        action failed.
+
+    Notes:
+        - A failure for one package is logged and does not stop the others.
+        - With `device_staging` enabled in config.yaml, APKs are installed
+          from the on-device staging cache (`DeviceStaging`) and only pushed
+          when the device has not seen them before.
+        - With `lan_server` enabled, network devices always use staging and
+          download missing APKs from the artifact server over the LAN
+          (`get_artifact_server`); only bytes pushed over adb count as
+          transfer in the throughput history.
+        - The install rate of the run is added to the device's throughput
+          history, which `plan_device` uses for its estimates.
+        - Apps rolled back only because another app broke the atomic
+          session, or whose failure was not permanent, are retried one by
+          one with `install_apk`, so a single bad APK or a flaky cable does
+          not block the rest of the batch.
+    """
+    results: dict[str, str | None] = {}
+    resolved: dict[str, Path] = {}
+
+    for entry in entries:
+        try:
+            resolved[entry.package] = resolve(entry)
+
+        except Exception as e:
+            logger.error(f"Error for {entry.package}: {e}")
+            results[entry.package] = str(e)
+
+    if plan and resolved:
+        device_plan = plan_device(adb, entries, resolved)
+
+        for package, reason in device_plan.rejected.items():
+            logger.error(f"Error for {package}: {reason}")
+            results[package] = reason
+            del resolved[package]
+
+    # Keep the pool's keepalive from reconnecting the device mid-transfer
+    with device_busy(adb.device):
+        server = None
+        if config_obj.lan_server and is_network_serial(adb.device):
+            server = get_artifact_server()
+
+        staging = None
+        if config_obj.device_staging or server is not None:
+            staging = DeviceStaging(adb, max_bytes=config_obj.device_staging_max_bytes, server=server)
+
+            if not staging.supported:
+                logger.info(f"{adb.device}: API level < {DEVICE_STAGING_MIN_SDK}, device staging disabled")
+                staging = None
+
+        started = time.monotonic()
+        pending = resolved
+
+        if multi_package and len(resolved) > 1:
+            if staging is not None:
+                batch_results = staging.install_many(resolved)
+
+            else:
+                batch_results = adb.install_multi_package(resolved)
+            pending = {}
+
+            for package, error in batch_results.items():
+                retryable = error is not None and (
+                    error.startswith(SESSION_ABORTED)
+                    or classify_install_output(error)[0] != FAILURE_PERMANENT
+                )
+
+                if retryable:
+                    pending[package] = resolved[package]
+
+                else:
+                    if error is not None:
+                        logger.error(f"Error for {package}: {error}")
+
+                    results[package] = error
+
+        for package, source in pending.items():
+            try:
+                install_apk(package, source, adb, staging=staging)
+                results[package] = None
+
+            except Exception as e:
+                logger.error(f"Error for {package}: {e}")
+                results[package] = str(e)
+
+        if staging is not None:
+            transferred = staging.pushed_bytes
+
+        else:
+            transferred = sum(
+                artifact_size(source) for package, source in resolved.items() if results.get(package) is None
+            )
+
+        record_throughput(adb.device, transferred, time.monotonic() - started)
+
+        if push_data:
+            installed = [entry for entry in entries if entry.data and results.get(entry.package) is None]
+
+            for package, error in sync_data(adb, installed).items():
+                if error is not None:
+                    results[package] = error
+
+        if run_actions:
+            installed = [entry for entry in entries if entry.actions and results.get(entry.package) is None]
+
+            for package, error in run_post_install(adb, installed).items():
+                if error is not None:
+                    results[package] = error
+
+    return results
@@ -0,0 +1,248 @@
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Callable
+import hashlib
+import json
+import time
+import os
+
+import yaml
+from ten_utils.log import Logger
+
+from apk.manifest import read_apk_info
+from common.constants import (
+    DIR_APKS,
+    PATH_LOCK_FILE,
+)
+from common.helpers import sha256_file, sha256_file_cached, yaml_load_with_pydantic_model
+from install_apps import resolve_source
+from validation.lockfile import (
+    Lockfile,
+    LockedArtifact,
+    LockedFile,
+)
+from validation.sources import SourceEntry
+
+logger = Logger(__name__)
+
+
+def entry_hash(entry: SourceEntry) -> str:
+    """
+    Return a stable hash of a source entry definition.
+    """
+    return hashlib.sha256(entry.model_dump_json().encode()).hexdigest()[:16]
+
+
+def _to_lock_path(path: Path) -> str:
+    """
+    Store paths inside DIR_APKS relative to it, so the lock survives moving the tree.
+    """
+    path = path.resolve()
+
+    try:
+        return path.relative_to(DIR_APKS.resolve()).as_posix()
+
+    except ValueError:
+        return str(path)
+
+
+def _from_lock_path(path: str) -> Path:
+    return Path(path) if Path(path).is_absolute() else DIR_APKS / path
+
+
+def lock_entry(entry: SourceEntry, force: bool = False) -> LockedArtifact:
+    """
+    Resolve a source entry and describe the resulting artifact.
+
+    Args:
+        entry (SourceEntry): Source entry.
+        force (bool, optional): Refresh the cached artifact first (see `resolve_source`).
+            Defaults to False.
+
+    Returns:
+        LockedArtifact: Lock record with hashes, sizes and versionCode.
+    """
+    source = resolve_source(entry, force=force)
+    apk_files = sorted(source.rglob("*.apk")) if source.is_dir() else [source]
+    version_code = None
+
+    for apk_file in apk_files:
+        try:
+            info = read_apk_info(apk_file)
+
+        except Exception:
+            continue
+
+        if info.split is None:
+            version_code = info.version_code
+            break
+
+    return LockedArtifact(
+        package=entry.package,
+        method=entry.method,
+        entry_hash=entry_hash(entry),
+        kind="dir" if source.is_dir() else "file",
+        path=_to_lock_path(source),
+        version_code=version_code,
+        files=[
+            LockedFile(path=_to_lock_path(apk_file), size=apk_file.stat().st_size, sha256=sha256_file(apk_file))
+            for apk_file in apk_files
+        ],
+        locked_at=time.time(),
+    )
+
+
+def load_lockfile() -> Lockfile | None:
+    """
+    Load `sources.lock`, or return None if there is none.
+    """
+    if not PATH_LOCK_FILE.exists():
+        return None
+
+    return yaml_load_with_pydantic_model(
+        path_to_yaml=PATH_LOCK_FILE,
+        pydantic_model=Lockfile,
+    )
+
+
+def save_lockfile(lock: Lockfile) -> None:
+    """
+    Atomically write `sources.lock`.
+    """
+    partial = PATH_LOCK_FILE.with_name(f"{PATH_LOCK_FILE.name}.part")
+
+    with open(partial, "w") as yaml_file:
+        yaml.safe_dump(json.loads(lock.model_dump_json()), yaml_file, default_flow_style=False)
+
+    os.replace(partial, PATH_LOCK_FILE)
+
+
+def build_lockfile(
+        entries: list[SourceEntry],
+        packages: list[str] | None = None,
+        force: bool | set[str] = False,
+        max_workers: int = 4,
+) -> tuple[Lockfile, dict[str, str | None]]:
+    """
+    Resolve entries concurrently and build the new `sources.lock` contents.
+
+    Nothing is written; pass the lock to `save_lockfile` to pin it.
+
+    Args:
+        entries (list[SourceEntry]): All entries of `sources.yaml`.
+        packages (list[str] | None, optional):
+            Only (re)lock these packages and keep the other lock records.
+            Defaults to None (all entries).
+        force (bool | set[str], optional):
+            Refresh cached artifacts (used by `update`): True for all
+            selected entries, or the set of packages to refresh.
+            Defaults to False.
+        max_workers (int, optional): Entries resolved in parallel. Defaults to 4.
+
+    Returns:
+        tuple[Lockfile, dict[str, str | None]]: The lock, and package → None
+        on success or the error message.
+
+    Notes:
+        - Records of packages no longer listed in `sources.yaml` are dropped.
+        - A failed entry keeps its previous lock record, if any.
+    """
+    lock = load_lockfile() or Lockfile()
+    selected = [entry for entry in entries if packages is None or entry.package in packages]
+
+    def lock_one(entry: SourceEntry) -> LockedArtifact | str:
+        try:
+            refresh = force if isinstance(force, bool) else entry.package in force
+            return lock_entry(entry, force=refresh)
+
+        except Exception as e:
+            logger.error(f"Error for {entry.package}: {e}")
+            return str(e)
+
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        locked = list(executor.map(lock_one, selected))
+
+    results = {}
+    for entry, artifact in zip(selected, locked):
+        if isinstance(artifact, LockedArtifact):
+            lock.artifacts[entry.package] = artifact
+            results[entry.package] = None
+
+        else:
+            results[entry.package] = artifact
+
+    known = {entry.package for entry in entries}
+    lock.artifacts = {package: artifact for package, artifact in lock.artifacts.items() if package in known}
+
+    return lock, results
+
+
+class StaleLock(Exception):
+    """
+    A locked artifact no longer matches its lock record; run `lock` again.
+    """
+
+
+def resolve_locked(entry: SourceEntry, lock: Lockfile) -> Path | None:
+    """
+    Return the locked artifact of an entry without any network or Raccoon work.
+
+    Args:
+        entry (SourceEntry): Source entry.
+        lock (Lockfile): Loaded lockfile.
+
+    Returns:
+        Path | None: Locked APK file or directory, or None if the entry is not locked.
+
+    Raises:
+        StaleLock: The entry definition changed since it was locked, or a
+            locked file is missing or has a different size or SHA-256.
+
+    Notes:
+        - Files are hashed at most once per process (`sha256_file_cached`).
+    """
+    artifact = lock.artifacts.get(entry.package)
+    if artifact is None:
+        return None
+
+    if artifact.entry_hash != entry_hash(entry):
+        raise StaleLock(f"{entry.package} changed in sources since it was locked; run `lock` to pin it again")
+
+    for file in artifact.files:
+        path = _from_lock_path(file.path)
+
+        if not path.is_file():
+            raise StaleLock(f"Locked file {path} is missing; run `lock` to pin {entry.package} again")
+
+        if path.stat().st_size != file.size or sha256_file_cached(path) != file.sha256:
+            raise StaleLock(f"Locked file {path} does not match {PATH_LOCK_FILE.name}; "
+                            f"run `lock` to pin {entry.package} again")
+
+    return _from_lock_path(artifact.path)
+
+
+def make_locked_resolver(lock: Lockfile) -> Callable[[SourceEntry], Path | None]:
+    """
+    Build a resolver that installs from `sources.lock` when possible.
+
+    Locked artifacts are used directly (no network, no Raccoon). Entries
+    without a lock record fall back to `resolve_source` with a warning;
+    stale records raise `StaleLock` instead of silently installing an
+    unpinned artifact.
+
+    Args:
+        lock (Lockfile): Loaded lockfile.
+
+    Returns:
+        Callable[[SourceEntry], Path | None]: Resolver for `provision_device`.
+    """
+    def resolve(entry: SourceEntry) -> Path | None:
+        source = resolve_locked(entry, lock)
+
+        if source is None:
+            logger.warning(f"{entry.package} is not locked, resolving it")
+            return resolve_source(entry)
+
+        return source
+
+    return resolve
@@ -1,4 +1,6 @@
 from pathlib import Path
+from typing import Callable
+import argparse
 
 from ten_utils.log import Logger
 
@@ -9,22 +11,51 @@ init_check_paths()
 from common.helpers import yaml_load_with_pydantic_model
 from common.constants import (
     PATH_SOURCES_FILE,
+    PATH_LOCK_FILE,
+    PREFETCH_WORKERS_DEFAULT,
+    PROBE_PAYLOAD_MB_DEFAULT,
 )
 from raccoon.install import check_raccoon_bin_install
 from adb.install import check_adb_install
-from adb.command import Adb
+from adb.command import Adb, parse_device_states, parse_device_details
+from adb.pool import DevicePool
+from config import config_obj
 from validation.sources import (
     Sources,
-    SourceUrl,
     SourceLocal,
     SourceRaccoon,
+    SourceEntry,
 )
-from install_apps import install_apk, download_with_raccoon, download_with_url
+from data_files import sync_data
+from install_apps import provision_device, prefetch_sources, resolve_source, find_raccoon_updates
+from lockfile import build_lockfile, load_lockfile, make_locked_resolver, save_lockfile
+from daemon import Daemon
+from cluster import Coordinator, Worker
+from reconcile import DeviceDiff, reconcile_device
+from planner import DevicePlan, plan_device
+from probe import probe_devices
+from provisioner import map_devices
+from verify import verify_hashes
 
 adb = Adb()
 logger = Logger(__name__)
 
 
+def create_device_pool() -> DevicePool:
+    """
+    Create the pool for the TCP/IP devices listed in `config.yaml`.
+
+    Use it as a context manager around device work: endpoints are
+    connected on enter (so they are listed by `adb devices`) and kept
+    alive until exit. With no `network_devices` configured it does nothing.
+    """
+    return DevicePool(
+        config_obj.network_devices,
+        keepalive_interval=config_obj.network_keepalive_interval,
+        adb=adb,
+    )
+
+
 def select_device() -> None:
     """
     Interactively select a connected Android device for ADB operations.
@@ -69,37 +100,6 @@ def select_device() -> None:
             logger.warning("Invalid input, please try again.")
 
 
-def resolve_source(
-        entry: SourceRaccoon | SourceLocal | SourceUrl
-) -> Path | None:
-    """
-    Resolve the installation source for a given package.
-
-    Args:
-        entry (BaseSource): One of the supported source types:
-            - SourceRaccoon → Download via Raccoon tool.
-            - SourceUrl → Download from a direct URL.
-            - SourceLocal → Use local APK path.
-
-    Returns:
-        Path | None: Path to APK file or directory.
-
-    Raises:
-        Logs a critical error if an unknown source method is specified.
-    """
-    if entry.method == "raccoon":
-        return download_with_raccoon(entry.package)
-
-    elif entry.method == "url":
-        return download_with_url(entry.url.__str__(), entry.package)
-
-    elif entry.method == "local":
-        return entry.path
-
-    else:
-        logger.critical(f"Unknown source method: {entry.method}")
-
-
 def check_installed_apps(sources: Sources) -> None:
     """
     Check which applications from the provided sources are installed on the connected device.
@@ -128,57 +128,579 @@ def check_installed_apps(sources: Sources) -> None:
             logger.warning(f"Package {entry.package} not installed")
 
 
-def main() -> None:
+def load_sources() -> Sources:
     """
-    Entry point of the Packdroid application.
+    Load and validate `sources.yaml`.
+
+    Returns:
+        Sources: Parsed sources.
+
+    Raises:
+        Logs a critical error if no sources are specified.
+    """
+    logger.info(f"Reading a file {PATH_SOURCES_FILE} ...")
+    sources_obj = yaml_load_with_pydantic_model(
+        path_to_yaml=PATH_SOURCES_FILE,
+        pydantic_model=Sources
+    )
+
+    if not sources_obj.sources:
+        logger.critical("No sources specified!")
+
+    return sources_obj
+
+
+def get_resolver() -> Callable[[SourceEntry], Path | None]:
+    """
+    Return the source resolver for device runs.
+
+    Uses `sources.lock` when it exists (no network or Raccoon work for
+    locked entries), otherwise resolves every entry with `resolve_source`.
+    """
+    lock = load_lockfile()
+
+    if lock is None:
+        return resolve_source
+
+    logger.info(f"Using {PATH_LOCK_FILE.name} ({len(lock.artifacts)} locked artifact(s))")
+    return make_locked_resolver(lock)
+
+
+def run_install() -> None:
+    """
+    One-shot install on an interactively selected device.
 
     Workflow:
         1. Ensure required binaries (Raccoon, ADB) are installed using
            `check_raccoon_bin_install` and `check_adb_install`.
-        2. Prompt user to select a connected Android device if multiple devices are found.
+        2. Connect configured network devices (`create_device_pool`), then prompt
+           user to select a connected Android device if multiple devices are found.
            - Automatically sets the device for ADB commands.
         3. Load the `sources.yaml` file and validate it using Pydantic (`Sources` model).
            - Ensures proper format and default creation if the file is missing.
-        4. Iterate over each source entry:
-            - Resolve APK source using `resolve_source`:
-                * `raccoon` → download ABB via Raccoon.
-                * `url` → download APK from a direct URL.
-                * `local` → use existing APKs in a folder.
-            - Install the APK(s) on the selected device:
-                * Single APK → `install_apk`
-                * Split APK/ABB → `install_split_apk`
+        4. Resolve and install every source entry with `provision_device`:
+            - `raccoon` → download ABB via Raccoon.
+            - `url` → download APK from a direct URL.
+            - `local` → use existing APKs in a folder.
             - Log success or errors for each package.
         5. Verify installation status for all sources using `check_installed_apps`.
            - Logs whether each package is installed or missing.
+    """
+    check_raccoon_bin_install()
+    check_adb_install()
+
+    with create_device_pool():
+        select_device()
+
+        sources_obj = load_sources()
+        provision_device(adb, sources_obj.sources, resolve=get_resolver())
+
+        check_installed_apps(sources_obj.sources)
+
+
+def run_prefetch(jobs: int) -> None:
+    """
+    Warm the artifact cache for every entry in `sources.yaml` and exit.
+
+    No device is required. Exits with a critical error if any entry
+    could not be resolved.
+
+    Args:
+        jobs (int): Number of entries resolved in parallel.
+    """
+    sources_obj = load_sources()
+
+    if any(entry.method == "raccoon" for entry in sources_obj.sources):
+        check_raccoon_bin_install()
+
+    results = prefetch_sources(sources_obj.sources, max_workers=jobs)
+    failed = [package for package, error in results.items() if error is not None]
+
+    if failed:
+        logger.critical(f"Prefetch failed for {len(failed)} source(s): {', '.join(failed)}")
+
+    logger.info(f"Prefetched {len(results)} source(s)")
+
+
+def run_lock(
+        packages: list[str] | None,
+        update: bool,
+        jobs: int,
+        check_only: bool = False,
+        write_lock: bool = True,
+) -> None:
+    """
+    Resolve sources to concrete artifact sets and pin them in `sources.lock`.
+
+    Args:
+        packages (list[str] | None): Only (re)lock these packages; None for all.
+        update (bool): Refresh cached artifacts (download again / rescan
+            repositories) instead of locking what is cached. Raccoon sources
+            are only downloaded again if their Play versionCode changed
+            (`find_raccoon_updates`, one batched lookup).
+        jobs (int): Number of entries resolved in parallel.
+        check_only (bool, optional): With `update`, only report which Raccoon
+            sources have a new version and exit. Defaults to False.
+        write_lock (bool, optional): Write the result to `sources.lock`.
+            `update` passes False unless `--lock` is given, so refreshing
+            the cache never re-pins artifacts behind the user's back.
+            Defaults to True.
+    """
+    sources_obj = load_sources()
+
+    if packages:
+        unknown = set(packages) - {entry.package for entry in sources_obj.sources}
+        if unknown:
+            logger.critical(f"Packages not in sources: {', '.join(sorted(unknown))}")
+
+    if any(entry.method == "raccoon" for entry in sources_obj.sources):
+        check_raccoon_bin_install()
+
+    force: bool | set[str] = update
+    if update:
+        selected = [entry for entry in sources_obj.sources if not packages or entry.package in packages]
+        updates = find_raccoon_updates([entry.package for entry in selected if entry.method == "raccoon"])
+
+        for package, (cached, remote) in updates.items():
+            logger.info(f"Update available for {package}: {cached} → {remote}")
+
+        if check_only:
+            logger.info(f"{len(updates)} Raccoon source(s) to update")
+            return
+
+        force = {entry.package for entry in selected if entry.method != "raccoon"} | set(updates)
+
+    lock, results = build_lockfile(sources_obj.sources, packages=packages or None, force=force, max_workers=jobs)
+    failed = [package for package, error in results.items() if error is not None]
+
+    if write_lock:
+        save_lockfile(lock)
+
+    if failed:
+        logger.critical(f"Failed to resolve {len(failed)} source(s): {', '.join(failed)}")
+
+    if write_lock:
+        logger.info(f"Locked {len(results)} source(s) in {PATH_LOCK_FILE}")
+
+    else:
+        logger.info(f"Refreshed {len(results)} source(s)")
+
+        if PATH_LOCK_FILE.exists():
+            logger.warning(f"{PATH_LOCK_FILE.name} was not changed; refreshed artifacts it pins are refused "
+                           f"until you run `lock` or `update --lock`")
+
+
+def select_serials(all_devices: bool) -> list[str]:
+    """
+    Return the serials of the devices to work on.
+
+    Args:
+        all_devices (bool):
+            If True, every online device; otherwise the one picked
+            interactively with `select_device`.
+    """
+    if not all_devices:
+        select_device()
+        return [adb.device]
+
+    serials = [
+        serial for serial, state in parse_device_states(adb.get_devices()).items()
+        if state == "device"
+    ]
+
+    if not serials:
+        logger.critical("No connected devices found!")
+
+    return serials
+
+
+def per_package_result(serial: str, results: dict | None, error: str | None) -> tuple[str, dict]:
+    """
+    `make_result` for `map_devices`: serial and package results, a device error under "*".
+    """
+    return serial, results if error is None else {"*": error}
+
+
+def run_push_data(all_devices: bool) -> None:
+    """
+    Push the data files (OBB, large assets) of every source, without installing apps.
+
+    Devices are handled in parallel; on each device, files whose size and
+    SHA-256 already match are skipped (see `sync_data`).
+
+    Args:
+        all_devices (bool): Push to every online device instead of a selected one.
+    """
+    check_adb_install()
+
+    with create_device_pool():
+        serials = select_serials(all_devices)
+        sources_obj = load_sources()
+        entries = [entry for entry in sources_obj.sources if entry.data]
+
+        if not entries:
+            logger.critical("No sources declare data files!")
+
+        results = dict(map_devices(serials, lambda device_adb: sync_data(device_adb, entries), per_package_result))
+
+    failed = [serial for serial, packages in results.items() if any(packages.values())]
+
+    if failed:
+        logger.critical(f"Pushing data failed on {len(failed)} device(s): {', '.join(failed)}")
+
+    logger.info(f"Data files are up to date on {len(results)} device(s)")
+
+
+def run_verify(all_devices: bool) -> None:
+    """
+    Verify that every source is installed byte for byte, without pulling APKs back.
+
+    Installed APKs are hashed on the device with one shell call per device
+    and compared with the hashes recorded in `sources.lock`, or else with
+    the artifact hashes on the host (see `verify_hashes`). Devices are
+    handled in parallel. Exits with a critical error if any package is
+    missing or differs.
+
+    Args:
+        all_devices (bool): Verify every online device instead of a selected one.
+    """
+    check_raccoon_bin_install()
+    check_adb_install()
+
+    with create_device_pool():
+        serials = select_serials(all_devices)
+        sources_obj = load_sources()
+        resolve = get_resolver()
+        lock = load_lockfile()
+
+        def verify_device(device_adb: Adb) -> dict[str, str | None]:
+            return verify_hashes(device_adb, sources_obj.sources, resolve=resolve, lock=lock)
+
+        results = dict(map_devices(serials, verify_device, per_package_result))
+
+    failed = [serial for serial, packages in results.items() if any(packages.values())]
+
+    if failed:
+        logger.critical(f"Verification failed on {len(failed)} device(s): {', '.join(failed)}")
+
+    logger.info(f"All sources verified by hash on {len(results)} device(s)")
+
+
+def run_plan(all_devices: bool) -> None:
+    """
+    Print the capacity plan of every selected device without transferring anything.
+
+    Resolves all sources (from `sources.lock` when present), then reads
+    free space per device in parallel and reports scheduled and rejected
+    packages with the estimated duration (see `plan_device`).
+
+    Args:
+        all_devices (bool): Plan every online device instead of a selected one.
+    """
+    sources_obj = load_sources()
+
+    if any(entry.method == "raccoon" for entry in sources_obj.sources):
+        check_raccoon_bin_install()
+
+    check_adb_install()
+
+    with create_device_pool():
+        serials = select_serials(all_devices)
+        resolve = get_resolver()
+
+        resolved = {}
+        for entry in sources_obj.sources:
+            try:
+                resolved[entry.package] = resolve(entry)
+
+            except Exception as e:
+                logger.error(f"Error for {entry.package}: {e}")
+
+        plans = map_devices(
+            serials,
+            lambda device_adb: plan_device(device_adb, sources_obj.sources, resolved),
+            lambda serial, device_plan, error: device_plan or DevicePlan(serial=serial, rejected={"*": error}),
+        )
+
+    for device_plan in plans:
+        logger.info(f"{device_plan.serial}: {device_plan.model_dump_json(exclude={'serial'})}")
+
+
+def run_probe(size_mb: int) -> None:
+    """
+    Measure the adb link of every online device in parallel.
+
+    Reports latency and push/pull MB/s per device and USB port, stores the
+    results in apks/.stats/links.json, feeds the push rates into the
+    throughput history used by `plan` and warns about slow links
+    (`probe_min_throughput` / `probe_max_latency` in config.yaml).
+
+    Args:
+        size_mb (int): Payload size in MB.
+    """
+    check_adb_install()
+
+    with create_device_pool():
+        details = parse_device_details(adb.get_devices(long=True))
+        devices = {
+            serial: info.get("usb") or ("tcp" if ":" in serial else "unknown")
+            for serial, info in details.items() if info["state"] == "device"
+        }
+
+        if not devices:
+            logger.critical("No connected devices found!")
+
+        profiles = probe_devices(devices, size_mb)
+
+    for profile in profiles:
+        summary = (
+            f"{profile.serial} (port {profile.port}): latency {profile.latency_ms or 0:.0f} ms, "
+            f"push {profile.push_mbps or 0:.1f} MB/s, pull {profile.pull_mbps or 0:.1f} MB/s"
+        )
+
+        if profile.error:
+            logger.error(f"{summary}: {profile.error}")
+
+        elif profile.slow:
+            logger.warning(f"{summary}: SLOW LINK, check cable and hub port")
+
+        else:
+            logger.info(summary)
+
+
+def run_reconcile(dry_run: bool, uninstall: bool, all_devices: bool) -> None:
+    """
+    Reconcile devices with `sources.yaml`, executing only the diff.
+
+    Args:
+        dry_run (bool): Only report the diff, do not install or uninstall.
+        uninstall (bool): Uninstall extraneous packages allowed by `uninstall_allowlist`.
+        all_devices (bool):
+            Reconcile every online device in parallel instead of
+            prompting for one with `select_device`.
+    """
+    check_raccoon_bin_install()
+    check_adb_install()
+
+    with create_device_pool():
+        serials = select_serials(all_devices)
+
+        sources_obj = load_sources()
+        resolve = get_resolver()
+
+        def reconcile_one(device_adb: Adb) -> DeviceDiff:
+            return reconcile_device(
+                device_adb,
+                sources_obj.sources,
+                resolve=resolve,
+                uninstall=uninstall,
+                dry_run=dry_run,
+            )
+
+        diffs = map_devices(
+            serials,
+            reconcile_one,
+            lambda serial, diff, error: diff or DeviceDiff(serial=serial, results={"*": error}),
+        )
+
+    for diff in diffs:
+        logger.info(f"{diff.serial}: {diff.model_dump_json(exclude={'serial'})}")
+
+
+def run_daemon() -> None:
+    """
+    Run packdroid as a long-lived provisioning daemon.
+
+    Toolchain checks and `sources.yaml` parsing happen once; every device
+    that comes online afterwards is provisioned automatically (see `Daemon`).
+    Configured network devices are connected and kept alive for the whole
+    lifetime of the daemon, so reconnected devices are provisioned too.
+    """
+    check_raccoon_bin_install()
+    check_adb_install()
+
+    with create_device_pool():
+        Daemon(load_sources(), resolve=get_resolver()).serve_forever()
+
+
+def run_coordinator(jobs: int) -> None:
+    """
+    Run the cluster coordinator.
+
+    Resolves every source into the local cache up front, then serves
+    jobs and artifacts to workers (see `Coordinator`).
+
+    Args:
+        jobs (int): Number of sources resolved in parallel.
+    """
+    sources_obj = load_sources()
+
+    if any(entry.method == "raccoon" for entry in sources_obj.sources):
+        check_raccoon_bin_install()
+
+    coordinator = Coordinator(sources_obj, resolve=get_resolver())
+    coordinator.prepare(max_workers=jobs)
+    coordinator.serve_forever()
+
+
+def run_worker(coordinator_url: str, name: str | None) -> None:
+    """
+    Run a cluster worker for the devices attached to this host.
+
+    Args:
+        coordinator_url (str): Base URL of the coordinator API.
+        name (str | None): Worker name. Defaults to the host name.
+    """
+    check_adb_install()
+
+    with create_device_pool():
+        Worker(coordinator_url, name=name, slots=config_obj.daemon_workers).run_forever()
+
+
+def main() -> None:
+    """
+    Entry point of the Packdroid application.
+
+    Commands:
+        install (default) → one-shot install on a selected device (`run_install`).
+        prefetch          → download every source into the cache, no device needed (`run_prefetch`).
+        lock              → pin every source to a concrete artifact in sources.lock (`run_lock`).
+        update            → refresh selected (or all) cached sources; `--lock` also re-pins them (`run_lock`).
+        plan              → check free space and estimate duration per device, no transfer (`run_plan`).
+        probe             → measure latency and USB throughput of every device (`run_probe`).
+        push-data         → push data files (OBB) to devices, skipping up-to-date ones (`run_push_data`).
+        verify            → compare on-device hashes of installed APKs with the artifacts (`run_verify`).
+        reconcile         → install/upgrade/uninstall only what differs (`run_reconcile`).
+        daemon            → long-running hotplug-driven provisioning (`run_daemon`).
+        coordinator       → serve sources and jobs to workers on other hosts (`run_coordinator`).
+        worker            → provision local devices with jobs from a coordinator (`run_worker`).
 
     Notes:
-        - This function orchestrates the full workflow: configuration → APK retrieval → installation → verification.
         - Any critical errors (missing binaries, invalid sources, no devices) are logged with `logger.critical`.
         - Designed to be run as a standalone script (`if __name__ == "__main__": main()`).
     """
-    check_raccoon_bin_install()
-    check_adb_install()
+    parser = argparse.ArgumentParser(
+        prog="packdroid",
+        description="Automated APK/ABB installer for Android devices.",
+    )
+    subparsers = parser.add_subparsers(dest="command")
+    subparsers.add_parser("install", help="Install all sources on a selected device (default)")
+    subparsers.add_parser("daemon", help="Provision every device that gets attached")
+
+    parser_prefetch = subparsers.add_parser("prefetch", help="Download all sources into the cache and exit")
+    parser_prefetch.add_argument(
+        "-j", "--jobs",
+        type=int,
+        default=PREFETCH_WORKERS_DEFAULT,
+        help=f"Sources resolved in parallel (default: {PREFETCH_WORKERS_DEFAULT})",
+    )
+
+    parser_lock = subparsers.add_parser("lock", help="Pin every source in sources.lock")
+    parser_lock.add_argument(
+        "-j", "--jobs",
+        type=int,
+        default=PREFETCH_WORKERS_DEFAULT,
+        help=f"Sources resolved in parallel (default: {PREFETCH_WORKERS_DEFAULT})",
+    )
 
-    select_device()
+    parser_update = subparsers.add_parser("update", help="Refresh cached sources (--lock: and sources.lock)")
+    parser_update.add_argument("packages", nargs="*", help="Packages to refresh (default: all)")
+    parser_update.add_argument(
+        "--check",
+        action="store_true",
+        help="Only list Raccoon sources with a new version on Play",
+    )
+    parser_update.add_argument(
+        "--lock",
+        action="store_true",
+        help="Also pin the refreshed artifacts in sources.lock",
+    )
+    parser_update.add_argument(
+        "-j", "--jobs",
+        type=int,
+        default=PREFETCH_WORKERS_DEFAULT,
+        help=f"Sources resolved in parallel (default: {PREFETCH_WORKERS_DEFAULT})",
+    )
 
-    logger.info(f"Reading a file {PATH_SOURCES_FILE} ...")
-    sources_obj = yaml_load_with_pydantic_model(
-        path_to_yaml=PATH_SOURCES_FILE,
-        pydantic_model=Sources
+    parser_reconcile = subparsers.add_parser("reconcile", help="Apply only the diff between sources and devices")
+    parser_reconcile.add_argument("--dry-run", action="store_true", help="Only print the diff")
+    parser_reconcile.add_argument(
+        "--uninstall",
+        action="store_true",
+        help="Uninstall extraneous packages matching 'uninstall_allowlist' in config.yaml",
     )
+    parser_reconcile.add_argument("--all-devices", action="store_true", help="Reconcile every online device")
 
-    if not sources_obj.sources:
-        logger.critical("No sources specified!")
+    parser_plan = subparsers.add_parser("plan", help="Check capacity and estimate duration per device")
+    parser_plan.add_argument("--all-devices", action="store_true", help="Plan every online device")
+
+    parser_probe = subparsers.add_parser("probe", help="Measure latency and throughput of every device")
+    parser_probe.add_argument(
+        "--size",
+        type=int,
+        default=PROBE_PAYLOAD_MB_DEFAULT,
+        help=f"Payload size in MB (default: {PROBE_PAYLOAD_MB_DEFAULT})",
+    )
 
-    for entry in sources_obj.sources:
-        try:
-            source = resolve_source(entry)
-            install_apk(entry.package, source, adb)
+    parser_push_data = subparsers.add_parser("push-data", help="Push data files (OBB) of all sources")
+    parser_push_data.add_argument("--all-devices", action="store_true", help="Push to every online device")
 
-        except Exception as e:
-            logger.error(f"Error for {entry.package}: {e}")
+    parser_verify = subparsers.add_parser("verify", help="Verify installed APKs by on-device SHA-256")
+    parser_verify.add_argument("--all-devices", action="store_true", help="Verify every online device")
 
-    check_installed_apps(sources_obj.sources)
+    parser_coordinator = subparsers.add_parser("coordinator", help="Serve sources and jobs to workers")
+    parser_coordinator.add_argument(
+        "-j", "--jobs",
+        type=int,
+        default=PREFETCH_WORKERS_DEFAULT,
+        help=f"Sources resolved in parallel (default: {PREFETCH_WORKERS_DEFAULT})",
+    )
+
+    parser_worker = subparsers.add_parser("worker", help="Provision local devices with jobs from a coordinator")
+    parser_worker.add_argument(
+        "--coordinator",
+        default=f"http://{config_obj.coordinator_host}:{config_obj.coordinator_port}",
+        help="Coordinator URL (default: from config.yaml)",
+    )
+    parser_worker.add_argument("--name", default=None, help="Worker name (default: host name)")
+
+    args = parser.parse_args()
+
+    if args.command == "daemon":
+        run_daemon()
+
+    elif args.command == "prefetch":
+        run_prefetch(args.jobs)
+
+    elif args.command == "lock":
+        run_lock(None, update=False, jobs=args.jobs)
+
+    elif args.command == "update":
+        run_lock(args.packages, update=True, jobs=args.jobs, check_only=args.check, write_lock=args.lock)
+
+    elif args.command == "coordinator":
+        run_coordinator(args.jobs)
+
+    elif args.command == "worker":
+        run_worker(args.coordinator, args.name)
+
+    elif args.command == "plan":
+        run_plan(args.all_devices)
+
+    elif args.command == "probe":
+        run_probe(args.size)
+
+    elif args.command == "push-data":
+        run_push_data(args.all_devices)
+
+    elif args.command == "verify":
+        run_verify(args.all_devices)
+
+    elif args.command == "reconcile":
+        run_reconcile(args.dry_run, args.uninstall, args.all_devices)
+
+    else:
+        run_install()
 
 
 if __name__ == "__main__":
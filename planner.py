@@ -0,0 +1,223 @@
+from pathlib import Path
+
+from pydantic import BaseModel, Field
+from ten_utils.log import Logger
+
+from adb.command import Adb
+from common.constants import PLAN_INSTALL_SPACE_FACTOR
+from common.helpers import sizeof_fmt
+from common.throughput import get_throughput
+from data_files import (
+    query_remote_sizes,
+    remote_data_path,
+    resolve_data_file,
+)
+from validation.sources import SourceEntry
+
+logger = Logger(__name__)
+
+_MARK_MOUNT = "@@mount"
+
+# Free space of both volumes, read in one adb shell round trip
+QUERY_FREE_SPACE = (
+    f'for p in /data /sdcard; do echo "{_MARK_MOUNT} $p"; '
+    'df -k "$p" 2>/dev/null | tail -n +2; done'
+)
+
+
+class DevicePlan(BaseModel):
+    """
+    Capacity plan of one device, computed before anything is transferred.
+
+    Attributes:
+        serial (str | None): Device serial.
+        free_data (int | None): Free bytes on /data (None if unknown).
+        free_sdcard (int | None): Free bytes on /sdcard (None if unknown).
+        shared_storage (bool): /sdcard is emulated on the /data partition,
+            so both draw from the same free space.
+        required_data (int): Bytes the scheduled apps need on /data.
+        required_sdcard (int): Bytes the scheduled data files need on /sdcard.
+        transfer_bytes (int): Bytes that will be pushed for the scheduled entries.
+        throughput (float): Expected transfer rate in bytes/s.
+        estimated_seconds (float): Expected duration of the transfers.
+        scheduled (list[str]): Packages that fit, in install order.
+        rejected (dict[str, str]): Packages that do not fit → reason.
+    """
+    serial: str | None = None
+    free_data: int | None = None
+    free_sdcard: int | None = None
+    shared_storage: bool = False
+    required_data: int = 0
+    required_sdcard: int = 0
+    transfer_bytes: int = 0
+    throughput: float = 0
+    estimated_seconds: float = 0
+    scheduled: list[str] = Field(default_factory=list)
+    rejected: dict[str, str] = Field(default_factory=dict)
+
+
+def query_free_space(adb: Adb) -> tuple[int | None, int | None, bool]:
+    """
+    Read the free space of /data and /sdcard with one shell call.
+
+    Args:
+        adb (Adb): Adb client with the target device set.
+
+    Returns:
+        tuple[int | None, int | None, bool]:
+            - Free bytes on /data (None if `df` output is not understood,
+              e.g. toolbox `df` on Android < 6 without `-k`).
+            - Free bytes on /sdcard (None likewise).
+            - True if /sdcard lives on the /data partition: same file
+              system, or the same total size as FUSE/sdcardfs report it.
+    """
+    output = adb.shell(QUERY_FREE_SPACE, check=False).stdout
+
+    volumes: dict[str, list[str]] = {}
+    current = None
+    for line in output.splitlines():
+        if line.startswith(_MARK_MOUNT):
+            current = line[len(_MARK_MOUNT):].strip()
+            volumes[current] = []
+
+        elif current is not None:
+            # toybox may wrap long file system names onto their own line
+            volumes[current] += line.split()
+
+    def available(fields: list[str]) -> int | None:
+        return int(fields[3]) * 1024 if len(fields) > 3 and fields[3].isdigit() else None
+
+    data_fields = volumes.get("/data", [])
+    sdcard_fields = volumes.get("/sdcard", [])
+    shared = len(data_fields) > 1 and len(sdcard_fields) > 1 and (
+        data_fields[0] == sdcard_fields[0] or data_fields[1] == sdcard_fields[1]
+    )
+
+    return available(data_fields), available(sdcard_fields), shared
+
+
+def artifact_size(source: Path) -> int:
+    """
+    Return the total size of an APK file or split-APK directory in bytes.
+    """
+    if source.is_dir():
+        return sum(apk_file.stat().st_size for apk_file in source.rglob("*.apk"))
+
+    return source.stat().st_size
+
+
+def plan_device(
+        adb: Adb,
+        entries: list[SourceEntry],
+        resolved: dict[str, Path],
+) -> DevicePlan:
+    """
+    Check which entries fit on the device and estimate how long they take.
+
+    Args:
+        adb (Adb): Adb client with the target device set.
+        entries (list[SourceEntry]): Entries to install, in order.
+        resolved (dict[str, Path]): Package → resolved APK file or directory.
+            Entries missing here are ignored.
+
+    Returns:
+        DevicePlan: Scheduled and rejected packages with sizes and estimates.
+
+    Workflow:
+        - Reads free space of /data and /sdcard in one shell call.
+        - An app needs PLAN_INSTALL_SPACE_FACTOR × its APK size on /data
+          (staged copy plus installed copy); its data files need the bytes
+          not already on the device (one more shell call, only if there
+          are data files).
+        - Entries are scheduled in order while they fit; the rest are
+          rejected, so nothing is pushed that cannot be installed.
+        - Duration is the pushed bytes divided by the device's recorded
+          throughput (see `record_throughput`).
+
+    Notes:
+        - Unknown free space (unparsable `df`) is treated as unlimited.
+        - Data files that cannot be resolved are left to `sync_data`,
+          which reports the error.
+    """
+    free_data, free_sdcard, shared = query_free_space(adb)
+    plan = DevicePlan(
+        serial=adb.device,
+        free_data=free_data,
+        free_sdcard=free_sdcard,
+        shared_storage=shared,
+        throughput=get_throughput(adb.device),
+    )
+
+    data_sizes: dict[str, dict[str, int]] = {}
+    for entry in entries:
+        if entry.package not in resolved:
+            continue
+
+        for data in entry.data:
+            try:
+                local = resolve_data_file(entry.package, data)
+
+            except Exception:
+                continue
+
+            data_sizes.setdefault(entry.package, {})[remote_data_path(entry.package, data)] = local.stat().st_size
+
+    remotes = [remote for sizes in data_sizes.values() for remote in sizes]
+    remote_sizes = query_remote_sizes(adb, remotes) if remotes else {}
+
+    remaining_data = free_data
+    remaining_sdcard = free_data if shared else free_sdcard
+
+    for entry in entries:
+        if entry.package not in resolved:
+            continue
+
+        apk_size = artifact_size(resolved[entry.package])
+        need_data = int(apk_size * PLAN_INSTALL_SPACE_FACTOR)
+        need_sdcard = sum(
+            max(size - (remote_sizes.get(remote) or 0), 0)
+            for remote, size in data_sizes.get(entry.package, {}).items()
+        )
+        pushed = apk_size + sum(
+            size for remote, size in data_sizes.get(entry.package, {}).items()
+            if remote_sizes.get(remote) != size
+        )
+
+        if shared:
+            fits = remaining_data is None or need_data + need_sdcard <= remaining_data
+
+        else:
+            fits = (remaining_data is None or need_data <= remaining_data) and \
+                   (remaining_sdcard is None or need_sdcard <= remaining_sdcard)
+
+        if not fits:
+            plan.rejected[entry.package] = (
+                f"Insufficient storage: needs {sizeof_fmt(need_data)} on /data and "
+                f"{sizeof_fmt(need_sdcard)} on /sdcard, "
+                f"{sizeof_fmt(remaining_data or 0)} / {sizeof_fmt(remaining_sdcard or 0)} left"
+            )
+            continue
+
+        if remaining_data is not None:
+            remaining_data -= need_data + (need_sdcard if shared else 0)
+
+        if shared:
+            remaining_sdcard = remaining_data
+
+        elif remaining_sdcard is not None:
+            remaining_sdcard -= need_sdcard
+
+        plan.scheduled.append(entry.package)
+        plan.required_data += need_data
+        plan.required_sdcard += need_sdcard
+        plan.transfer_bytes += pushed
+
+    plan.estimated_seconds = plan.transfer_bytes / plan.throughput
+
+    logger.info(
+        f"{adb.device}: {len(plan.scheduled)} scheduled, {len(plan.rejected)} rejected, "
+        f"{sizeof_fmt(plan.transfer_bytes)} to transfer, ~{plan.estimated_seconds:.0f}s "
+        f"at {sizeof_fmt(plan.throughput)}/s"
+    )
+
+    return plan
@@ -0,0 +1,161 @@
+from shlex import quote
+
+from ten_utils.log import Logger
+
+from adb.command import Adb
+from validation.sources import (
+    PostInstallAction,
+    SourceEntry,
+)
+
+logger = Logger(__name__)
+
+MARKER_BEGIN = "__PACKDROID_ACTION__"
+MARKER_STATUS = "__PACKDROID_STATUS__"
+
+# Output of old `pm` builds that exit with 0 even when the command failed
+_FAILURE_PREFIXES = ("Error", "Exception", "Failure", "Bad argument", "Security exception")
+
+
+def action_command(package: str, action: PostInstallAction) -> str:
+    """
+    Return the device shell command of one post-install action.
+
+    Args:
+        package (str): Package the action applies to.
+        action (PostInstallAction): Action definition.
+
+    Returns:
+        str: Shell command line, arguments quoted.
+    """
+    if action.action in ("grant", "revoke"):
+        return f"pm {action.action} {quote(package)} {quote(action.permission)}"
+
+    elif action.action == "appops":
+        return f"appops set {quote(package)} {quote(action.op)} {quote(action.mode)}"
+
+    elif action.action == "home-activity":
+        component = action.activity if "/" in action.activity else f"{package}/{action.activity}"
+        return f"cmd package set-home-activity {quote(component)}"
+
+    elif action.action == "disable":
+        return f"pm disable-user {quote(package)}"
+
+    return f"pm enable {quote(package)}"
+
+
+def describe_action(action: PostInstallAction) -> str:
+    """
+    Return a short human-readable label of an action for logs and errors.
+    """
+    argument = action.permission or action.op or action.activity
+    return f"{action.action} {argument}" if argument else action.action
+
+
+def build_actions_script(actions: list[tuple[str, PostInstallAction]]) -> str:
+    """
+    Compile actions into one device shell script with delimited results.
+
+    Args:
+        actions (list[tuple[str, PostInstallAction]]): (package, action) pairs, in run order.
+
+    Returns:
+        str: Script printing, for action `i`, a `MARKER_BEGIN i` line, the
+        command's output and a `MARKER_STATUS i <exit code>` line. A failing
+        action does not stop the following ones.
+    """
+    lines = []
+
+    for idx, (package, action) in enumerate(actions):
+        lines.append(f"echo {MARKER_BEGIN} {idx}")
+        lines.append(f"{action_command(package, action)} 2>&1")
+        lines.append(f"echo {MARKER_STATUS} {idx} $?")
+
+    return "\n".join(lines)
+
+
+def parse_actions_output(output: str, count: int) -> list[str | None]:
+    """
+    Split the output of `build_actions_script` into per-action results.
+
+    Args:
+        output (str): Stdout of the script.
+        count (int): Number of actions in the script.
+
+    Returns:
+        list[str | None]: Per action: None on success, otherwise the
+        command's output or the reason it has no result (e.g. the shell
+        session was cut off).
+    """
+    results: list[str | None] = ["no result (shell session ended early)"] * count
+    current: int | None = None
+    captured: list[str] = []
+
+    for line in output.splitlines():
+        words = line.split()
+
+        if len(words) == 2 and words[0] == MARKER_BEGIN and words[1].isdigit():
+            current, captured = int(words[1]), []
+
+        elif len(words) == 3 and words[0] == MARKER_STATUS and words[1].isdigit():
+            idx = int(words[1])
+            text = "\n".join(captured).strip()
+
+            if idx < count:
+                failed = words[2] != "0" or any(
+                    captured_line.strip().startswith(_FAILURE_PREFIXES) for captured_line in captured
+                )
+                results[idx] = (text or f"exit code {words[2]}") if failed else None
+
+            current = None
+
+        elif current is not None:
+            captured.append(line)
+
+    return results
+
+
+def run_post_install(adb: Adb, entries: list[SourceEntry]) -> dict[str, str | None]:
+    """
+    Run the post-install actions of `entries` on the device in one shell session.
+
+    Args:
+        adb (Adb): Adb client with the target device set.
+        entries (list[SourceEntry]): Installed entries whose `actions` are run.
+
+    Returns:
+        dict[str, str | None]: Package → None if all its actions succeeded,
+        or the first error message. Entries without actions are not included.
+
+    Notes:
+        - All actions of all entries cost a single `adb shell` round trip,
+          however many permissions and app ops they set.
+        - Actions are idempotent (granting a granted permission succeeds),
+          so running them again on an up-to-date device is safe.
+    """
+    actions = [(entry.package, action) for entry in entries for action in entry.actions]
+    if not actions:
+        return {}
+
+    result = adb.shell(build_actions_script(actions), check=False)
+    outcomes = parse_actions_output(result.stdout, len(actions))
+
+    if all(outcome is not None for outcome in outcomes) and result.returncode != 0:
+        # adb itself failed (device gone); report its error rather than "no result"
+        error = (result.stderr or result.stdout).strip() or f"adb exited with code {result.returncode}"
+        logger.error(f"{adb.device}: failed to run post-install actions: {error}")
+        return {package: error for package, _ in actions}
+
+    results: dict[str, str | None] = {}
+    for (package, action), outcome in zip(actions, outcomes):
+        results.setdefault(package, None)
+
+        if outcome is not None:
+            logger.error(f"{adb.device}: {describe_action(action)} failed for {package}: {outcome}")
+            results[package] = results[package] or f"{describe_action(action)}: {outcome}"
+
+    logger.info(
+        f"{adb.device}: ran {len(actions)} post-install action(s), "
+        f"{sum(outcome is not None for outcome in outcomes)} failed"
+    )
+    return results
@@ -0,0 +1,201 @@
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+import json
+import os
+import statistics
+import tempfile
+import time
+
+from pydantic import BaseModel, Field
+from ten_utils.log import Logger
+
+from adb.command import Adb
+from common.constants import (
+    DEVICE_PROBE_FILE,
+    PATH_LINK_STATS,
+    PROBE_LATENCY_ROUNDS,
+)
+from common.locks import artifact_lock
+from common.throughput import record_throughput
+from config import config_obj
+
+logger = Logger(__name__)
+
+MB = 1024 * 1024
+
+
+class LinkProfile(BaseModel):
+    """
+    Measured quality of the adb link to one device.
+
+    Attributes:
+        serial (str): Device serial.
+        port (str): USB port path from `adb devices -l` (e.g. "1-1.2"),
+            "tcp" for network devices, or "unknown".
+        latency_ms (float | None): Median adb shell round-trip time.
+        push_mbps (float | None): Push rate in MB/s.
+        pull_mbps (float | None): Pull rate in MB/s.
+        slow (bool): Below `probe_min_throughput` or above `probe_max_latency`.
+        error (str | None): Why the probe failed, if it did.
+        measured_at (float): UNIX timestamp.
+    """
+    serial: str
+    port: str = "unknown"
+    latency_ms: float | None = None
+    push_mbps: float | None = None
+    pull_mbps: float | None = None
+    slow: bool = False
+    error: str | None = None
+    measured_at: float = Field(default_factory=time.time)
+
+
+def make_payload(size_mb: int) -> Path:
+    """
+    Write an incompressible payload of `size_mb` MB into a temporary file.
+
+    Random data keeps adb's transfer compression from inflating the rates.
+    The caller removes the file.
+    """
+    fd, path = tempfile.mkstemp(prefix="packdroid-probe-", suffix=".bin")
+
+    with os.fdopen(fd, "wb") as payload:
+        for _ in range(size_mb):
+            payload.write(os.urandom(MB))
+
+    return Path(path)
+
+
+def probe_device(adb: Adb, payload: Path, port: str = "unknown") -> LinkProfile:
+    """
+    Measure latency and push/pull throughput of one device.
+
+    Args:
+        adb (Adb): Adb client with the target device set.
+        payload (Path): Local payload file (see `make_payload`).
+        port (str, optional): Port label stored with the result. Defaults to "unknown".
+
+    Returns:
+        LinkProfile: Measurements; `error` is set if a step failed.
+
+    Workflow:
+        - Latency: median of PROBE_LATENCY_ROUNDS `Adb.ping` round trips.
+        - Push: times `adb push` of the payload to DEVICE_PROBE_FILE.
+        - Pull: times `adb pull` of the same file back, then removes it.
+        - The push rate is added to the device's throughput history, which
+          `plan_device` uses for duration estimates.
+    """
+    profile = LinkProfile(serial=adb.device, port=port)
+    size = payload.stat().st_size
+
+    round_trips = []
+    for _ in range(PROBE_LATENCY_ROUNDS):
+        started = time.monotonic()
+
+        if not adb.ping(timeout=10):
+            profile.error = "Device is not responding"
+            profile.slow = True
+            return profile
+
+        round_trips.append(time.monotonic() - started)
+
+    profile.latency_ms = statistics.median(round_trips) * 1000
+
+    with tempfile.TemporaryDirectory(prefix="packdroid-probe-") as pull_dir:
+        try:
+            started = time.monotonic()
+            result = adb.push([payload], DEVICE_PROBE_FILE)
+            push_seconds = time.monotonic() - started
+
+            if result.returncode != 0:
+                profile.error = f"Push failed: {(result.stderr or result.stdout).strip()}"
+
+            else:
+                profile.push_mbps = size / MB / push_seconds
+                record_throughput(adb.device, size, push_seconds)
+
+                started = time.monotonic()
+                result = adb.pull(DEVICE_PROBE_FILE, Path(pull_dir) / payload.name)
+                pull_seconds = time.monotonic() - started
+
+                if result.returncode != 0:
+                    profile.error = f"Pull failed: {(result.stderr or result.stdout).strip()}"
+
+                else:
+                    profile.pull_mbps = size / MB / pull_seconds
+
+        finally:
+            adb.shell(f"rm -f {DEVICE_PROBE_FILE}", check=False)
+
+    rates = [rate for rate in (profile.push_mbps, profile.pull_mbps) if rate is not None]
+    profile.slow = (
+        profile.error is not None
+        or any(rate < config_obj.probe_min_throughput for rate in rates)
+        or profile.latency_ms > config_obj.probe_max_latency
+    )
+
+    return profile
+
+
+def save_link_profiles(profiles: list[LinkProfile]) -> None:
+    """
+    Store profiles in PATH_LINK_STATS, keyed by "serial@port".
+
+    A device moved to another port or hub gets a separate record, so the
+    file shows which ports are slow for the same phone.
+    """
+    with artifact_lock("links"):
+        try:
+            with open(PATH_LINK_STATS) as stats_file:
+                stats = json.load(stats_file)
+
+        except (OSError, ValueError):
+            stats = {}
+
+        for profile in profiles:
+            stats[f"{profile.serial}@{profile.port}"] = json.loads(profile.model_dump_json())
+
+        PATH_LINK_STATS.parent.mkdir(parents=True, exist_ok=True)
+        partial = PATH_LINK_STATS.with_name(f"{PATH_LINK_STATS.name}.part")
+
+        with open(partial, "w") as stats_file:
+            json.dump(stats, stats_file, indent=2, sort_keys=True)
+
+        os.replace(partial, PATH_LINK_STATS)
+
+
+def probe_devices(devices: dict[str, str], size_mb: int) -> list[LinkProfile]:
+    """
+    Probe several devices in parallel and store the results.
+
+    Args:
+        devices (dict[str, str]): Device serial → port label.
+        size_mb (int): Payload size in MB.
+
+    Returns:
+        list[LinkProfile]: One profile per device, in input order.
+
+    Notes:
+        - Devices on the same hub share its bandwidth, so probing them
+          together shows the rates they get during a parallel install run.
+    """
+    payload = make_payload(size_mb)
+
+    def probe_serial(serial: str) -> LinkProfile:
+        adb = Adb()
+        adb.set_device(serial)
+
+        try:
+            return probe_device(adb, payload, port=devices[serial])
+
+        except Exception as e:
+            return LinkProfile(serial=serial, port=devices[serial], slow=True, error=str(e))
+
+    try:
+        with ThreadPoolExecutor(max_workers=len(devices) or 1) as executor:
+            profiles = list(executor.map(probe_serial, devices))
+
+    finally:
+        payload.unlink()
+
+    save_link_profiles(profiles)
+    return profiles
@@ -0,0 +1,459 @@
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import AsyncIterator, Callable, Literal
+import asyncio
+import threading
+import time
+
+from pydantic import BaseModel, Field
+from ten_utils.log import Logger
+
+from _utils import init_check_paths
+from adb.command import Adb
+from adb.install import check_adb_install
+from raccoon.install import check_raccoon_bin_install
+from common.constants import NETWORK_PING_TIMEOUT
+from install_apps import resolve_source, provision_device
+from lockfile import load_lockfile
+from reconcile import (
+    DeviceDiff,
+    compute_diff,
+    desired_version_code,
+    query_installed,
+    reconcile_device,
+)
+from verify import verify_hashes
+from validation.sources import (
+    Sources,
+    SourceEntry,
+)
+
+logger = Logger(__name__)
+
+
+class ProgressEvent(BaseModel):
+    """
+    Progress notification emitted by `Provisioner`.
+
+    Attributes:
+        stage (Literal["resolve", "install", "verify", "reconcile"]): Operation.
+        status (Literal["started", "done", "failed"]): What happened.
+        serial (str | None): Device serial; None for device-independent stages.
+        package (str | None): Package, for per-package events.
+        message (str | None): Error message of failed events.
+        timestamp (float): UNIX timestamp.
+    """
+    stage: Literal["resolve", "install", "verify", "reconcile"]
+    status: Literal["started", "done", "failed"]
+    serial: str | None = None
+    package: str | None = None
+    message: str | None = None
+    timestamp: float = Field(default_factory=time.time)
+
+
+class DeviceResult(BaseModel):
+    """
+    Outcome of one operation on one device.
+
+    Attributes:
+        serial (str): Device serial.
+        results (dict[str, str | None]): Package → None on success, or the error message.
+        error (str | None): Device-level error (e.g. device unreachable);
+            `results` is incomplete if set.
+    """
+    serial: str
+    results: dict[str, str | None] = Field(default_factory=dict)
+    error: str | None = None
+
+    @property
+    def ok(self) -> bool:
+        """
+        True if the device and every package succeeded.
+        """
+        return self.error is None and all(error is None for error in self.results.values())
+
+
+def run_device(
+        serial: str,
+        work: Callable[[Adb], object],
+        make_result: Callable,
+        on_status: Callable[[str, str | None], None] | None = None,
+):
+    """
+    Run `work` on one device and wrap its outcome.
+
+    A failure is logged and handed to `make_result` instead of raised, so
+    one device never takes the others down.
+
+    Args:
+        serial (str): Device serial.
+        work (Callable[[Adb], object]): Blocking per-device operation.
+        make_result (Callable): (serial, value | None, error | None) → result.
+        on_status (Callable[[str, str | None], None] | None, optional):
+            Called with ("started" | "done" | "failed", error message). Defaults to None.
+    """
+    notify = on_status or (lambda status, message: None)
+    adb = Adb()
+    adb.set_device(serial)
+    notify("started", None)
+
+    try:
+        value = work(adb)
+
+    except Exception as e:
+        logger.error(f"{serial}: {e}")
+        notify("failed", str(e))
+        return make_result(serial, None, str(e))
+
+    notify("done", None)
+    return make_result(serial, value, None)
+
+
+def map_devices(serials: list[str], work: Callable[[Adb], object], make_result: Callable) -> list:
+    """
+    Run `work` for every device in parallel threads (see `run_device`).
+
+    Returns:
+        list: One result per serial, in `serials` order.
+    """
+    with ThreadPoolExecutor(max_workers=max(len(serials), 1)) as executor:
+        return list(executor.map(lambda serial: run_device(serial, work, make_result), serials))
+
+
+class Provisioner:
+    """
+    Headless asyncio API for provisioning a set of devices.
+
+    The library counterpart of the CLI: no interactive device selection,
+    no `logger.critical` exits. Every failure is returned as data in
+    `DeviceResult` / `DeviceDiff`. Blocking adb and download work runs on a
+    private thread pool, so the event loop stays responsive and many
+    provisioners can share one process.
+
+    Example:
+        async with Provisioner(sources, ["emulator-5554", "10.0.0.7:5555"]) as provisioner:
+            await provisioner.resolve()
+            for result in await provisioner.install():
+                print(result.serial, result.ok)
+
+    Attributes:
+        sources (Sources): Desired sources.
+        devices (list[str]): Target device serials.
+    """
+
+    def __init__(
+            self,
+            sources: Sources,
+            devices: list[str],
+            resolve: Callable[[SourceEntry], Path | None] = resolve_source,
+            max_devices: int = 4,
+            on_event: Callable[[ProgressEvent], None] | None = None,
+    ):
+        """
+        Initialize the provisioner.
+
+        Args:
+            sources (Sources): Desired sources.
+            devices (list[str]): Target device serials (as listed by `adb devices`).
+            resolve (Callable, optional):
+                Entry resolver, e.g. `make_locked_resolver(lock)`.
+                Defaults to `resolve_source`.
+            max_devices (int, optional): Devices worked on in parallel. Defaults to 4.
+            on_event (Callable[[ProgressEvent], None] | None, optional):
+                Called on the event loop for every progress event. Defaults to None.
+
+        Notes:
+            - Nothing is created or downloaded here; see `prepare`.
+        """
+        self.sources = sources
+        self.devices = list(devices)
+        self.__resolve = resolve
+        self.__on_event = on_event
+        self.__executor = ThreadPoolExecutor(max_workers=max_devices, thread_name_prefix="packdroid")
+        self.__resolved: dict[str, Path] = {}
+        self.__resolve_locks: defaultdict[str, threading.Lock] = defaultdict(threading.Lock)
+        self.__loop: asyncio.AbstractEventLoop | None = None
+        self.__subscribers: list[asyncio.Queue] = []
+        self.__prepare_lock = threading.Lock()
+        self.__prepared = False
+
+    async def __aenter__(self) -> "Provisioner":
+        await self.prepare()
+        return self
+
+    async def __aexit__(self, exc_type, exc_val, exc_tb) -> None:
+        self.close()
+
+    def close(self) -> None:
+        """
+        Shut down the worker threads once running operations have finished.
+        """
+        self.__executor.shutdown(wait=False)
+
+    async def events(self) -> AsyncIterator[ProgressEvent]:
+        """
+        Subscribe to progress events.
+
+        Yields:
+            ProgressEvent: Every event emitted after subscribing, until the
+            consuming task is cancelled.
+        """
+        queue: asyncio.Queue = asyncio.Queue()
+        self.__subscribers.append(queue)
+
+        try:
+            while True:
+                yield await queue.get()
+
+        finally:
+            self.__subscribers.remove(queue)
+
+    def __emit(self, **fields) -> None:
+        """
+        Publish an event from any thread to the callback and subscribers.
+        """
+        event = ProgressEvent(**fields)
+
+        def publish() -> None:
+            if self.__on_event is not None:
+                self.__on_event(event)
+
+            for queue in self.__subscribers:
+                queue.put_nowait(event)
+
+        self.__loop.call_soon_threadsafe(publish)
+
+    def __prepare(self) -> None:
+        """
+        Blocking part of `prepare`; runs once per provisioner.
+        """
+        with self.__prepare_lock:
+            if self.__prepared:
+                return
+
+            init_check_paths()
+
+            try:
+                check_adb_install()
+
+                if any(entry.method == "raccoon" for entry in self.sources.sources):
+                    check_raccoon_bin_install()
+
+            except Exception as e:
+                raise RuntimeError(f"Could not install the adb or Raccoon binaries: {e}") from e
+
+            self.__prepared = True
+
+    async def prepare(self) -> None:
+        """
+        Create the config and cache paths and install missing binaries.
+
+        Downloads the adb binary (and Raccoon, if a source needs it) like
+        the CLI does on startup. Called by `__aenter__` and before every
+        operation; only the first call does any work.
+
+        Raises:
+            RuntimeError: If a binary could not be downloaded or installed.
+        """
+        await self.__run(self.__prepare)
+
+    async def __run(self, func: Callable, *args):
+        """
+        Run blocking `func(*args)` on the provisioner's thread pool.
+        """
+        return await asyncio.get_running_loop().run_in_executor(self.__executor, func, *args)
+
+    def __entries(self, packages: list[str] | None) -> list[SourceEntry]:
+        """
+        Return the entries for `packages` (all if None).
+
+        Raises:
+            ValueError: If a package is not listed in the sources.
+        """
+        if packages is None:
+            return self.sources.sources
+
+        unknown = set(packages) - {entry.package for entry in self.sources.sources}
+        if unknown:
+            raise ValueError(f"Packages not in sources: {', '.join(sorted(unknown))}")
+
+        return [entry for entry in self.sources.sources if entry.package in packages]
+
+    def __resolve_cached(self, entry: SourceEntry) -> Path | None:
+        """
+        Resolve an entry once per provisioner (thread-safe).
+        """
+        with self.__resolve_locks[entry.package]:
+            source = self.__resolved.get(entry.package)
+
+            if source is None or not source.exists():
+                self.__emit(stage="resolve", status="started", package=entry.package)
+
+                try:
+                    source = self.__resolve(entry)
+
+                except Exception as e:
+                    self.__emit(stage="resolve", status="failed", package=entry.package, message=str(e))
+                    raise
+
+                self.__resolved[entry.package] = source
+                self.__emit(stage="resolve", status="done", package=entry.package)
+
+        return source
+
+    async def resolve(self, packages: list[str] | None = None) -> dict[str, str | None]:
+        """
+        Resolve (download) sources into the cache without touching devices.
+
+        Args:
+            packages (list[str] | None, optional): Packages to resolve. Defaults to all.
+
+        Returns:
+            dict[str, str | None]: Package → None on success, or the error message.
+        """
+        entries = self.__entries(packages)
+        self.__loop = asyncio.get_running_loop()
+        await self.prepare()
+
+        async def resolve_entry(entry: SourceEntry) -> str | None:
+            try:
+                await self.__run(self.__resolve_cached, entry)
+
+            except Exception as e:
+                return str(e)
+
+            return None
+
+        errors = await asyncio.gather(*(resolve_entry(entry) for entry in entries))
+        return {entry.package: error for entry, error in zip(entries, errors)}
+
+    async def __per_device(self, stage: str, work: Callable[[Adb], object], make_result: Callable) -> list:
+        """
+        Run `work` for every device in parallel and wrap its outcome.
+
+        Args:
+            stage (str): Stage name for progress events.
+            work (Callable[[Adb], object]): Blocking per-device operation.
+            make_result (Callable): (serial, value | None, error | None) → result model.
+        """
+        self.__loop = asyncio.get_running_loop()
+        await self.prepare()
+
+        async def run_serial(serial: str):
+            def on_status(status: str, message: str | None) -> None:
+                self.__emit(stage=stage, status=status, serial=serial, message=message)
+
+            return await self.__run(run_device, serial, work, make_result, on_status)
+
+        return list(await asyncio.gather(*(run_serial(serial) for serial in self.devices)))
+
+    async def install(self, packages: list[str] | None = None) -> list[DeviceResult]:
+        """
+        Install sources on every device (see `provision_device`).
+
+        Args:
+            packages (list[str] | None, optional): Packages to install. Defaults to all.
+
+        Returns:
+            list[DeviceResult]: One result per device, in `devices` order.
+        """
+        entries = self.__entries(packages)
+
+        def install_device(adb: Adb) -> dict[str, str | None]:
+            results = provision_device(adb, entries, resolve=self.__resolve_cached)
+
+            for package, error in results.items():
+                self.__emit(
+                    stage="install",
+                    status="done" if error is None else "failed",
+                    serial=adb.device,
+                    package=package,
+                    message=error,
+                )
+
+            return results
+
+        return await self.__per_device(
+            "install",
+            install_device,
+            lambda serial, results, error: DeviceResult(serial=serial, results=results or {}, error=error),
+        )
+
+    async def verify(self, packages: list[str] | None = None, hashes: bool = False) -> list[DeviceResult]:
+        """
+        Check that sources are installed (and recent enough) on every device.
+
+        Args:
+            packages (list[str] | None, optional): Packages to check. Defaults to all.
+            hashes (bool, optional):
+                If True, compare on-device SHA-256 digests of the installed
+                APKs with the artifacts instead of versionCodes
+                (`verify_hashes`); sources are resolved first. Defaults to False.
+
+        Returns:
+            list[DeviceResult]: Package → None if installed with at least the
+            desired versionCode (or, with `hashes`, byte-identical to the
+            artifact), otherwise the reason. One shell call per device.
+        """
+        entries = self.__entries(packages)
+
+        def verify_device(adb: Adb) -> dict[str, str | None]:
+            lock = load_lockfile()
+
+            # An unreachable device would otherwise look like one with nothing installed
+            if not adb.ping(timeout=NETWORK_PING_TIMEOUT):
+                raise RuntimeError(f"Device {adb.device} is not responding")
+
+            if hashes:
+                return verify_hashes(adb, entries, resolve=self.__resolve_cached, lock=lock)
+
+            installed, third_party = query_installed(adb)
+            diff = compute_diff(entries, installed, third_party, [], lock=lock)
+
+            results: dict[str, str | None] = {package: None for package in diff.up_to_date}
+            results.update({package: "not installed" for package in diff.to_install})
+            results.update({
+                package: "versionCode unknown on this device (Android < 9), verify with hashes"
+                for package in diff.unknown_version
+            })
+            results.update({
+                package: f"versionCode {installed[package]} < {desired_version_code(entry, lock)}"
+                for entry in entries if (package := entry.package) in diff.to_upgrade
+            })
+
+            return results
+
+        return await self.__per_device(
+            "verify",
+            verify_device,
+            lambda serial, results, error: DeviceResult(serial=serial, results=results or {}, error=error),
+        )
+
+    async def reconcile(self, uninstall: bool = False, dry_run: bool = False) -> list[DeviceDiff]:
+        """
+        Apply only the diff between sources and every device (see `reconcile_device`).
+
+        Args:
+            uninstall (bool, optional): Uninstall extraneous packages allowed by
+                `uninstall_allowlist`. Defaults to False.
+            dry_run (bool, optional): Only compute the diffs. Defaults to False.
+
+        Returns:
+            list[DeviceDiff]: One diff per device. A device that could not be
+            reconciled gets an empty diff with the error under the "*" key
+            of `results`.
+        """
+        def reconcile_one(adb: Adb) -> DeviceDiff:
+            return reconcile_device(
+                adb,
+                self.sources.sources,
+                resolve=self.__resolve_cached,
+                uninstall=uninstall,
+                dry_run=dry_run,
+            )
+
+        def make_diff(serial: str, diff: DeviceDiff | None, error: str | None) -> DeviceDiff:
+            return diff if diff is not None else DeviceDiff(serial=serial, results={"*": error})
+
+        return await self.__per_device("reconcile", reconcile_one, make_diff)
@@ -1,7 +1,8 @@
-from .command import Raccoon
+from .command import Raccoon, parse_version_codes
 from .install import check_raccoon_bin_install
 
 __all__ = [
     "Raccoon",
+    "parse_version_codes",
     "check_raccoon_bin_install"
 ]
@@ -1,5 +1,7 @@
 from pathlib import Path
 from subprocess import CompletedProcess
+import re
+import tempfile
 
 from common.constants import (
     DIR_BIN_RACCOON,
@@ -57,3 +59,68 @@ class Raccoon:
         ]
 
         return run_cmd(cmd)
+
+    def bulk_details(self, package_names: list[str]) -> CompletedProcess:
+        """
+        Fetch Play Store details of many apps in one raccoon.jar invocation.
+
+        Only metadata is requested, no APKs are downloaded, so this takes
+        seconds regardless of app size.
+
+        Args:
+            package_names (list[str]): Target app package names.
+
+        Returns:
+            subprocess.CompletedProcess: Result with captured stdout; parse it
+            with `parse_version_codes`.
+
+        Notes:
+            - Uses raccoon.jar with `--gpa-bulk-details`, which reads the
+              package names from a file, one per line.
+        """
+        with tempfile.NamedTemporaryFile("w", prefix="packdroid-details-", suffix=".txt", delete=False) as list_file:
+            list_file.write("\n".join(package_names) + "\n")
+
+        try:
+            cmd = [
+                *self.__command_base,
+                "--gpa-bulk-details", list_file.name,
+            ]
+
+            return run_cmd(cmd, check=False, capture_output=True)
+
+        finally:
+            Path(list_file.name).unlink(missing_ok=True)
+
+
+_RE_APP_DETAILS = re.compile(r"appDetails\W*\{")
+_RE_PACKAGE_NAME = re.compile(r'"?packageName"?\s*[:=]\s*"([^"]+)"')
+_RE_VERSION_CODE = re.compile(r'"?versionCode"?\s*[:=]\s*"?(\d+)')
+
+
+def parse_version_codes(output: str) -> dict[str, int]:
+    """
+    Extract package → versionCode pairs from Raccoon details output.
+
+    Raccoon prints the Play API `DetailsResponse` messages; every app has
+    an `appDetails` block with `packageName` and `versionCode` fields.
+    Both protobuf text format (`versionCode: 123`) and JSON
+    (`"versionCode": 123`) spellings are understood.
+
+    Args:
+        output (str): stdout of `Raccoon.bulk_details`.
+
+    Returns:
+        dict[str, int]: Package name → versionCode currently on Play.
+        Apps without details (unknown or unavailable) are missing.
+    """
+    version_codes = {}
+
+    for block in _RE_APP_DETAILS.split(output)[1:]:
+        package = _RE_PACKAGE_NAME.search(block)
+        version = _RE_VERSION_CODE.search(block)
+
+        if package and version:
+            version_codes[package.group(1)] = int(version.group(1))
+
+    return version_codes
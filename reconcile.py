@@ -0,0 +1,285 @@
+from pathlib import Path
+from typing import Callable
+from fnmatch import fnmatch
+
+from pydantic import BaseModel, Field
+from ten_utils.log import Logger
+
+from adb.command import Adb
+from config import config_obj
+from data_files import sync_data
+from apk.manifest import read_apk_info
+from common.constants import DIR_APKS
+from install_apps import cached_version_code, resolve_source, provision_device, get_repository_index
+from lockfile import entry_hash, load_lockfile
+from post_install import run_post_install
+from validation.lockfile import Lockfile
+from validation.sources import SourceEntry
+
+logger = Logger(__name__)
+
+SEPARATOR = "__PACKDROID_THIRD_PARTY__"
+
+# All installed packages with versions, then the third-party subset,
+# fetched in one adb shell round trip. `pm` on Android < 9 rejects
+# `--show-versioncode` and lists nothing, so fall back to the plain listing
+QUERY_INSTALLED = (
+    "{ pm list packages --show-versioncode 2>/dev/null | grep '^package:' || pm list packages; }; "
+    f"echo {SEPARATOR}; pm list packages -3"
+)
+
+
+class DeviceDiff(BaseModel):
+    """
+    Difference between the desired `Sources` and one device.
+
+    Attributes:
+        serial (str | None): Device serial.
+        to_install (list[str]): Packages listed in sources but missing on the device.
+        to_upgrade (list[str]): Installed packages older than `desired_version_code`.
+        up_to_date (list[str]): Installed packages that need no action.
+        unknown_version (list[str]): Installed packages whose versionCode the
+            device does not report (Android < 9); they are left alone.
+        extraneous (list[str]): Third-party packages installed but not listed in sources.
+        to_uninstall (list[str]): Extraneous packages matching `uninstall_allowlist`.
+        results (dict[str, str | None]): Executed actions, package → None or error message.
+    """
+    serial: str | None = None
+    to_install: list[str] = Field(default_factory=list)
+    to_upgrade: list[str] = Field(default_factory=list)
+    up_to_date: list[str] = Field(default_factory=list)
+    unknown_version: list[str] = Field(default_factory=list)
+    extraneous: list[str] = Field(default_factory=list)
+    to_uninstall: list[str] = Field(default_factory=list)
+    results: dict[str, str | None] = Field(default_factory=dict)
+
+
+def query_installed(adb: Adb) -> tuple[dict[str, int | None], set[str]]:
+    """
+    Read installed packages and their versionCodes with one shell call.
+
+    Args:
+        adb (Adb): Adb client with the target device set.
+
+    Returns:
+        tuple[dict[str, int | None], set[str]]:
+            - Installed package → versionCode (None if the device's `pm`
+              does not support `--show-versioncode`, i.e. Android < 9).
+            - Names of third-party (user-installed) packages.
+    """
+    output = adb.shell(QUERY_INSTALLED, check=False).stdout
+    all_output, _, third_party_output = output.partition(SEPARATOR)
+
+    installed: dict[str, int | None] = {}
+    for line in all_output.splitlines():
+        if not line.startswith("package:"):
+            continue
+
+        package, _, version = line[len("package:"):].partition(" versionCode:")
+        installed[package.strip()] = int(version) if version.strip().isdigit() else None
+
+    third_party = {
+        line[len("package:"):].strip()
+        for line in third_party_output.splitlines()
+        if line.startswith("package:")
+    }
+
+    return installed, third_party
+
+
+def artifact_version_code(entry: SourceEntry) -> int | None:
+    """
+    Return the versionCode of an entry's artifact if it is available without downloading.
+
+    Args:
+        entry (SourceEntry): Raccoon, URL or local source entry.
+
+    Returns:
+        int | None: versionCode of the base APK of the local path, or of the
+        cached download; None if nothing (readable) is on disk.
+    """
+    if entry.method == "raccoon":
+        return cached_version_code(entry.package)
+
+    source = DIR_APKS / f"{entry.package}.apk" if entry.method == "url" else entry.path
+    if not source.exists():
+        return None
+
+    for apk_file in sorted(source.rglob("*.apk")) if source.is_dir() else [source]:
+        try:
+            info = read_apk_info(apk_file)
+
+        except Exception:
+            continue
+
+        if info.split is None:
+            return info.version_code
+
+    return None
+
+
+def desired_version_code(entry: SourceEntry, lock: Lockfile | None = None) -> int | None:
+    """
+    Return the minimum versionCode a device should have for `entry`.
+
+    Args:
+        entry (SourceEntry): Source entry.
+        lock (Lockfile | None, optional): Loaded `sources.lock`. Defaults to None.
+
+    Returns:
+        int | None: The first known of:
+            - the entry's explicit `version_code`;
+            - for repository sources, the highest versionCode in the
+              repository index;
+            - the versionCode recorded in `lock`, if the entry is locked
+              and its definition did not change;
+            - the versionCode of the local or already cached artifact
+              (`artifact_version_code`).
+        None if none is known; nothing is downloaded to find out.
+    """
+    if entry.version_code is not None:
+        return entry.version_code
+
+    if entry.method == "repo":
+        records = get_repository_index(entry.path).lookup(entry.package, abis=entry.abis or None)
+        return records[0].info.version_code if records else None
+
+    artifact = lock.artifacts.get(entry.package) if lock is not None else None
+    if artifact is not None and artifact.version_code is not None and artifact.entry_hash == entry_hash(entry):
+        return artifact.version_code
+
+    return artifact_version_code(entry)
+
+
+def compute_diff(
+        entries: list[SourceEntry],
+        installed: dict[str, int | None],
+        third_party: set[str],
+        allowlist: list[str],
+        lock: Lockfile | None = None,
+) -> DeviceDiff:
+    """
+    Compare desired entries with the installed package state.
+
+    Args:
+        entries (list[SourceEntry]): Desired sources.
+        installed (dict[str, int | None]): Installed package → versionCode.
+        third_party (set[str]): Third-party packages on the device.
+        allowlist (list[str]): fnmatch patterns of packages that may be uninstalled.
+        lock (Lockfile | None, optional): Loaded `sources.lock` (see
+            `desired_version_code`). Defaults to None.
+
+    Returns:
+        DeviceDiff: The diff (without serial or results).
+    """
+    diff = DeviceDiff()
+    desired = {entry.package for entry in entries}
+
+    for entry in entries:
+        if entry.package not in installed:
+            diff.to_install.append(entry.package)
+            continue
+
+        version_code = desired_version_code(entry, lock)
+
+        if version_code is not None and installed[entry.package] is None:
+            diff.unknown_version.append(entry.package)
+
+        elif version_code is not None and installed[entry.package] < version_code:
+            diff.to_upgrade.append(entry.package)
+
+        else:
+            diff.up_to_date.append(entry.package)
+
+    diff.extraneous = sorted(third_party - desired)
+    diff.to_uninstall = [
+        package for package in diff.extraneous
+        if any(fnmatch(package, pattern) for pattern in allowlist)
+    ]
+
+    return diff
+
+
+def reconcile_device(
+        adb: Adb,
+        entries: list[SourceEntry],
+        resolve: Callable[[SourceEntry], Path | None] = resolve_source,
+        uninstall: bool = False,
+        dry_run: bool = False,
+) -> DeviceDiff:
+    """
+    Bring one device to the desired state, executing only the diff.
+
+    Args:
+        adb (Adb): Adb client with the target device set.
+        entries (list[SourceEntry]): Desired sources.
+        resolve (Callable, optional): Entry resolver. Defaults to `resolve_source`.
+        uninstall (bool, optional):
+            If True, uninstall extraneous packages matching
+            `config_obj.uninstall_allowlist`. Defaults to False.
+        dry_run (bool, optional): If True, only compute and log the diff. Defaults to False.
+
+    Returns:
+        DeviceDiff: The diff and the result of every executed action.
+
+    Notes:
+        - Sources are only resolved (downloaded) for packages that need
+          installing or upgrading, so an up-to-date device costs a single
+          adb shell call (plus one each for data file sizes and post-install
+          actions, if any).
+        - Data files of every entry are synced, not only of changed
+          packages; files already on the device are skipped.
+        - Post-install actions of every installed entry are applied again
+          (one shell call), so a revoked permission is granted back.
+    """
+    installed, third_party = query_installed(adb)
+    diff = compute_diff(entries, installed, third_party, config_obj.uninstall_allowlist, lock=load_lockfile())
+    diff.serial = adb.device
+
+    logger.info(
+        f"{adb.device}: {len(diff.to_install)} to install, {len(diff.to_upgrade)} to upgrade, "
+        f"{len(diff.up_to_date)} up to date, {len(diff.extraneous)} extraneous"
+    )
+    if diff.unknown_version:
+        logger.warning(
+            f"{adb.device}: versionCode of {', '.join(diff.unknown_version)} unknown "
+            f"(Android < 9), not upgraded"
+        )
+
+    if dry_run:
+        return diff
+
+    pending = set(diff.to_install) | set(diff.to_upgrade)
+    diff.results = provision_device(
+        adb,
+        [entry for entry in entries if entry.package in pending],
+        resolve=resolve,
+        push_data=False,
+        run_actions=False,
+    )
+
+    synced = [entry for entry in entries if diff.results.get(entry.package) is None]
+    for package, error in sync_data(adb, synced).items():
+        if error is not None or package not in diff.results:
+            diff.results[package] = error
+
+    configured = [entry for entry in entries if diff.results.get(entry.package) is None]
+    for package, error in run_post_install(adb, configured).items():
+        if error is not None or package not in diff.results:
+            diff.results[package] = error
+
+    if uninstall:
+        for package in diff.to_uninstall:
+            result = adb.uninstall(package)
+            output = (result.stdout + result.stderr).strip()
+
+            # Old `pm` builds print "Failure [...]" but exit with 0
+            if result.returncode == 0 and "Failure" not in output:
+                logger.info(f"Uninstalled extraneous package {package}")
+                diff.results[package] = None
+
+            else:
+                logger.error(f"Failed to uninstall {package}: {output}")
+                diff.results[package] = output or f"exit code {result.returncode}"
+
+    return diff
@@ -1,15 +1,29 @@
 from .config import Config
+from .lockfile import (
+    Lockfile,
+    LockedArtifact,
+    LockedFile
+)
 from .sources import (
     Sources,
     SourceLocal,
     SourceUrl,
-    SourceRaccoon
+    SourceRaccoon,
+    SourceRepository,
+    SourceEntry,
+    DataFile
 )
 
 __all__ = [
     "Config",
+    "Lockfile",
+    "LockedArtifact",
+    "LockedFile",
     "Sources",
     "SourceLocal",
     "SourceUrl",
-    "SourceRaccoon"
+    "SourceRaccoon",
+    "SourceRepository",
+    "SourceEntry",
+    "DataFile"
 ]
@@ -1,4 +1,4 @@
-from typing import Union
+from typing import Literal, Union
 
 from pydantic import (
     BaseModel,
@@ -10,6 +10,18 @@ from pydantic import (
 from common.constants import (
     WEB_LINK_DEFAULT_DOWNLOAD_BIN_RACCOON,
     FILENAME_JAVA_BIN,
+    DAEMON_HOST_DEFAULT,
+    DAEMON_PORT_DEFAULT,
+    DAEMON_WORKERS_DEFAULT,
+    NETWORK_KEEPALIVE_INTERVAL_DEFAULT,
+    COORDINATOR_HOST_DEFAULT,
+    COORDINATOR_PORT_DEFAULT,
+    INSTALL_RETRIES_DEFAULT,
+    DEVICE_STAGING_MAX_BYTES_DEFAULT,
+    PROBE_MIN_THROUGHPUT_DEFAULT,
+    PROBE_MAX_LATENCY_DEFAULT,
+    LAN_SERVER_HOST_DEFAULT,
+    LAN_SERVER_PORT_DEFAULT,
 )
 from ._utils import get_adb_bin_link
 
@@ -30,7 +42,103 @@ class Config(BaseModel):
         java_bin (str | FilePath):
             Path to the Java executable used to run raccoon.jar.
             Defaults to FILENAME_JAVA_BIN (can be overridden).
+
+        daemon_host (str):
+            Interface the daemon status/job API listens on.
+            Defaults to DAEMON_HOST_DEFAULT (localhost only).
+
+        daemon_port (int):
+            TCP port of the daemon API. Defaults to DAEMON_PORT_DEFAULT.
+
+        daemon_workers (int):
+            Number of devices the daemon provisions in parallel.
+            Defaults to DAEMON_WORKERS_DEFAULT.
+
+        uninstall_allowlist (list[str]):
+            Glob patterns (fnmatch) of packages that reconcile mode may
+            uninstall when they are installed but not listed in sources.
+            Defaults to an empty list (never uninstall anything).
+
+        network_devices (list[str]):
+            TCP/IP adb endpoints ("host:port") connected and kept alive
+            by the device pool. Defaults to an empty list.
+
+        network_keepalive_interval (float):
+            Seconds between health checks of network devices.
+            Defaults to NETWORK_KEEPALIVE_INTERVAL_DEFAULT.
+
+        coordinator_host (str):
+            Interface the cluster coordinator listens on. Set it to
+            "0.0.0.0" to accept workers from other hosts.
+            Defaults to COORDINATOR_HOST_DEFAULT (localhost only).
+
+        coordinator_port (int):
+            TCP port of the coordinator API. Defaults to COORDINATOR_PORT_DEFAULT.
+
+        install_retries (int):
+            Retries of an app install after a transient (USB/transport),
+            storage or unrecognized failure. Permanent failures such as
+            INSTALL_FAILED_VERSION_DOWNGRADE are never retried.
+            Defaults to INSTALL_RETRIES_DEFAULT.
+
+        device_staging (bool):
+            Keep pushed APKs in a content-addressed cache on the device
+            (DEVICE_DIR_STAGING) and install from it, so reinstalling the
+            same build transfers nothing. Defaults to False.
+
+        device_staging_max_bytes (int):
+            Size limit of the device staging cache; least recently used
+            APKs are evicted. Defaults to DEVICE_STAGING_MAX_BYTES_DEFAULT (4 GiB).
+
+        probe_min_throughput (float):
+            Push/pull rate in MB/s below which `probe` flags a device link
+            as slow. Defaults to PROBE_MIN_THROUGHPUT_DEFAULT.
+
+        probe_max_latency (float):
+            adb shell round-trip time in ms above which `probe` flags a
+            device link as slow. Defaults to PROBE_MAX_LATENCY_DEFAULT.
+
+        push_compression (Literal["auto", "none", "lz4", "zstd", "brotli"]):
+            Compression of `adb push` transfers (device staging, data files).
+            "auto" picks a mode per file and device from sampled
+            compressibility and measured rates; other values force a mode.
+            Defaults to "auto".
+
+        lan_server (bool):
+            Serve the artifact cache over HTTP so network (TCP/IP) devices
+            download their APKs into device staging themselves, in parallel,
+            instead of through adb. Needs curl or wget on the device; other
+            devices are pushed to as usual. Defaults to False.
+
+        lan_server_host (str):
+            Interface the artifact server listens on.
+            Defaults to LAN_SERVER_HOST_DEFAULT (all interfaces).
+
+        lan_server_port (int):
+            TCP port of the artifact server. Defaults to LAN_SERVER_PORT_DEFAULT.
+
+        lan_server_address (str | None):
+            Host address devices use to reach the artifact server. Defaults
+            to None (the local address of the route to each device).
     """
     raccoon_bin_link: HttpUrl = Field(default=WEB_LINK_DEFAULT_DOWNLOAD_BIN_RACCOON)
     adb_bin_link: HttpUrl = Field(default=get_adb_bin_link())
     java_bin: Union[str, FilePath] = Field(default=FILENAME_JAVA_BIN)
+    daemon_host: str = Field(default=DAEMON_HOST_DEFAULT)
+    daemon_port: int = Field(default=DAEMON_PORT_DEFAULT)
+    daemon_workers: int = Field(default=DAEMON_WORKERS_DEFAULT, ge=1)
+    uninstall_allowlist: list[str] = Field(default=[])
+    network_devices: list[str] = Field(default=[])
+    network_keepalive_interval: float = Field(default=NETWORK_KEEPALIVE_INTERVAL_DEFAULT, gt=0)
+    coordinator_host: str = Field(default=COORDINATOR_HOST_DEFAULT)
+    coordinator_port: int = Field(default=COORDINATOR_PORT_DEFAULT)
+    install_retries: int = Field(default=INSTALL_RETRIES_DEFAULT, ge=0)
+    device_staging: bool = Field(default=False)
+    device_staging_max_bytes: int = Field(default=DEVICE_STAGING_MAX_BYTES_DEFAULT, ge=0)
+    probe_min_throughput: float = Field(default=PROBE_MIN_THROUGHPUT_DEFAULT, ge=0)
+    probe_max_latency: float = Field(default=PROBE_MAX_LATENCY_DEFAULT, gt=0)
+    push_compression: Literal["auto", "none", "lz4", "zstd", "brotli"] = Field(default="auto")
+    lan_server: bool = Field(default=False)
+    lan_server_host: str = Field(default=LAN_SERVER_HOST_DEFAULT)
+    lan_server_port: int = Field(default=LAN_SERVER_PORT_DEFAULT)
+    lan_server_address: str | None = Field(default=None)
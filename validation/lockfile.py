@@ -0,0 +1,57 @@
+from typing import Literal
+
+from pydantic import (
+    BaseModel,
+    Field,
+)
+
+
+class LockedFile(BaseModel):
+    """
+    Schema for one file of a locked artifact.
+
+    Attributes:
+        path (str): POSIX path relative to DIR_APKS for cached files,
+            or an absolute path for files outside the cache (local sources).
+        size (int): File size in bytes.
+        sha256 (str): Hex SHA-256 digest.
+    """
+    path: str
+    size: int
+    sha256: str
+
+
+class LockedArtifact(BaseModel):
+    """
+    Schema for the resolved artifact set of one source entry.
+
+    Attributes:
+        package (str): Package name.
+        method (str): Source method the artifact was resolved with.
+        entry_hash (str): Hash of the source entry definition. A lock
+            entry whose hash differs from the current `sources.yaml`
+            entry is considered stale.
+        kind (Literal["file", "dir"]): Single APK file or split-APK directory.
+        path (str): Artifact path, stored like `LockedFile.path`.
+        version_code (int | None): versionCode of the base APK, if readable.
+        files (list[LockedFile]): Files making up the artifact.
+        locked_at (float): UNIX timestamp of resolution.
+    """
+    package: str
+    method: str
+    entry_hash: str
+    kind: Literal["file", "dir"]
+    path: str
+    version_code: int | None = None
+    files: list[LockedFile] = Field(default=[])
+    locked_at: float
+
+
+class Lockfile(BaseModel):
+    """
+    Top-level schema of `sources.lock`.
+
+    Attributes:
+        artifacts (dict[str, LockedArtifact]): Package → locked artifact.
+    """
+    artifacts: dict[str, LockedArtifact] = Field(default={})
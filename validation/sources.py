@@ -5,9 +5,84 @@ from pydantic import (
     BaseModel,
     HttpUrl,
     Field,
+    model_validator,
 )
 
 
+class DataFile(BaseModel):
+    """
+    Schema for a companion data file (e.g. an OBB expansion file) pushed
+    to the device next to the app.
+
+    Exactly one of `path` and `url` must be set.
+
+    Attributes:
+        path (Path | None): Local file.
+        url (HttpUrl | None): Direct HTTP(S) link; the file is downloaded
+            into the cache once and pushed from there.
+        remote (str | None): Absolute target path on the device.
+            Defaults to `/sdcard/Android/obb/<package>/<file name>`.
+        sha256 (str | None): Expected hex SHA-256 digest. Saves hashing the
+            local file when checking whether the device copy is up to date.
+    """
+    path: Path | None = Field(default=None)
+    url: HttpUrl | None = Field(default=None)
+    remote: str | None = Field(default=None)
+    sha256: str | None = Field(default=None)
+
+    @model_validator(mode="after")
+    def check_origin(self) -> "DataFile":
+        if (self.path is None) == (self.url is None):
+            raise ValueError("Exactly one of 'path' and 'url' must be set for a data file")
+
+        return self
+
+    @property
+    def name(self) -> str:
+        """
+        File name of the data file (from `path` or the URL path).
+        """
+        if self.path is not None:
+            return self.path.name
+
+        return Path(self.url.path or "").name
+
+
+class PostInstallAction(BaseModel):
+    """
+    Schema for a device command run after the app is installed.
+
+    Attributes:
+        action (Literal["grant", "revoke", "appops", "home-activity", "disable", "enable"]):
+            What to do with the package:
+              - "grant" / "revoke" → `pm grant` / `pm revoke` of `permission`.
+              - "appops"           → `appops set` of `op` to `mode`.
+              - "home-activity"    → `cmd package set-home-activity` to `activity`.
+              - "disable"          → `pm disable-user` (the app stays installed).
+              - "enable"           → `pm enable`.
+        permission (str | None): Runtime permission, e.g. "android.permission.CAMERA".
+        op (str | None): App op, e.g. "SYSTEM_ALERT_WINDOW".
+        mode (str): App op mode ("allow", "ignore", "deny", "default"). Defaults to "allow".
+        activity (str | None): Activity component; a name without "/" is
+            taken relative to the package (".MainActivity").
+    """
+    action: Literal["grant", "revoke", "appops", "home-activity", "disable", "enable"]
+    permission: str | None = Field(default=None)
+    op: str | None = Field(default=None)
+    mode: str = Field(default="allow")
+    activity: str | None = Field(default=None)
+
+    @model_validator(mode="after")
+    def check_arguments(self) -> "PostInstallAction":
+        required = {"grant": "permission", "revoke": "permission", "appops": "op", "home-activity": "activity"}
+        field = required.get(self.action)
+
+        if field is not None and getattr(self, field) is None:
+            raise ValueError(f"'{field}' must be set for a '{self.action}' action")
+
+        return self
+
+
 class BaseSource(BaseModel):
     """
     Base schema for a source definition.
@@ -19,9 +94,22 @@ class BaseSource(BaseModel):
               - "raccoon" → download via Raccoon (Play Store client).
               - "url"     → direct download from a given URL.
               - "local"   → use a local file path.
+        version_code (int | None):
+            Minimum versionCode expected on the device. Used by reconcile
+            mode to decide whether an installed package needs an upgrade.
+            Defaults to None (any installed version is accepted).
+        data (list[DataFile]):
+            Companion data files (OBB, large assets) pushed after the app
+            is installed. Defaults to an empty list.
+        actions (list[PostInstallAction]):
+            Device commands (permission grants, app ops, ...) run after the
+            app is installed, in order. Defaults to an empty list.
     """
     package: str
     method: Literal["raccoon", "url", "local"]
+    version_code: int | None = Field(default=None)
+    data: list[DataFile] = Field(default=[])
+    actions: list[PostInstallAction] = Field(default=[])
 
 
 class SourceRaccoon(BaseSource):
@@ -41,8 +129,11 @@ class SourceUrl(BaseSource):
 
     Attributes:
         url (HttpUrl): Direct HTTP(S) link to the APK file.
+        sha256 (str | None): Expected hex SHA-256 digest of the APK. Downloads
+            (full or delta) that do not match are rejected.
     """
     url: HttpUrl
+    sha256: str | None = Field(default=None)
 
 
 class SourceLocal(BaseSource):
@@ -55,13 +146,33 @@ class SourceLocal(BaseSource):
     path: Path
 
 
+class SourceRepository(BaseSource):
+    """
+    Schema for a package looked up in an indexed local APK repository.
+
+    Attributes:
+        method (Literal["repo"]): Always "repo".
+        path (Path): Root directory of the repository (e.g. a NAS mount).
+            APKs may be anywhere below it; they are identified by their
+            manifest, not by file name.
+        abis (list[str]): If set, only ABI config splits for these ABIs
+            are installed. Defaults to an empty list (all splits).
+    """
+    method: Literal["repo"]
+    path: Path
+    abis: list[str] = Field(default=[])
+
+
+SourceEntry = SourceRaccoon | SourceUrl | SourceLocal | SourceRepository
+
+
 class Sources(BaseModel):
     """
     Top-level container schema for multiple sources.
 
     Attributes:
-        sources (list[SourceRaccoon | SourceUrl | SourceLocal]):
+        sources (list[SourceEntry]):
             A list of source definitions, each describing
             how to obtain a particular package.
     """
-    sources: list[SourceRaccoon | SourceUrl | SourceLocal] = Field(default=[])
+    sources: list[SourceEntry] = Field(default=[])
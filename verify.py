@@ -0,0 +1,154 @@
+from pathlib import Path
+from shlex import quote
+from typing import Callable
+
+from ten_utils.log import Logger
+
+from adb.command import Adb
+from common.constants import DEVICE_SELECT_HASHER
+from common.helpers import sha256_file_cached
+from install_apps import resolve_source
+from lockfile import entry_hash
+from validation.lockfile import Lockfile
+from validation.sources import SourceEntry
+
+logger = Logger(__name__)
+
+MARKER_PACKAGE = "__PACKDROID_PACKAGE__"
+
+
+def query_installed_hashes(adb: Adb, packages: list[str]) -> dict[str, dict[str, str | None]]:
+    """
+    Hash the installed APK files of packages on the device with one shell call.
+
+    Args:
+        adb (Adb): Adb client with the target device set.
+        packages (list[str]): Package names.
+
+    Returns:
+        dict[str, dict[str, str | None]]: Package → installed APK path
+        (from `pm path`) → hex SHA-256 digest, or None if the file could
+        not be hashed. Empty for packages that are not installed.
+
+    Notes:
+        - Only the digests travel back over adb: about 100 bytes per APK.
+    """
+    quoted = " ".join(quote(package) for package in packages)
+    script = (
+        f"{DEVICE_SELECT_HASHER}; "
+        f"for p in {quoted}; do echo {MARKER_PACKAGE} $p; "
+        f"for f in $(pm path $p 2>/dev/null | sed -n 's/^package://p'); do "
+        f'$H "$f" 2>/dev/null || echo "- $f"; '
+        f"done; done"
+    )
+    output = adb.shell(script, check=False).stdout
+
+    installed: dict[str, dict[str, str | None]] = {package: {} for package in packages}
+    current: str | None = None
+
+    for line in output.splitlines():
+        words = line.split()
+
+        if len(words) == 2 and words[0] == MARKER_PACKAGE:
+            current = words[1] if words[1] in installed else None
+
+        elif current is not None and len(words) == 2:
+            digest, path = words
+            installed[current][path] = None if digest == "-" else digest.lower()
+
+    return installed
+
+
+def expected_hashes(source: Path) -> set[str]:
+    """
+    Return the SHA-256 digests of the APK files of a resolved artifact.
+
+    Args:
+        source (Path): APK file or split-APK directory.
+
+    Returns:
+        set[str]: Hex digests (hashed at most once per process per file version).
+    """
+    files = sorted(source.rglob("*.apk")) if source.is_dir() else [source]
+    return {sha256_file_cached(file) for file in files}
+
+
+def verify_hashes(
+        adb: Adb,
+        entries: list[SourceEntry],
+        resolve: Callable[[SourceEntry], Path | None] = resolve_source,
+        lock: Lockfile | None = None,
+) -> dict[str, str | None]:
+    """
+    Verify installed apps byte for byte against their artifacts, without pulling APKs.
+
+    Args:
+        adb (Adb): Adb client with the target device set.
+        entries (list[SourceEntry]): Entries to verify.
+        resolve (Callable, optional): Entry resolver. Defaults to `resolve_source`.
+        lock (Lockfile | None, optional): Loaded `sources.lock`. Locked
+            entries are checked against the recorded digests, without
+            resolving or hashing anything on the host. Defaults to None.
+
+    Returns:
+        dict[str, str | None]: Package → None if the installed APK files are
+        exactly the artifact's APK files, otherwise the reason.
+
+    Workflow:
+        - Takes the digests of locked entries from `lock`; resolves every
+          other entry locally and hashes its APKs on the host.
+        - Hashes the installed APKs of all packages on the device in one
+          shell call (`query_installed_hashes`).
+        - Compares the sets of digests. Android keeps installed APKs byte
+          for byte (as base.apk / split_*.apk), so a stale build, a missing
+          split or a partially written file shows up as a mismatch.
+    """
+    results: dict[str, str | None] = {}
+    expected: dict[str, set[str]] = {}
+
+    for entry in entries:
+        artifact = lock.artifacts.get(entry.package) if lock is not None else None
+
+        if artifact is not None and artifact.entry_hash == entry_hash(entry):
+            expected[entry.package] = {file.sha256 for file in artifact.files}
+            continue
+
+        try:
+            expected[entry.package] = expected_hashes(resolve(entry))
+
+        except Exception as e:
+            logger.error(f"Error for {entry.package}: {e}")
+            results[entry.package] = str(e)
+
+    if not expected:
+        return results
+
+    installed = query_installed_hashes(adb, list(expected))
+
+    for package, digests in expected.items():
+        files = installed[package]
+        unhashed = [path for path, digest in files.items() if digest is None]
+
+        if not files:
+            results[package] = "not installed"
+
+        elif unhashed:
+            results[package] = f"could not hash {unhashed[0]} on the device"
+
+        elif set(files.values()) != digests:
+            missing = len(digests - set(files.values()))
+            unexpected = len(set(files.values()) - digests)
+            results[package] = (
+                f"installed APKs differ from the artifact ({missing} missing, {unexpected} unexpected)"
+            )
+
+        else:
+            results[package] = None
+
+        if results[package] is not None:
+            logger.warning(f"{adb.device}: {package}: {results[package]}")
+
+    logger.info(
+        f"{adb.device}: {sum(error is None for error in results.values())}/{len(results)} package(s) verified"
+    )
+    return results